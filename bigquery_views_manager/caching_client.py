@@ -0,0 +1,229 @@
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Set, Union
+
+from google.cloud import bigquery
+from google.cloud.exceptions import NotFound
+
+
+LOGGER = logging.getLogger(__name__)
+
+# note: methods other than these are delegated without being counted
+COUNTED_API_METHOD_NAMES = {
+    'create_table',
+    'delete_table',
+    'get_table',
+    'list_jobs',
+    'list_tables',
+    'load_table_from_file',
+    'query',
+    'update_table'
+}
+
+DDL_TARGET_TABLE_PATTERN = re.compile(
+    r"\b(?:CREATE(?:\s+OR\s+REPLACE)?|DROP|ALTER)"
+    r"\s+(?:MATERIALIZED\s+)?(?:VIEW|TABLE)"
+    r"(?:\s+IF(?:\s+NOT)?\s+EXISTS)?"
+    r"\s+`?([\w.:-]+)`?",
+    re.IGNORECASE
+)
+
+
+def get_ddl_target_table_names_for_query(query: str) -> List[str]:
+    return DDL_TARGET_TABLE_PATTERN.findall(query)
+
+
+class InvalidatingJob:
+    """
+    Wraps a job writing to tables, invalidating them again once the job finished
+    (table metadata fetched concurrently while the job was running may be stale).
+    Any other attribute is delegated to the wrapped job.
+    """
+    def __init__(self, job, invalidate_tables: Callable[[], None]):
+        self._job = job
+        self._invalidate_tables = invalidate_tables
+
+    def __getattr__(self, name: str):
+        return getattr(self._job, name)
+
+    @property
+    def job(self):
+        return self._job
+
+    def result(self, *args, **kwargs):
+        try:
+            return self._job.result(*args, **kwargs)
+        finally:
+            self._invalidate_tables()
+
+
+class CachingClient:
+    """
+    Wraps a BigQuery client, memoizing dataset listings and table metadata for the run.
+
+    Tables written by the run itself (query destinations, DDL statements, loads,
+    updates and deletes) are invalidated when the job is submitted, and again once
+    the job finished. Long running processes (e.g. watch) should call clear_cache
+    before reusing the client.
+    Any other attribute is delegated to the wrapped client.
+    """
+    def __init__(self, client: bigquery.Client):
+        self._client = client
+        self._lock = threading.Lock()
+        self._table_list_by_dataset_key: Dict[str, list] = {}
+        self._table_or_not_found_by_table_key: Dict[str, Union[bigquery.Table, NotFound]] = {}
+        self.api_call_count_by_method_name: Counter = Counter()
+        self.cache_hit_count_by_method_name: Counter = Counter()
+
+    def __getattr__(self, name: str):
+        value = getattr(self._client, name)
+        if name in COUNTED_API_METHOD_NAMES:
+            self._increment_api_call_count(name)
+        return value
+
+    @property
+    def client(self) -> bigquery.Client:
+        return self._client
+
+    def _increment_api_call_count(self, method_name: str):
+        with self._lock:
+            self.api_call_count_by_method_name[method_name] += 1
+
+    def _increment_cache_hit_count(self, method_name: str):
+        with self._lock:
+            self.cache_hit_count_by_method_name[method_name] += 1
+
+    def _get_dataset_key(self, dataset) -> str:
+        if isinstance(dataset, str):
+            dataset = dataset.replace(':', '.')
+            if '.' not in dataset:
+                return f'{self._client.project}.{dataset}'
+            return dataset
+        return f'{dataset.project}.{dataset.dataset_id}'
+
+    def _get_table_key(self, table) -> str:
+        if isinstance(table, str):
+            table = table.replace(':', '.')
+            if table.count('.') < 2:
+                return f'{self._client.project}.{table}'
+            return table
+        return f'{table.project}.{table.dataset_id}.{table.table_id}'
+
+    def invalidate_table(self, table):
+        table_key = self._get_table_key(table)
+        dataset_key = table_key.rsplit('.', 1)[0]
+        LOGGER.debug('invalidating cached table: %s', table_key)
+        with self._lock:
+            self._table_or_not_found_by_table_key.pop(table_key, None)
+            self._table_list_by_dataset_key.pop(dataset_key, None)
+
+    def invalidate_tables(self, tables: list):
+        for table in tables:
+            self.invalidate_table(table)
+
+    def clear_cache(self):
+        LOGGER.debug('clearing cached tables')
+        with self._lock:
+            self._table_or_not_found_by_table_key.clear()
+            self._table_list_by_dataset_key.clear()
+
+    def list_tables(self, dataset, **kwargs) -> list:
+        if kwargs:
+            self._increment_api_call_count('list_tables')
+            return list(self._client.list_tables(dataset, **kwargs))
+        dataset_key = self._get_dataset_key(dataset)
+        with self._lock:
+            table_list = self._table_list_by_dataset_key.get(dataset_key)
+        if table_list is not None:
+            self._increment_cache_hit_count('list_tables')
+            return list(table_list)
+        self._increment_api_call_count('list_tables')
+        table_list = list(self._client.list_tables(dataset))
+        with self._lock:
+            self._table_list_by_dataset_key[dataset_key] = table_list
+        return list(table_list)
+
+    def get_table(self, table, **kwargs) -> bigquery.Table:
+        if kwargs:
+            self._increment_api_call_count('get_table')
+            return self._client.get_table(table, **kwargs)
+        table_key = self._get_table_key(table)
+        with self._lock:
+            table_or_not_found = self._table_or_not_found_by_table_key.get(table_key)
+        if table_or_not_found is not None:
+            self._increment_cache_hit_count('get_table')
+        else:
+            self._increment_api_call_count('get_table')
+            try:
+                table_or_not_found = self._client.get_table(table)
+            except NotFound as exc:
+                table_or_not_found = exc
+            with self._lock:
+                self._table_or_not_found_by_table_key[table_key] = table_or_not_found
+        if isinstance(table_or_not_found, NotFound):
+            raise table_or_not_found
+        return table_or_not_found
+
+    def query(self, query: str, job_config: bigquery.QueryJobConfig = None, **kwargs):
+        self._increment_api_call_count('query')
+        written_tables = []
+        if job_config is None or not job_config.dry_run:
+            written_tables = get_ddl_target_table_names_for_query(query)
+            if job_config is not None and job_config.destination is not None:
+                written_tables.append(job_config.destination)
+            self.invalidate_tables(written_tables)
+        if job_config is None:
+            job = self._client.query(query, **kwargs)
+        else:
+            job = self._client.query(query, job_config=job_config, **kwargs)
+        if not written_tables:
+            return job
+        return InvalidatingJob(job, lambda: self.invalidate_tables(written_tables))
+
+    def load_table_from_file(self, file_obj, destination, **kwargs):
+        self._increment_api_call_count('load_table_from_file')
+        self.invalidate_table(destination)
+        return InvalidatingJob(
+            self._client.load_table_from_file(file_obj, destination, **kwargs),
+            lambda: self.invalidate_table(destination)
+        )
+
+    def list_jobs(self, parent_job=None, **kwargs):
+        self._increment_api_call_count('list_jobs')
+        if isinstance(parent_job, InvalidatingJob):
+            parent_job = parent_job.job
+        return self._client.list_jobs(parent_job=parent_job, **kwargs)
+
+    def create_table(self, table, **kwargs):
+        self._increment_api_call_count('create_table')
+        self.invalidate_table(table)
+        return self._client.create_table(table, **kwargs)
+
+    def update_table(self, table, fields, **kwargs):
+        self._increment_api_call_count('update_table')
+        self.invalidate_table(table)
+        return self._client.update_table(table, fields, **kwargs)
+
+    def delete_table(self, table, **kwargs):
+        self._increment_api_call_count('delete_table')
+        self.invalidate_table(table)
+        return self._client.delete_table(table, **kwargs)
+
+    def get_api_call_summary(self) -> str:
+        with self._lock:
+            method_names: Set[str] = (
+                set(self.api_call_count_by_method_name)
+                | set(self.cache_hit_count_by_method_name)
+            )
+            return ', '.join([
+                (
+                    f'{method_name}={self.api_call_count_by_method_name[method_name]}'
+                    f' (cached: {self.cache_hit_count_by_method_name[method_name]})'
+                )
+                for method_name in sorted(method_names)
+            ]) or 'none'
+
+    def log_api_call_summary(self):
+        LOGGER.info('BigQuery API calls: %s', self.get_api_call_summary())
@@ -1,33 +1,49 @@
+# pylint: disable=too-many-lines
 import argparse
 import logging
 import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Optional
 from abc import ABCMeta, abstractmethod
 from collections import OrderedDict
 
-from google.cloud import bigquery
-
-from .views import get_bq_view_names
 from .view_list import (
+    DATASET_NAME_KEY,
+    VIEW_OR_TABLE_NAME_KEY,
     get_mapped_materialized_view_subset,
     extend_or_subset_mapped_view_subset,
     map_view_to_dataset_from_template_mapping_dict,
     create_simple_view_mapping_from_view_list,
+    is_view_name_selector,
     load_view_list_config,
+    resolve_view_name_selectors,
     save_view_list_config,
     ViewConfig
 )
-
-from .update_views import update_or_create_views
-from .materialize_views import materialize_views
-from .diff_views import diff_views
-from .get_views import get_views
-from .delete_views_or_tables import delete_views_or_tables
-from .config_tables import get_local_config_table_names, update_or_create_config_tables
+from .config_table_formats import CSV_UPLOAD_FORMAT, UPLOAD_FORMATS
+from .defaults import (
+    DEFAULT_CONFIG_TABLES_MAX_WORKERS,
+    DEFAULT_DELETE_MAX_WORKERS,
+    DEFAULT_ON_DEMAND_PRICE_PER_TIB,
+    DEFAULT_POLL_INTERVAL
+)
+from .scheduler import DEFAULT_MAX_WORKERS
+from .graph_index import (
+    get_graph_index_file,
+    load_graph_index_for_view_list_config,
+    update_graph_index_for_view_list_config
+)
+from .manifest import ManifestEntry, get_query_hash, load_manifest, save_manifest
 
 from . import configure_warnings  # noqa pylint: disable=unused-import
 
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+# pylint: disable=import-outside-toplevel
+# sub command modules (and google-cloud-bigquery) are only imported by the sub command being run,
+# to keep the startup time low
+
 
 LOGGER = logging.getLogger(__name__)
 
@@ -37,6 +53,8 @@ DEFAULT_MATERIALIZED_VIEW_LIST_FILE = "views/materialized-views.lst"
 
 DEFAULT_CONFIG_TABLES_BASE_DIR = "config-tables"
 
+DEFAULT_DRY_RUN_MAX_WORKERS = 10
+
 
 def add_view_list_config_file_argument(parser: argparse.ArgumentParser):
     parser.add_argument(
@@ -45,6 +63,11 @@ def add_view_list_config_file_argument(parser: argparse.ArgumentParser):
         default=DEFAULT_VIEW_LIST_CONFIG_FILE,
         help="Path to view list config (yaml)",
     )
+    parser.add_argument(
+        "--no-graph-index",
+        action="store_true",
+        help="Do not load or update the dependency graph index",
+    )
 
 
 def add_view_list_file_argument(parser: argparse.ArgumentParser):
@@ -67,7 +90,23 @@ def add_materialized_view_list_file_argument(parser: argparse.ArgumentParser):
 
 def add_view_names_argument(parser: argparse.ArgumentParser):
     parser.add_argument(
-        dest="view_names", metavar="view-names", nargs="*", help="View names"
+        dest="view_names", metavar="view-names", nargs="*",
+        help=(
+            "View names, or selectors: +<view> (including the views it references),"
+            " <view>+ (including the views referencing it) or +<view>+ (both)"
+        )
+    )
+
+
+def get_selected_view_names(
+        args: argparse.Namespace,
+        views_ordered_dict_all: OrderedDict,
+        materialized_view_ordered_dict_all: OrderedDict) -> List[str]:
+    return resolve_view_name_selectors(
+        args.view_names,
+        Path(args.view_list_config).parent,
+        views_ordered_dict_all,
+        materialized_view_ordered_dict_all
     )
 
 
@@ -86,6 +125,69 @@ def add_table_names_argument(parser: argparse.ArgumentParser):
     )
 
 
+def positive_int(value: str) -> int:
+    int_value = int(value)
+    if int_value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return int_value
+
+
+def add_jobs_argument(parser: argparse.ArgumentParser, default: int = DEFAULT_MAX_WORKERS):
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=default,
+        help=(
+            "Maximum number of BigQuery jobs to run concurrently"
+            " (views will still wait for the views they depend on)"
+        ),
+    )
+
+
+def add_config_table_load_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Load config tables even if their content hash label is unchanged",
+    )
+    parser.add_argument(
+        "--upload-format",
+        choices=UPLOAD_FORMATS,
+        default=CSV_UPLOAD_FORMAT,
+        help=(
+            "Format to transcode the CSV to before uploading it"
+            " (parquet and avro require a supported schema file, otherwise gzip is used)"
+        ),
+    )
+    parser.add_argument(
+        "--skip-validation",
+        action="store_true",
+        help="Do not validate the CSV files against their schema before uploading them",
+    )
+
+
+def add_max_total_bytes_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--max-total-bytes",
+        type=int,
+        help=(
+            "Stop materializing views once the bytes billed plus the estimated bytes"
+            " of the next view would exceed the limit (failing once the other views are done)"
+        ),
+    )
+
+
+def add_manifest_file_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--manifest-file",
+        type=str,
+        help=(
+            "Path to deployment manifest (json),"
+            " recording the hash of the rendered view queries of the last successful deployment"
+        ),
+    )
+
+
 def disable_view_name_mapping_argument(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--disable-view-name-mapping",
@@ -95,6 +197,11 @@ def disable_view_name_mapping_argument(parser: argparse.ArgumentParser):
 
 
 class SubCommand(metaclass=ABCMeta):
+    # sub commands that only work on local files will be passed None as the client
+    requires_client = True
+    # only sub commands sorting or deploying views save the dependency graph index
+    updates_graph_index = False
+
     def __init__(self, name, description):
         self.name = name
         self.description = description
@@ -104,11 +211,13 @@ class SubCommand(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
         pass
 
 
 class CreateOrReplaceViewsSubCommand(SubCommand):
+    updates_graph_index = True
+
     def __init__(self):
         super().__init__("create-or-replace-views", "Create or Replace Views")
 
@@ -120,8 +229,40 @@ class CreateOrReplaceViewsSubCommand(SubCommand):
             action="store_true",
             help="Materialize views in the materialized view list while updating",
         )
+        add_jobs_argument(parser)
+        parser.add_argument(
+            "--only-changed",
+            action="store_true",
+            help="Only create or replace views that are missing or differ from the remote views",
+        )
+        add_manifest_file_argument(parser)
+        parser.add_argument(
+            "--trust-manifest",
+            action="store_true",
+            help=(
+                "Skip views whose rendered query and target are unchanged according to the"
+                " manifest, without checking the remote views"
+            ),
+        )
+        parser.add_argument(
+            "--batch-ddl",
+            action="store_true",
+            help=(
+                "Update the views of each dependency level using multi-statement script jobs,"
+                " rather than one query job per view"
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=positive_int,
+            help=(
+                "Maximum number of views per script job when using --batch-ddl"
+                " (defaults to all views of a dependency level)"
+            ),
+        )
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .update_views import update_or_create_views
         view_list_config = load_view_list_config(
             args.view_list_config
         ).resolve_conditions({
@@ -138,11 +279,14 @@ class CreateOrReplaceViewsSubCommand(SubCommand):
         )
         LOGGER.debug('materialized_view_ordered_dict_all: %s', materialized_view_ordered_dict_all)
 
+        view_names = get_selected_view_names(
+            args, views_ordered_dict_all, materialized_view_ordered_dict_all
+        )
         views_dict = (
             extend_or_subset_mapped_view_subset(
-                views_ordered_dict_all, args.view_names, args.dataset
+                views_ordered_dict_all, view_names, args.dataset
             )
-            if args.view_names
+            if view_names
             else views_ordered_dict_all
         )
         LOGGER.debug('views_dict: %s', views_dict)
@@ -167,15 +311,29 @@ class CreateOrReplaceViewsSubCommand(SubCommand):
             )
         )
 
-        update_or_create_views(
-            client,
-            Path(args.view_list_config).parent,
-            views_dict,
-            materialized_view_names=materialized_view_ordered_dict,
-            project=client.project,
-            default_dataset=args.dataset,
-            view_to_dataset_mapping=view_to_dataset_mapping,
-        )
+        manifest = load_manifest(args.manifest_file) if args.manifest_file else None
+        if args.trust_manifest and manifest is None:
+            raise ValueError('--trust-manifest requires --manifest-file')
+        try:
+            update_or_create_views(
+                client,
+                Path(args.view_list_config).parent,
+                views_dict,
+                materialized_view_names=materialized_view_ordered_dict,
+                project=client.project,
+                default_dataset=args.dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping,
+                max_workers=args.jobs,
+                only_changed=args.only_changed,
+                manifest=manifest,
+                trust_manifest=args.trust_manifest,
+                batch_ddl=args.batch_ddl,
+                batch_size=args.batch_size,
+            )
+        finally:
+            # the manifest will only contain entries for successfully deployed views
+            if manifest is not None:
+                save_manifest(manifest, args.manifest_file)
 
 
 class DeleteViewsSubCommand(SubCommand):
@@ -185,8 +343,10 @@ class DeleteViewsSubCommand(SubCommand):
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_view_list_config_file_argument(parser)
         add_view_names_argument(parser)
+        add_jobs_argument(parser, default=DEFAULT_DELETE_MAX_WORKERS)
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .delete_views_or_tables import delete_views_or_tables
         view_list_config = load_view_list_config(
             args.view_list_config
         ).resolve_conditions({
@@ -198,26 +358,69 @@ class DeleteViewsSubCommand(SubCommand):
             args.dataset
         )
         LOGGER.debug('views_ordered_dict_all: %s', views_ordered_dict_all)
+        materialized_view_ordered_dict_all = view_list_config.to_materialized_view_ordered_dict(
+            args.dataset
+        )
 
+        view_names = get_selected_view_names(
+            args, views_ordered_dict_all, materialized_view_ordered_dict_all
+        )
         views_dict = (
             extend_or_subset_mapped_view_subset(
-                views_ordered_dict_all, args.view_names, args.dataset
+                views_ordered_dict_all, view_names, args.dataset
             )
-            if args.view_names
+            if view_names
             else views_ordered_dict_all
         )
-        delete_views_or_tables(client, views_dict)
+        delete_views_or_tables(client, views_dict, max_workers=args.jobs)
 
 
 class MaterializeViewsSubCommand(SubCommand):
+    updates_graph_index = True
+
     def __init__(self):
         super().__init__("materialize-views", "Materialize Views")
 
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_view_list_config_file_argument(parser)
         add_view_names_argument(parser)
-
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+        add_jobs_argument(parser)
+        add_manifest_file_argument(parser)
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only materialize views if the view or any of the tables it references"
+                " (transitively) has been modified after the materialized table"
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            "--estimate",
+            dest="dry_run",
+            action="store_true",
+            help=(
+                "Do not materialize views, but estimate the bytes processed and"
+                " the on-demand cost instead"
+                f" (using {DEFAULT_DRY_RUN_MAX_WORKERS} concurrent jobs unless --jobs is set)"
+            ),
+        )
+        parser.add_argument(
+            "--price-per-tib",
+            type=float,
+            default=DEFAULT_ON_DEMAND_PRICE_PER_TIB,
+            help="On-demand price per TiB, used to estimate the cost",
+        )
+        add_max_total_bytes_argument(parser)
+
+    def run(  # pylint: disable=too-many-locals
+            self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .materialize_views import (
+            MaxTotalBytesExceededError,
+            estimate_materialize_views,
+            materialize_views
+        )
+        from .views import get_local_view_query
         view_list_config = load_view_list_config(
             args.view_list_config
         ).resolve_conditions({
@@ -234,20 +437,97 @@ class MaterializeViewsSubCommand(SubCommand):
         )
         LOGGER.debug('materialized_view_ordered_dict_all: %s', materialized_view_ordered_dict_all)
 
+        view_names = get_selected_view_names(
+            args, views_ordered_dict_all, materialized_view_ordered_dict_all
+        )
         materialized_view_ordered_dict = (
             get_mapped_materialized_view_subset(
-                materialized_view_ordered_dict_all, args.view_names
+                materialized_view_ordered_dict_all, view_names
             )
-            if args.view_names
+            if view_names
             else materialized_view_ordered_dict_all
         )
 
-        materialize_views(
-            client,
-            materialized_view_dict=materialized_view_ordered_dict,
-            source_view_dict=views_ordered_dict_all,
-            project=client.project,
+        if args.dry_run:
+            estimate_materialize_views(
+                client,
+                materialized_view_dict=materialized_view_ordered_dict,
+                source_view_dict=views_ordered_dict_all,
+                project=client.project,
+                max_workers=(
+                    args.jobs if args.jobs > DEFAULT_MAX_WORKERS
+                    else DEFAULT_DRY_RUN_MAX_WORKERS
+                ),
+                price_per_tib=args.price_per_tib,
+            )
+            return
+
+        view_to_dataset_mapping = map_view_to_dataset_from_template_mapping_dict(
+            views_ordered_dict_all
         )
+        view_to_dataset_mapping.update(
+            map_view_to_dataset_from_template_mapping_dict(
+                materialized_view_ordered_dict_all
+            )
+        )
+
+        base_dir = Path(args.view_list_config).parent
+        manifest = load_manifest(args.manifest_file) if args.manifest_file else None
+        view_query_hash_by_view_name = {}
+        if manifest is not None:
+            for view_name in materialized_view_ordered_dict.keys():
+                view_query_hash_by_view_name[view_name] = get_query_hash(get_local_view_query(
+                    base_dir,
+                    view_name,
+                    project=client.project,
+                    default_dataset=args.dataset,
+                    view_to_dataset_mapping=view_to_dataset_mapping,
+                ))
+                view_entry = manifest.get_view_entry(view_name)
+                if (
+                    view_entry is not None
+                    and view_entry.query_hash != view_query_hash_by_view_name[view_name]
+                ):
+                    LOGGER.warning(
+                        'view has changed since it was last deployed: %s', view_name
+                    )
+
+        materialize_views_result = None
+        try:
+            materialize_views_result = materialize_views(
+                client,
+                materialized_view_dict=materialized_view_ordered_dict,
+                source_view_dict=views_ordered_dict_all,
+                project=client.project,
+                base_dir=base_dir,
+                max_workers=args.jobs,
+                incremental=args.incremental,
+                default_dataset=args.dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping,
+                max_total_bytes=args.max_total_bytes,
+            )
+        finally:
+            if manifest is not None:
+                if materialize_views_result is not None:
+                    for (view_name, dataset_view_data), result in zip(
+                            materialized_view_ordered_dict.items(),
+                            materialize_views_result.result_list):
+                        if result.skipped:
+                            continue
+                        manifest.set_materialized_view_entry(view_name, ManifestEntry(
+                            query_hash=view_query_hash_by_view_name[view_name],
+                            project=client.project,
+                            dataset=dataset_view_data.get(DATASET_NAME_KEY),
+                            table_name=dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+                        ))
+                save_manifest(manifest, args.manifest_file)
+
+        budget_exceeded_result_list = materialize_views_result.budget_exceeded_result_list
+        if budget_exceeded_result_list:
+            raise MaxTotalBytesExceededError([
+                f'{result.source_dataset}.{result.source_view_name}'
+                for result in budget_exceeded_result_list
+            ])
 
 
 class DeleteMaterializedTablesSubCommand(SubCommand):
@@ -257,8 +537,10 @@ class DeleteMaterializedTablesSubCommand(SubCommand):
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_view_list_config_file_argument(parser)
         add_view_names_argument(parser)
+        add_jobs_argument(parser, default=DEFAULT_DELETE_MAX_WORKERS)
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .delete_views_or_tables import delete_views_or_tables
         view_list_config = load_view_list_config(
             args.view_list_config
         ).resolve_conditions({
@@ -266,19 +548,31 @@ class DeleteMaterializedTablesSubCommand(SubCommand):
             'dataset': args.dataset
         })
         LOGGER.info('view_list_config: %s', view_list_config)
+        views_ordered_dict_all = view_list_config.to_views_ordered_dict(
+            args.dataset
+        )
         materialized_view_ordered_dict_all = view_list_config.to_materialized_view_ordered_dict(
             args.dataset
         )
         LOGGER.debug('materialized_view_ordered_dict_all: %s', materialized_view_ordered_dict_all)
 
-        materialized_view_ordered_dict = (
-            extend_or_subset_mapped_view_subset(
-                materialized_view_ordered_dict_all, args.view_names, args.dataset
-            )
-            if args.view_names
-            else materialized_view_ordered_dict_all
+        view_names = get_selected_view_names(
+            args, views_ordered_dict_all, materialized_view_ordered_dict_all
         )
-        delete_views_or_tables(client, materialized_view_ordered_dict)
+        if any(is_view_name_selector(value) for value in args.view_names):
+            # selectors may include views that are not materialized
+            materialized_view_ordered_dict = get_mapped_materialized_view_subset(
+                materialized_view_ordered_dict_all, set(view_names)
+            )
+        else:
+            materialized_view_ordered_dict = (
+                extend_or_subset_mapped_view_subset(
+                    materialized_view_ordered_dict_all, view_names, args.dataset
+                )
+                if view_names
+                else materialized_view_ordered_dict_all
+            )
+        delete_views_or_tables(client, materialized_view_ordered_dict, max_workers=args.jobs)
 
 
 class DiffViewsSubCommand(SubCommand):
@@ -288,11 +582,13 @@ class DiffViewsSubCommand(SubCommand):
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_view_list_config_file_argument(parser)
         add_view_names_argument(parser)
+        add_jobs_argument(parser)
         parser.add_argument(
             "--fail-if-changed", action="store_true", help="Fail if changed"
         )
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .diff_views import diff_views
         view_list_config = load_view_list_config(
             args.view_list_config
         ).resolve_conditions({
@@ -309,11 +605,14 @@ class DiffViewsSubCommand(SubCommand):
         )
         LOGGER.debug('materialized_view_ordered_dict_all: %s', materialized_view_ordered_dict_all)
 
+        view_names = get_selected_view_names(
+            args, views_ordered_dict_all, materialized_view_ordered_dict_all
+        )
         views_dict = (
             extend_or_subset_mapped_view_subset(
-                views_ordered_dict_all, args.view_names, args.dataset
+                views_ordered_dict_all, view_names, args.dataset
             )
-            if args.view_names
+            if view_names
             else views_ordered_dict_all
         )
 
@@ -336,6 +635,7 @@ class DiffViewsSubCommand(SubCommand):
             project=client.project,
             default_dataset=args.dataset,
             view_to_dataset_mapping=view_to_dataset_mapping,
+            max_workers=args.jobs,
         )
         if has_changed and args.fail_if_changed:
             sys.exit(2)
@@ -365,8 +665,15 @@ class GetViewsSubCommand(SubCommand):
             help="Add any missing views to the view list",
         )
         disable_view_name_mapping_argument(parser)
-
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+        add_jobs_argument(parser)
+
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .get_views import get_views
+        from .views import get_bq_view_names
+        view_selectors = [value for value in args.view_names if is_view_name_selector(value)]
+        if view_selectors:
+            # the references are only known from the local view templates, which may be missing
+            raise ValueError(f'view selectors are not supported by get-views: {view_selectors}')
         original_view_list_config = load_view_list_config(
             args.view_list_config
         )
@@ -390,16 +697,25 @@ class GetViewsSubCommand(SubCommand):
                 args.dataset, view_names
             )
         else:
+            view_names = get_selected_view_names(
+                args, views_ordered_dict_all, materialized_view_ordered_dict_all
+            )
             views_dict = (
                 extend_or_subset_mapped_view_subset(
-                    views_ordered_dict_all, args.view_names, args.dataset
+                    views_ordered_dict_all, view_names, args.dataset
                 )
-                if args.view_names
+                if view_names
                 else views_ordered_dict_all
             )
 
         base_dir = Path(args.view_list_config).parent
-        get_views(client, base_dir, views_dict, project=client.project)
+        get_views(
+            client,
+            base_dir,
+            views_dict,
+            project=client.project,
+            max_workers=args.jobs
+        )
 
         if args.add_to_view_list:
             updated_view_list_config = original_view_list_config
@@ -416,6 +732,9 @@ class GetViewsSubCommand(SubCommand):
 
 
 class SortViewListSubCommand(SubCommand):
+    requires_client = False
+    updates_graph_index = True
+
     def __init__(self):
         super().__init__(
             "sort-view-list",
@@ -428,7 +747,7 @@ class SortViewListSubCommand(SubCommand):
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_view_list_config_file_argument(parser)
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
         base_dir = Path(args.view_list_config).parent
         view_list_config = load_view_list_config(
             args.view_list_config
@@ -454,13 +773,172 @@ class CreateOrReplaceConfigTablesSubCommand(SubCommand):
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_config_tables_base_dir_file_argument(parser)
         add_table_names_argument(parser)
+        add_jobs_argument(parser, default=DEFAULT_CONFIG_TABLES_MAX_WORKERS)
+        add_config_table_load_arguments(parser)
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .config_tables import (
+            get_local_config_table_names,
+            update_or_create_config_tables
+        )
         table_names = args.table_names or get_local_config_table_names(
             args.config_tables_base_dir
         )
         update_or_create_config_tables(
-            client, args.config_tables_base_dir, table_names, dataset=args.dataset
+            client, args.config_tables_base_dir, table_names, dataset=args.dataset,
+            max_workers=args.jobs,
+            force=args.force,
+            upload_format=args.upload_format,
+            validate=not args.skip_validation
+        )
+
+
+class DeploySubCommand(SubCommand):
+    updates_graph_index = True
+
+    def __init__(self):
+        super().__init__(
+            "deploy",
+            "Create or replace config tables and views, and materialize views,"
+            " as a single dependency graph",
+        )
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        add_view_list_config_file_argument(parser)
+        add_config_tables_base_dir_file_argument(parser)
+        add_view_names_argument(parser)
+        add_jobs_argument(parser)
+        add_manifest_file_argument(parser)
+        add_config_table_load_arguments(parser)
+        add_max_total_bytes_argument(parser)
+
+    def run(  # pylint: disable=too-many-locals
+            self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .config_tables import get_local_config_table_names
+        from .deploy import deploy
+        from .materialize_views import MaxTotalBytesExceededError
+        view_list_config = load_view_list_config(
+            args.view_list_config
+        ).resolve_conditions({
+            'project': client.project,
+            'dataset': args.dataset
+        })
+        LOGGER.info('view_list_config: %s', view_list_config)
+        views_ordered_dict_all = view_list_config.to_views_ordered_dict(
+            args.dataset
+        )
+        materialized_view_ordered_dict_all = view_list_config.to_materialized_view_ordered_dict(
+            args.dataset
+        )
+        view_names = get_selected_view_names(
+            args, views_ordered_dict_all, materialized_view_ordered_dict_all
+        )
+        views_dict = (
+            extend_or_subset_mapped_view_subset(
+                views_ordered_dict_all, view_names, args.dataset
+            )
+            if view_names
+            else views_ordered_dict_all
+        )
+        materialized_view_ordered_dict = get_mapped_materialized_view_subset(
+            materialized_view_ordered_dict_all, set(views_dict.keys())
+        )
+        view_to_dataset_mapping = map_view_to_dataset_from_template_mapping_dict(
+            views_ordered_dict_all
+        )
+        view_to_dataset_mapping.update(
+            map_view_to_dataset_from_template_mapping_dict(
+                materialized_view_ordered_dict_all
+            )
+        )
+
+        manifest = load_manifest(args.manifest_file) if args.manifest_file else None
+        try:
+            deploy_result = deploy(
+                client,
+                Path(args.view_list_config).parent,
+                config_tables_base_dir=args.config_tables_base_dir,
+                config_table_names=get_local_config_table_names(args.config_tables_base_dir),
+                view_names_dict=views_dict,
+                materialized_view_names_dict=materialized_view_ordered_dict,
+                project=client.project,
+                default_dataset=args.dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping,
+                max_workers=args.jobs,
+                manifest=manifest,
+                force=args.force,
+                upload_format=args.upload_format,
+                validate=not args.skip_validation,
+                max_total_bytes=args.max_total_bytes
+            )
+        finally:
+            # the manifest will only contain entries for successfully deployed views
+            if manifest is not None:
+                save_manifest(manifest, args.manifest_file)
+
+        budget_exceeded_result_list = deploy_result.budget_exceeded_result_list
+        if budget_exceeded_result_list:
+            raise MaxTotalBytesExceededError([
+                node_result.node.name for node_result in budget_exceeded_result_list
+            ])
+
+
+class WatchSubCommand(SubCommand):
+    def __init__(self):
+        super().__init__(
+            "watch",
+            "Watch view templates and the view list config,"
+            " and redeploy changed views and the views depending on them",
+        )
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        add_view_list_config_file_argument(parser)
+        add_jobs_argument(parser)
+        parser.add_argument(
+            "--materialize",
+            action="store_true",
+            help="Materialize views in the materialized view list while redeploying",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=DEFAULT_POLL_INTERVAL,
+            help="Seconds to wait between checking the files for changes",
+        )
+
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .watch import ViewsWatcher
+        ViewsWatcher(
+            client,
+            args.view_list_config,
+            dataset=args.dataset,
+            max_workers=args.jobs,
+            materialize=args.materialize
+        ).run(poll_interval=args.poll_interval)
+
+
+class ValidateConfigTablesSubCommand(SubCommand):
+    requires_client = False
+
+    def __init__(self):
+        super().__init__(
+            "validate-config-tables",
+            "Validate local config tables (CSV) against their schema, without uploading them",
+        )
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        add_config_tables_base_dir_file_argument(parser)
+        add_table_names_argument(parser)
+        add_jobs_argument(parser, default=DEFAULT_CONFIG_TABLES_MAX_WORKERS)
+
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .config_tables import get_local_config_table_names, validate_config_tables
+        table_names = args.table_names or get_local_config_table_names(
+            args.config_tables_base_dir
+        )
+        validate_config_tables(
+            args.config_tables_base_dir, table_names,
+            max_workers=args.jobs
         )
 
 
@@ -471,13 +949,16 @@ class DeleteConfigTablesSubCommand(SubCommand):
     def add_arguments(self, parser: argparse.ArgumentParser):
         add_config_tables_base_dir_file_argument(parser)
         add_table_names_argument(parser)
+        add_jobs_argument(parser, default=DEFAULT_DELETE_MAX_WORKERS)
 
-    def run(self, client: bigquery.Client, args: argparse.Namespace):
+    def run(self, client: 'bigquery.Client', args: argparse.Namespace):
+        from .config_tables import get_local_config_table_names
+        from .delete_views_or_tables import delete_views_or_tables
         table_names = args.table_names or get_local_config_table_names(
             args.config_tables_base_dir
         )
         table_names_dict = create_simple_view_mapping_from_view_list(args.dataset, table_names)
-        delete_views_or_tables(client, table_names_dict)
+        delete_views_or_tables(client, table_names_dict, max_workers=args.jobs)
 
 
 SUB_COMMANDS: List[SubCommand] = [
@@ -489,7 +970,10 @@ SUB_COMMANDS: List[SubCommand] = [
     GetViewsSubCommand(),
     SortViewListSubCommand(),
     CreateOrReplaceConfigTablesSubCommand(),
+    ValidateConfigTablesSubCommand(),
     DeleteConfigTablesSubCommand(),
+    DeploySubCommand(),
+    WatchSubCommand(),
 ]
 
 SUB_COMMAND_BY_NAME: Dict[str, SubCommand] = {
@@ -502,6 +986,19 @@ def add_common_arguments(parser: argparse.ArgumentParser):
         "--dataset", type=str, required=True, help="GCP BigQuery dataset"
     )
 
+    parser.add_argument(
+        "--graph-index-file",
+        "--template-cache-file",
+        dest="graph_index_file",
+        type=str,
+        help=(
+            "Path to the dependency graph index (json), recording the table references"
+            " of view templates and the references between views"
+            " (defaults to a file next to the view list config,"
+            " not used by sub commands without a view list config)"
+        ),
+    )
+
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
 
 
@@ -520,10 +1017,41 @@ def parse_args(argv=None) -> argparse.Namespace:
     return parser.parse_args(argv)
 
 
+def get_bigquery_client() -> 'bigquery.Client':
+    from google.cloud import bigquery
+    return bigquery.Client()
+
+
+def create_client() -> 'bigquery.Client':
+    from .caching_client import CachingClient
+    return CachingClient(get_bigquery_client())
+
+
+def get_graph_index_file_for_args(args: argparse.Namespace) -> Optional[str]:
+    view_list_config_path = getattr(args, "view_list_config", None)
+    if not view_list_config_path or getattr(args, "no_graph_index", False):
+        return None
+    return args.graph_index_file or str(get_graph_index_file(view_list_config_path))
+
+
 def run(args: argparse.Namespace):
     sub_command = SUB_COMMAND_BY_NAME[args.command]
-    client = bigquery.Client()
-    sub_command.run(client, args)
+    client = create_client() if sub_command.requires_client else None
+    graph_index_file = get_graph_index_file_for_args(args)
+    graph_index = None
+    if graph_index_file:
+        graph_index = load_graph_index_for_view_list_config(
+            args.view_list_config, graph_index_file
+        )
+    try:
+        sub_command.run(client, args)
+        if graph_index_file and sub_command.updates_graph_index:
+            update_graph_index_for_view_list_config(
+                args.view_list_config, graph_index_file, previous_graph_index=graph_index
+            )
+    finally:
+        if client is not None:
+            client.log_api_call_summary()
 
 
 def main(argv=None):
@@ -0,0 +1,403 @@
+import csv
+import gzip
+import importlib
+import io
+import logging
+import re
+import shutil
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import (
+    TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+)
+
+if TYPE_CHECKING:
+    from google.cloud.bigquery.schema import SchemaField
+
+
+LOGGER = logging.getLogger(__name__)
+
+CSV_UPLOAD_FORMAT = "csv"
+GZIP_UPLOAD_FORMAT = "gzip"
+PARQUET_UPLOAD_FORMAT = "parquet"
+AVRO_UPLOAD_FORMAT = "avro"
+
+UPLOAD_FORMATS = [
+    CSV_UPLOAD_FORMAT,
+    GZIP_UPLOAD_FORMAT,
+    PARQUET_UPLOAD_FORMAT,
+    AVRO_UPLOAD_FORMAT
+]
+
+SOURCE_FORMAT_BY_UPLOAD_FORMAT = {
+    CSV_UPLOAD_FORMAT: "CSV",
+    GZIP_UPLOAD_FORMAT: "CSV",
+    PARQUET_UPLOAD_FORMAT: "PARQUET",
+    AVRO_UPLOAD_FORMAT: "AVRO"
+}
+
+COPY_CHUNK_SIZE = 1024 * 1024
+DEFAULT_ROW_BATCH_SIZE = 10000
+
+BOOLEAN_VALUE_BY_CSV_VALUE = {
+    value: True for value in ['true', 't', 'yes', 'y', '1']
+} | {
+    value: False for value in ['false', 'f', 'no', 'n', '0']
+}
+
+
+def parse_csv_boolean(value: str) -> bool:
+    try:
+        return BOOLEAN_VALUE_BY_CSV_VALUE[value.lower()]
+    except KeyError as exc:
+        raise ValueError(f'invalid boolean: {repr(value)}') from exc
+
+
+# patterns of BigQuery's CSV literals, which (unlike Python's int, float and fromisoformat)
+# neither allow underscores or surrounding whitespace, nor restrict the fractional seconds
+CSV_INTEGER_PATTERN = re.compile(r'[+-]?\d+')
+CSV_DECIMAL_PATTERN = re.compile(r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?')
+CSV_FLOAT_SPECIAL_PATTERN = re.compile(r'[+-]?(?:inf|infinity|nan)', re.IGNORECASE)
+CSV_TIME_PATTERN_STR = r'(\d{1,2}):(\d{1,2})(?::(\d{1,2})(?:\.(\d{1,6}))?)?'
+CSV_TIME_PATTERN = re.compile(CSV_TIME_PATTERN_STR)
+CSV_DATETIME_PATTERN = re.compile(
+    r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T]' + CSV_TIME_PATTERN_STR + ')?'
+)
+
+
+def parse_csv_integer(value: str) -> int:
+    if not CSV_INTEGER_PATTERN.fullmatch(value):
+        raise ValueError(f'invalid integer: {repr(value)}')
+    return int(value)
+
+
+def parse_csv_float(value: str) -> float:
+    if not (
+        CSV_DECIMAL_PATTERN.fullmatch(value)
+        or CSV_FLOAT_SPECIAL_PATTERN.fullmatch(value)
+    ):
+        raise ValueError(f'invalid float: {repr(value)}')
+    return float(value)
+
+
+# parsers for field types whose CSV representation can be converted without ambiguity
+CSV_VALUE_PARSER_BY_FIELD_TYPE: Dict[str, Callable[[str], object]] = {
+    'STRING': str,
+    'INTEGER': parse_csv_integer,
+    'INT64': parse_csv_integer,
+    'FLOAT': parse_csv_float,
+    'FLOAT64': parse_csv_float,
+    'BOOLEAN': parse_csv_boolean,
+    'BOOL': parse_csv_boolean,
+    'DATE': date.fromisoformat
+}
+
+
+def parse_csv_decimal(value: str) -> Decimal:
+    if not CSV_DECIMAL_PATTERN.fullmatch(value):
+        raise ValueError(f'invalid numeric: {repr(value)}')
+    try:
+        return Decimal(value)
+    except InvalidOperation as exc:
+        raise ValueError(f'invalid numeric: {repr(value)}') from exc
+
+
+def _get_microsecond(fraction: Optional[str]) -> int:
+    return int((fraction or '').ljust(6, '0'))
+
+
+def parse_csv_time(value: str) -> time:
+    m = CSV_TIME_PATTERN.fullmatch(value)
+    if not m:
+        raise ValueError(f'invalid time: {repr(value)}')
+    hour, minute, second, fraction = m.groups()
+    return time(int(hour), int(minute), int(second or 0), _get_microsecond(fraction))
+
+
+def parse_csv_datetime(value: str) -> datetime:
+    m = CSV_DATETIME_PATTERN.fullmatch(value)
+    if not m:
+        raise ValueError(f'invalid datetime: {repr(value)}')
+    year, month, day, hour, minute, second, fraction = m.groups()
+    return datetime(
+        int(year), int(month), int(day),
+        int(hour or 0), int(minute or 0), int(second or 0),
+        _get_microsecond(fraction)
+    )
+
+
+# additional field types that can be checked but are not converted for typed upload formats
+CSV_VALUE_VALIDATOR_BY_FIELD_TYPE: Dict[str, Callable[[str], object]] = {
+    **CSV_VALUE_PARSER_BY_FIELD_TYPE,
+    'NUMERIC': parse_csv_decimal,
+    'BIGNUMERIC': parse_csv_decimal,
+    'DATETIME': parse_csv_datetime,
+    'TIME': parse_csv_time
+}
+
+PARQUET_TYPE_NAME_BY_FIELD_TYPE = {
+    'STRING': 'string',
+    'INTEGER': 'int64',
+    'INT64': 'int64',
+    'FLOAT': 'float64',
+    'FLOAT64': 'float64',
+    'BOOLEAN': 'bool_',
+    'BOOL': 'bool_',
+    'DATE': 'date32'
+}
+
+AVRO_TYPE_BY_FIELD_TYPE = {
+    'STRING': 'string',
+    'INTEGER': 'long',
+    'INT64': 'long',
+    'FLOAT': 'double',
+    'FLOAT64': 'double',
+    'BOOLEAN': 'boolean',
+    'BOOL': 'boolean',
+    'DATE': {'type': 'int', 'logicalType': 'date'}
+}
+
+
+def is_schema_supported_for_typed_upload_format(schema: Optional[Sequence['SchemaField']]) -> bool:
+    return bool(schema) and all(
+        field.field_type in CSV_VALUE_PARSER_BY_FIELD_TYPE and field.mode != 'REPEATED'
+        for field in schema
+    )
+
+
+def get_effective_upload_format(
+        upload_format: str,
+        schema: Optional[Sequence['SchemaField']]) -> str:
+    if upload_format not in UPLOAD_FORMATS:
+        raise ValueError(f'unsupported upload format: {upload_format}')
+    if (
+        upload_format in {PARQUET_UPLOAD_FORMAT, AVRO_UPLOAD_FORMAT}
+        and not is_schema_supported_for_typed_upload_format(schema)
+    ):
+        LOGGER.info(
+            'schema missing or not supported for %s, using %s instead',
+            upload_format, GZIP_UPLOAD_FORMAT
+        )
+        return GZIP_UPLOAD_FORMAT
+    return upload_format
+
+
+def parse_csv_value(value: str, field: 'SchemaField'):
+    # an empty value is treated as null, as BigQuery does for CSV by default
+    if value == '':
+        if field.mode == 'REQUIRED':
+            raise ValueError(f'missing value for required field: {field.name}')
+        return None
+    return CSV_VALUE_PARSER_BY_FIELD_TYPE[field.field_type](value)
+
+
+def iter_typed_csv_rows(
+        text_fp: Iterable[str],
+        schema: Sequence['SchemaField']) -> Iterator[List[object]]:
+    reader = csv.reader(text_fp)
+    next(reader, None)  # skip header
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(schema):
+            raise ValueError(
+                f'expected {len(schema)} columns but found {len(row)}'
+                f' (line {reader.line_num})'
+            )
+        try:
+            yield [parse_csv_value(value, field) for value, field in zip(row, schema)]
+        except ValueError as exc:
+            raise ValueError(f'{exc} (line {reader.line_num})') from exc
+
+
+@dataclass(frozen=True)
+class ConfigTableValidationIssue:
+    line_number: int
+    column_name: Optional[str]
+    message: str
+
+    def __str__(self):
+        if self.column_name is None:
+            return f'line {self.line_number}: {self.message}'
+        return f'line {self.line_number}, column {self.column_name}: {self.message}'
+
+
+class ConfigTableValidationError(ValueError):
+    def __init__(self, source_file: str, issues: Sequence[ConfigTableValidationIssue]):
+        super().__init__(
+            f'{len(issues)} invalid value(s) in {source_file}:\n'
+            + '\n'.join(str(issue) for issue in issues)
+        )
+        self.source_file = source_file
+        self.issues = issues
+
+
+def _get_csv_value_issue_message(value: str, field: 'SchemaField') -> Optional[str]:
+    if value == '':
+        if field.mode == 'REQUIRED':
+            return 'missing value for required field'
+        return None
+    validator = CSV_VALUE_VALIDATOR_BY_FIELD_TYPE.get(field.field_type)
+    if validator is None or field.mode == 'REPEATED':
+        return None
+    try:
+        validator(value)
+    except ValueError:
+        return f'invalid {field.field_type} value: {repr(value)}'
+    return None
+
+
+def iter_config_table_validation_issues(
+        text_fp: Iterable[str],
+        schema: Sequence['SchemaField']) -> Iterator[ConfigTableValidationIssue]:
+    """
+    Checks every row (after the header) against the schema, in a single pass.
+    Only the issues are kept, the rows themselves are not.
+    """
+    reader = csv.reader(text_fp)
+    try:
+        next(reader, None)  # skip header
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(schema):
+                yield ConfigTableValidationIssue(
+                    line_number=reader.line_num,
+                    column_name=None,
+                    message=f'expected {len(schema)} columns but found {len(row)}'
+                )
+                continue
+            for value, field in zip(row, schema):
+                message = _get_csv_value_issue_message(value, field)
+                if message is not None:
+                    yield ConfigTableValidationIssue(
+                        line_number=reader.line_num,
+                        column_name=field.name,
+                        message=message
+                    )
+    except (csv.Error, UnicodeDecodeError) as exc:
+        yield ConfigTableValidationIssue(
+            line_number=reader.line_num,
+            column_name=None,
+            message=f'invalid CSV: {exc}'
+        )
+
+
+def validate_config_table_csv_file(source_file: str, schema: Sequence['SchemaField']):
+    with open(source_file, encoding='utf-8', newline='') as text_fp:
+        issues = list(iter_config_table_validation_issues(text_fp, schema))
+    if issues:
+        raise ConfigTableValidationError(str(source_file), issues)
+
+
+def iter_batches(rows: Iterable[List[object]], batch_size: int) -> Iterator[List[List[object]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_gzip_csv(source_fp: BinaryIO, target_fp: BinaryIO):
+    with gzip.GzipFile(fileobj=target_fp, mode='wb') as gzip_fp:
+        shutil.copyfileobj(source_fp, gzip_fp, COPY_CHUNK_SIZE)
+
+
+def _import_optional_module(module_name: str, upload_format: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as exc:
+        raise ImportError(
+            f'the {upload_format} upload format requires the optional {module_name} package'
+            f' (e.g. pip install bigquery-views-manager[{upload_format}])'
+        ) from exc
+
+
+def write_parquet(
+        source_fp: BinaryIO,
+        target_fp: BinaryIO,
+        schema: Sequence['SchemaField'],
+        batch_size: int = DEFAULT_ROW_BATCH_SIZE):
+    pyarrow = _import_optional_module('pyarrow', PARQUET_UPLOAD_FORMAT)
+    pyarrow_parquet = _import_optional_module('pyarrow.parquet', PARQUET_UPLOAD_FORMAT)
+
+    arrow_schema = pyarrow.schema([
+        pyarrow.field(
+            field.name,
+            getattr(pyarrow, PARQUET_TYPE_NAME_BY_FIELD_TYPE[field.field_type])(),
+            nullable=field.mode != 'REQUIRED'
+        )
+        for field in schema
+    ])
+    text_fp = io.TextIOWrapper(source_fp, encoding='utf-8', newline='')
+    with pyarrow_parquet.ParquetWriter(target_fp, arrow_schema) as writer:
+        for batch in iter_batches(iter_typed_csv_rows(text_fp, schema), batch_size):
+            writer.write_table(pyarrow.Table.from_arrays(
+                [
+                    pyarrow.array([row[index] for row in batch], type=arrow_field.type)
+                    for index, arrow_field in enumerate(arrow_schema)
+                ],
+                schema=arrow_schema
+            ))
+    text_fp.detach()
+
+
+def get_avro_schema(schema: Sequence['SchemaField']) -> dict:
+    return {
+        'type': 'record',
+        'name': 'config_table',
+        'fields': [
+            {
+                'name': field.name,
+                'type': (
+                    AVRO_TYPE_BY_FIELD_TYPE[field.field_type]
+                    if field.mode == 'REQUIRED'
+                    else ['null', AVRO_TYPE_BY_FIELD_TYPE[field.field_type]]
+                )
+            }
+            for field in schema
+        ]
+    }
+
+
+def write_avro(
+        source_fp: BinaryIO,
+        target_fp: BinaryIO,
+        schema: Sequence['SchemaField']):
+    fastavro = _import_optional_module('fastavro', AVRO_UPLOAD_FORMAT)
+
+    field_names = [field.name for field in schema]
+    text_fp = io.TextIOWrapper(source_fp, encoding='utf-8', newline='')
+    fastavro.writer(
+        target_fp,
+        fastavro.parse_schema(get_avro_schema(schema)),
+        (
+            dict(zip(field_names, row))
+            for row in iter_typed_csv_rows(text_fp, schema)
+        ),
+        codec='deflate'
+    )
+    text_fp.detach()
+
+
+def write_config_table_upload_file(
+        source_fp: BinaryIO,
+        target_fp: BinaryIO,
+        upload_format: str,
+        schema: Optional[Sequence['SchemaField']]):
+    """
+    Transcodes the CSV (including the header row) to the upload format, one chunk at a time.
+    upload_format should already be the effective upload format.
+    """
+    if upload_format == GZIP_UPLOAD_FORMAT:
+        write_gzip_csv(source_fp, target_fp)
+    elif upload_format == PARQUET_UPLOAD_FORMAT:
+        write_parquet(source_fp, target_fp, schema)
+    elif upload_format == AVRO_UPLOAD_FORMAT:
+        write_avro(source_fp, target_fp, schema)
+    else:
+        shutil.copyfileobj(source_fp, target_fp, COPY_CHUNK_SIZE)
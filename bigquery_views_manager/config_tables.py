@@ -1,17 +1,77 @@
+import hashlib
 import logging
 import json
+import tempfile
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Sequence
 
 from google.cloud import bigquery
 from google.cloud.bigquery.job import LoadJobConfig
 from google.cloud.bigquery.schema import SchemaField
+from google.cloud.exceptions import NotFound
+
+from .config_table_formats import (
+    CSV_UPLOAD_FORMAT,
+    SOURCE_FORMAT_BY_UPLOAD_FORMAT,
+    get_effective_upload_format,
+    validate_config_table_csv_file,
+    write_config_table_upload_file
+)
+from .defaults import DEFAULT_CONFIG_TABLES_MAX_WORKERS
+from .scheduler import run_concurrently
 
 LOGGER = logging.getLogger(__name__)
 
 CONFIG_TABLES_DIR = "tables"
 CONFIG_TABLES_SCHEMA_DIR = "schema"
 
+CONTENT_HASH_LABEL_KEY = "config_table_content_hash"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ConfigTableResult:
+    table_name: str
+    duration: float
+    input_file_bytes: Optional[int] = None
+    output_rows: Optional[int] = None
+    content_hash: Optional[str] = None
+    skipped: bool = False
+    error: Optional[Exception] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+@dataclass(frozen=True)
+class ConfigTableListResult:
+    result_list: Sequence[ConfigTableResult]
+
+    def __bool__(self):
+        return bool(self.result_list)
+
+    @property
+    def failed_result_list(self) -> Sequence[ConfigTableResult]:
+        return [result for result in self.result_list if result.failed]
+
+    @property
+    def skipped_result_list(self) -> Sequence[ConfigTableResult]:
+        return [result for result in self.result_list if result.skipped]
+
+    @property
+    def total_input_file_bytes(self) -> int:
+        return sum(result.input_file_bytes or 0 for result in self.result_list)
+
+
+class ConfigTablesError(RuntimeError):
+    def __init__(self, message: str, list_result: ConfigTableListResult):
+        super().__init__(message)
+        self.list_result = list_result
+
 
 def get_local_config_table_names(base_dir: str) -> List[str]:
     return [
@@ -39,48 +99,282 @@ def get_table_schema(source_schema_file: str) -> List:
     return schema
 
 
-def update_or_create_table_from_csv(
+def _get_file_digest(filename: str) -> bytes:
+    hasher = hashlib.blake2b(digest_size=16)
+    with Path(filename).open("rb") as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+def get_config_table_content_hash(source_file: str, source_schema_file: str) -> str:
+    """
+    Returns a hash of the CSV file and the schema file (if it exists),
+    reading the files in chunks. The hash is short enough to be used as a label value.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(_get_file_digest(source_file))
+    if Path(source_schema_file).exists():
+        hasher.update(_get_file_digest(source_schema_file))
+    return hasher.hexdigest()
+
+
+def get_content_hash_by_table_name_map(client: bigquery.Client, dataset: str) -> Dict[str, str]:
+    try:
+        return {
+            table_item.table_id: (table_item.labels or {}).get(CONTENT_HASH_LABEL_KEY)
+            for table_item in client.list_tables(dataset=dataset)
+        }
+    except NotFound:
+        LOGGER.info("dataset not found: %s", dataset)
+        return {}
+
+
+def _load_table_from_upload_file(  # pylint: disable=too-many-arguments
+        client: bigquery.Client,
+        source_file: str,
+        table_ref: bigquery.TableReference,
+        job_config: LoadJobConfig,
+        upload_format: str,
+        schema: Optional[List[SchemaField]]):
+    with open(source_file, "rb") as source_fp:
+        if upload_format == CSV_UPLOAD_FORMAT:
+            return client.load_table_from_file(source_fp,
+                                               destination=table_ref,
+                                               job_config=job_config)
+        with tempfile.TemporaryFile() as upload_fp:
+            write_config_table_upload_file(source_fp, upload_fp, upload_format, schema)
+            LOGGER.debug(
+                "transcoded %s to %s (%d bytes)",
+                source_file, upload_format, upload_fp.tell()
+            )
+            upload_fp.seek(0)
+            return client.load_table_from_file(upload_fp,
+                                               destination=table_ref,
+                                               job_config=job_config)
+
+
+def _get_load_job_config(
+        schema: Optional[List[SchemaField]],
+        upload_format: str) -> LoadJobConfig:
+    job_config = LoadJobConfig()
+    if schema is not None:
+        job_config.schema = schema
+    else:
+        job_config.autodetect = True
+    job_config.source_format = SOURCE_FORMAT_BY_UPLOAD_FORMAT[upload_format]
+    if job_config.source_format == "CSV":
+        job_config.skip_leading_rows = 1
+    elif job_config.source_format == "AVRO":
+        job_config.use_avro_logical_types = True
+    job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+    return job_config
+
+
+def update_or_create_table_from_csv(  # pylint: disable=too-many-arguments
         client: bigquery.Client,
         table_name: str,
         source_file: str,
         dataset: str,
         source_schema_file: str,
-):
+        content_hash: Optional[str] = None,
+        upload_format: str = CSV_UPLOAD_FORMAT,
+        validate: bool = True
+) -> ConfigTableResult:
     LOGGER.debug("update_or_create_table_from_csv: %s=%s", table_name,
                  [source_file])
+    start = time.perf_counter()
     dataset_ref = client.dataset(dataset)
     table_ref = dataset_ref.table(table_name)
 
-    job_config = LoadJobConfig()
-    job_config.source_format = "CSV"
-    job_config.skip_leading_rows = 1
+    schema = None
     if Path(source_schema_file).exists():
-        job_config.schema = get_table_schema(source_schema_file)
-    else:
-        job_config.autodetect = True
-    job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+        schema = get_table_schema(source_schema_file)
+        if validate:
+            # refuse the upload, rather than waiting for the load job to fail
+            validate_config_table_csv_file(source_file, schema)
+    upload_format = get_effective_upload_format(upload_format, schema)
 
-    with open(source_file, "rb") as source_fp:
-        load_job = client.load_table_from_file(source_fp,
-                                               destination=table_ref,
-                                               job_config=job_config)
+    load_job = _load_table_from_upload_file(
+        client, source_file, table_ref, _get_load_job_config(schema, upload_format),
+        upload_format=upload_format,
+        schema=schema
+    )
 
     # wait for job to complete
     load_job.result()
 
-    LOGGER.info("updated config table: %s", table_ref.table_id)
+    if content_hash is not None:
+        table = bigquery.Table(table_ref)
+        table.labels = {CONTENT_HASH_LABEL_KEY: content_hash}
+        client.update_table(table, ["labels"])
+
+    duration = time.perf_counter() - start
+    LOGGER.info(
+        "updated config table: %s (%s bytes, took: %.3fs)",
+        table_ref.table_id, load_job.input_file_bytes, duration
+    )
+    return ConfigTableResult(
+        table_name=table_name,
+        duration=duration,
+        input_file_bytes=load_job.input_file_bytes,
+        output_rows=load_job.output_rows,
+        content_hash=content_hash
+    )
+
+
+def _format_config_table_result(result: ConfigTableResult) -> str:
+    if result.failed:
+        return f"{result.table_name}: failed after {result.duration:.3f}s: {result.error}"
+    if result.skipped:
+        return f"{result.table_name}: unchanged (skipped)"
+    if result.output_rows is None:
+        return f"{result.table_name}: {result.input_file_bytes} bytes, {result.duration:.3f}s"
+    return (
+        f"{result.table_name}: {result.input_file_bytes} bytes,"
+        f" {result.output_rows} rows, {result.duration:.3f}s"
+    )
+
+
+def format_config_table_list_result(list_result: ConfigTableListResult) -> str:
+    lines = [_format_config_table_result(result) for result in list_result.result_list]
+    lines.append(
+        f"total: {len(list_result.result_list)} tables"
+        f" ({len(list_result.skipped_result_list)} skipped,"
+        f" {len(list_result.failed_result_list)} failed),"
+        f" {list_result.total_input_file_bytes} bytes"
+    )
+    return "\n".join(lines)
 
 
-def update_or_create_config_tables(client: bigquery.Client, base_dir: str,
-                                   config_table_names: List[str],
-                                   dataset: str):
+def update_or_create_config_table(  # pylint: disable=too-many-arguments
+        client: bigquery.Client,
+        base_dir: str,
+        config_table_name: str,
+        dataset: str,
+        remote_content_hash_by_table_name: Dict[str, str],
+        upload_format: str = CSV_UPLOAD_FORMAT,
+        validate: bool = True
+) -> ConfigTableResult:
+    start = time.perf_counter()
+    source_file = get_config_table_file(base_dir, config_table_name)
+    source_schema_file = get_config_table_schema_file(base_dir, config_table_name)
+    content_hash = get_config_table_content_hash(source_file, source_schema_file)
+    if remote_content_hash_by_table_name.get(config_table_name) == content_hash:
+        LOGGER.info("skipping unchanged config table: %s", config_table_name)
+        return ConfigTableResult(
+            table_name=config_table_name,
+            duration=time.perf_counter() - start,
+            content_hash=content_hash,
+            skipped=True
+        )
+    return update_or_create_table_from_csv(
+        client,
+        config_table_name,
+        source_file,
+        dataset=dataset,
+        source_schema_file=source_schema_file,
+        content_hash=content_hash,
+        upload_format=upload_format,
+        validate=validate
+    )
+
+
+def update_or_create_config_tables(  # pylint: disable=too-many-arguments
+        client: bigquery.Client,
+        base_dir: str,
+        config_table_names: List[str],
+        dataset: str,
+        max_workers: int = DEFAULT_CONFIG_TABLES_MAX_WORKERS,
+        force: bool = False,
+        upload_format: str = CSV_UPLOAD_FORMAT,
+        validate: bool = True
+) -> ConfigTableListResult:
     LOGGER.info("config_table_names: %s", config_table_names)
-    for config_table_name in config_table_names:
-        update_or_create_table_from_csv(
-            client,
-            config_table_name,
-            get_config_table_file(base_dir, config_table_name),
-            dataset=dataset,
-            source_schema_file=get_config_table_schema_file(
-                base_dir, config_table_name),
+    remote_content_hash_by_table_name = (
+        {} if force else get_content_hash_by_table_name_map(client, dataset)
+    )
+
+    def _update_or_create_config_table(config_table_name: str) -> ConfigTableResult:
+        start = time.perf_counter()
+        try:
+            return update_or_create_config_table(
+                client,
+                base_dir,
+                config_table_name,
+                dataset=dataset,
+                remote_content_hash_by_table_name=remote_content_hash_by_table_name,
+                upload_format=upload_format,
+                validate=validate
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            LOGGER.warning("failed to update config table %s: %s", config_table_name, exc)
+            return ConfigTableResult(
+                table_name=config_table_name,
+                duration=time.perf_counter() - start,
+                error=exc
+            )
+
+    list_result = ConfigTableListResult(result_list=run_concurrently(
+        _update_or_create_config_table,
+        config_table_names,
+        max_workers=max_workers
+    ))
+    LOGGER.info("config tables summary:\n%s", format_config_table_list_result(list_result))
+    if list_result.failed_result_list:
+        raise ConfigTablesError(
+            "failed to update config tables: " + ", ".join(
+                result.table_name for result in list_result.failed_result_list
+            ),
+            list_result=list_result
+        )
+    return list_result
+
+
+def validate_config_tables(
+        base_dir: str,
+        config_table_names: List[str],
+        max_workers: int = DEFAULT_CONFIG_TABLES_MAX_WORKERS
+) -> ConfigTableListResult:
+    LOGGER.info("validating config_table_names: %s", config_table_names)
+
+    def _validate_config_table(config_table_name: str) -> ConfigTableResult:
+        start = time.perf_counter()
+        source_file = get_config_table_file(base_dir, config_table_name)
+        source_schema_file = get_config_table_schema_file(base_dir, config_table_name)
+        try:
+            if Path(source_schema_file).exists():
+                validate_config_table_csv_file(
+                    source_file, get_table_schema(source_schema_file)
+                )
+            else:
+                LOGGER.info("no schema, not validating config table: %s", config_table_name)
+        except Exception as exc:  # pylint: disable=broad-except
+            LOGGER.warning("invalid config table %s: %s", config_table_name, exc)
+            return ConfigTableResult(
+                table_name=config_table_name,
+                duration=time.perf_counter() - start,
+                error=exc
+            )
+        return ConfigTableResult(
+            table_name=config_table_name,
+            duration=time.perf_counter() - start,
+            input_file_bytes=Path(source_file).stat().st_size
+        )
+
+    list_result = ConfigTableListResult(result_list=run_concurrently(
+        _validate_config_table,
+        config_table_names,
+        max_workers=max_workers
+    ))
+    LOGGER.info("config tables validation summary:\n%s", format_config_table_list_result(
+        list_result
+    ))
+    if list_result.failed_result_list:
+        raise ConfigTablesError(
+            "invalid config tables: " + ", ".join(
+                result.table_name for result in list_result.failed_result_list
+            ),
+            list_result=list_result
         )
+    return list_result
@@ -0,0 +1,11 @@
+# defaults shared by the cli and the sub command modules
+# (kept free of heavy imports, as the cli imports sub command modules lazily)
+
+DEFAULT_DELETE_MAX_WORKERS = 10
+
+DEFAULT_CONFIG_TABLES_MAX_WORKERS = 10
+
+# on-demand price in USD per TiB scanned (the actual price may depend on the region)
+DEFAULT_ON_DEMAND_PRICE_PER_TIB = 6.25
+
+DEFAULT_POLL_INTERVAL = 0.5
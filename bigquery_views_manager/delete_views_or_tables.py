@@ -1,8 +1,12 @@
 import logging
 from collections import OrderedDict
+from typing import Set
+
 from google.cloud.exceptions import NotFound
 from google.cloud import bigquery
 
+from .defaults import DEFAULT_DELETE_MAX_WORKERS
+from .scheduler import run_concurrently
 from .view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
 
 LOGGER = logging.getLogger(__name__)
@@ -32,23 +36,56 @@ def delete_views_or_table(client: bigquery.Client, view_or_table_name: str,
     LOGGER.debug("delete_views_or_tables: %s", view_or_table_name)
     dataset_ref = client.dataset(dataset)
     table_ref = dataset_ref.table(view_or_table_name)
-    client.delete_table(table_ref)
+    client.delete_table(table_ref, not_found_ok=True)
     LOGGER.info("deleted view or table: %s", view_or_table_name)
 
 
+def _get_existing_table_names_or_empty(client: bigquery.Client, dataset: str) -> Set[str]:
+    try:
+        return set(_get_existing_table_names(client, dataset))
+    except NotFound:
+        LOGGER.info("dataset not found: %s", dataset)
+        return set()
+
+
 def delete_views_or_tables(client: bigquery.Client,
-                           view_template_to_table_name_mapping: OrderedDict):
+                           view_template_to_table_name_mapping: OrderedDict,
+                           max_workers: int = DEFAULT_DELETE_MAX_WORKERS):
     LOGGER.debug("delete_views_or_tables: %s",
                  view_template_to_table_name_mapping)
-    for _, dataset_view_or_table_data in view_template_to_table_name_mapping.items():
-        if does_bigquery_table_exist(
-                client,
-                table_name=dataset_view_or_table_data.get(
-                    VIEW_OR_TABLE_NAME_KEY),
-                dataset_name=dataset_view_or_table_data.get(DATASET_NAME_KEY),
-        ):
-            delete_views_or_table(
-                client,
-                dataset_view_or_table_data.get(VIEW_OR_TABLE_NAME_KEY),
-                dataset=dataset_view_or_table_data.get(DATASET_NAME_KEY),
-            )
+    dataset_and_table_names = [
+        (
+            dataset_view_or_table_data.get(DATASET_NAME_KEY),
+            dataset_view_or_table_data.get(VIEW_OR_TABLE_NAME_KEY)
+        )
+        for dataset_view_or_table_data in view_template_to_table_name_mapping.values()
+    ]
+    dataset_names = list(OrderedDict.fromkeys(
+        dataset_name for dataset_name, _ in dataset_and_table_names
+    ))
+    existing_table_names_by_dataset_name = dict(zip(
+        dataset_names,
+        run_concurrently(
+            lambda dataset_name: _get_existing_table_names_or_empty(client, dataset_name),
+            dataset_names,
+            max_workers=max_workers
+        )
+    ))
+    existing_dataset_and_table_names = [
+        (dataset_name, table_name)
+        for dataset_name, table_name in dataset_and_table_names
+        if table_name in existing_table_names_by_dataset_name[dataset_name]
+    ]
+    LOGGER.info(
+        "deleting %d existing views or tables (out of %d, max workers: %d)",
+        len(existing_dataset_and_table_names), len(dataset_and_table_names), max_workers
+    )
+    run_concurrently(
+        lambda dataset_and_table_name: delete_views_or_table(
+            client,
+            dataset_and_table_name[1],
+            dataset=dataset_and_table_name[0]
+        ),
+        existing_dataset_and_table_names,
+        max_workers=max_workers
+    )
@@ -0,0 +1,270 @@
+import logging
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from google.cloud import bigquery
+
+from .config_table_formats import CSV_UPLOAD_FORMAT
+from .config_tables import (
+    get_content_hash_by_table_name_map,
+    update_or_create_config_table
+)
+from .manifest import DeployManifest, ManifestEntry, get_query_hash
+from .materialize_views import TotalBytesBudget, materialize_view_within_budget
+from .scheduler import DEFAULT_MAX_WORKERS, run_with_dependencies
+from .update_views import update_or_create_view
+from .view_list import (
+    DATASET_NAME_KEY,
+    MAX_BYTES_BILLED_KEY,
+    VIEW_OR_TABLE_NAME_KEY,
+    get_dependency_level_by_name_in_insert_order,
+    get_referenced_table_names_by_view_name_map,
+    get_short_table_name
+)
+from .views import get_local_view_query
+
+LOGGER = logging.getLogger(__name__)
+
+CONFIG_TABLE_NODE_TYPE = "config_table"
+VIEW_NODE_TYPE = "view"
+MATERIALIZED_VIEW_NODE_TYPE = "materialized_view"
+
+
+@dataclass(frozen=True)
+class DeployNode:
+    node_type: str
+    name: str
+
+    def __str__(self):
+        return f"{self.node_type}:{self.name}"
+
+
+@dataclass(frozen=True)
+class DeployNodeResult:
+    node: DeployNode
+    duration: float
+    skipped: bool = False
+    budget_exceeded: bool = False
+
+
+@dataclass(frozen=True)
+class DeployResult:
+    result_list: Sequence[DeployNodeResult]
+
+    def __bool__(self):
+        return bool(self.result_list)
+
+    @property
+    def skipped_result_list(self) -> Sequence[DeployNodeResult]:
+        return [result for result in self.result_list if result.skipped]
+
+    @property
+    def budget_exceeded_result_list(self) -> Sequence[DeployNodeResult]:
+        return [result for result in self.result_list if result.budget_exceeded]
+
+
+def get_deploy_dependencies_by_node_map(
+        config_table_names: List[str],
+        view_names_dict: OrderedDict,
+        materialized_view_names_dict: OrderedDict,
+        referenced_table_names_by_view_name: Dict[str, List[str]]
+) -> 'OrderedDict[DeployNode, List[DeployNode]]':
+    """
+    Returns the nodes to deploy (config tables first, then every view followed by its
+    materialization) together with the nodes they depend on.
+    A view only depends on the config tables, views and materialized tables it references.
+    References to materialized tables resolve to the materialization of the view,
+    if it is materialized as part of the deployment.
+    """
+    view_by_materialized_table_name = {
+        dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY): view_name
+        for view_name, dataset_view_data in materialized_view_names_dict.items()
+    }
+    config_table_name_set = set(config_table_names)
+
+    def _get_referenced_node(view_name: str, referenced_table_name: str) -> Optional[DeployNode]:
+        short_table_name = get_short_table_name(referenced_table_name)
+        materialized_view_name = view_by_materialized_table_name.get(short_table_name)
+        if materialized_view_name is not None and materialized_view_name != view_name:
+            return DeployNode(MATERIALIZED_VIEW_NODE_TYPE, materialized_view_name)
+        if short_table_name in view_names_dict and short_table_name != view_name:
+            return DeployNode(VIEW_NODE_TYPE, short_table_name)
+        if short_table_name in config_table_name_set:
+            return DeployNode(CONFIG_TABLE_NODE_TYPE, short_table_name)
+        return None
+
+    dependencies_by_node: 'OrderedDict[DeployNode, List[DeployNode]]' = OrderedDict()
+    for config_table_name in config_table_names:
+        dependencies_by_node[DeployNode(CONFIG_TABLE_NODE_TYPE, config_table_name)] = []
+    for view_name in view_names_dict.keys():
+        view_node = DeployNode(VIEW_NODE_TYPE, view_name)
+        dependencies_by_node[view_node] = list(OrderedDict.fromkeys(
+            node
+            for node in (
+                _get_referenced_node(view_name, referenced_table_name)
+                for referenced_table_name in referenced_table_names_by_view_name.get(
+                    view_name, []
+                )
+            )
+            if node is not None
+        ))
+        if view_name in materialized_view_names_dict:
+            dependencies_by_node[
+                DeployNode(MATERIALIZED_VIEW_NODE_TYPE, view_name)
+            ] = [view_node]
+    return dependencies_by_node
+
+
+def deploy(  # pylint: disable=too-many-arguments, too-many-locals
+        client: bigquery.Client,
+        base_dir: str,
+        config_tables_base_dir: str,
+        config_table_names: List[str],
+        view_names_dict: OrderedDict,
+        materialized_view_names_dict: OrderedDict,
+        project: str,
+        default_dataset: str,
+        view_to_dataset_mapping: dict,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        manifest: DeployManifest = None,
+        force: bool = False,
+        upload_format: str = CSV_UPLOAD_FORMAT,
+        validate: bool = True,
+        max_total_bytes: Optional[int] = None
+) -> DeployResult:
+    """
+    Deploys config tables (to the default dataset), views and materialized tables
+    as a single dependency graph, using at most max_workers concurrent jobs.
+    """
+    dependencies_by_node = get_deploy_dependencies_by_node_map(
+        config_table_names,
+        view_names_dict,
+        materialized_view_names_dict,
+        get_referenced_table_names_by_view_name_map(base_dir, view_names_dict)
+    )
+    # fail before deploying anything if the graph contains a cycle
+    get_dependency_level_by_name_in_insert_order(
+        [str(node) for node in dependencies_by_node.keys()],
+        {
+            str(node): [str(dependency) for dependency in dependencies]
+            for node, dependencies in dependencies_by_node.items()
+        }
+    )
+    LOGGER.info(
+        "deploying %d config tables, %d views and %d materialized views (max workers: %d)",
+        len(config_table_names), len(view_names_dict), len(materialized_view_names_dict),
+        max_workers
+    )
+
+    remote_content_hash_by_table_name = (
+        {} if force or not config_table_names
+        else get_content_hash_by_table_name_map(client, default_dataset)
+    )
+    view_query_by_view_name: Dict[str, str] = {}
+    budget = TotalBytesBudget(max_total_bytes) if max_total_bytes is not None else None
+    budget_exceeded_view_names = set()
+
+    def _get_view_query(view_name: str) -> str:
+        # every view is rendered once, before it is deployed and materialized
+        view_query = view_query_by_view_name.get(view_name)
+        if view_query is None:
+            view_query = get_local_view_query(
+                base_dir,
+                view_name,
+                project=project,
+                default_dataset=default_dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping,
+            )
+            view_query_by_view_name[view_name] = view_query
+        return view_query
+
+    def _deploy_config_table(config_table_name: str) -> bool:
+        result = update_or_create_config_table(
+            client,
+            config_tables_base_dir,
+            config_table_name,
+            dataset=default_dataset,
+            remote_content_hash_by_table_name=remote_content_hash_by_table_name,
+            upload_format=upload_format,
+            validate=validate
+        )
+        return result.skipped
+
+    def _deploy_view(view_name: str) -> bool:
+        dataset_view_data = view_names_dict[view_name]
+        update_or_create_view(
+            client,
+            dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY),
+            _get_view_query(view_name),
+            dataset=dataset_view_data.get(DATASET_NAME_KEY)
+        )
+        if manifest is not None:
+            manifest.set_view_entry(view_name, ManifestEntry(
+                query_hash=get_query_hash(_get_view_query(view_name)),
+                project=project,
+                dataset=dataset_view_data.get(DATASET_NAME_KEY),
+                table_name=dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+            ))
+        return False
+
+    def _deploy_materialized_view(view_name: str) -> bool:
+        dataset_view_data = materialized_view_names_dict[view_name]
+        result = materialize_view_within_budget(
+            client,
+            budget,
+            view_name,
+            source_view_name=view_names_dict[view_name].get(VIEW_OR_TABLE_NAME_KEY),
+            destination_table_name=dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY),
+            project=project,
+            destination_dataset=dataset_view_data.get(DATASET_NAME_KEY),
+            source_dataset=view_names_dict[view_name].get(DATASET_NAME_KEY),
+            max_bytes_billed=dataset_view_data.get(MAX_BYTES_BILLED_KEY),
+        )
+        if result is None:
+            budget_exceeded_view_names.add(view_name)
+            return True
+        if manifest is not None:
+            manifest.set_materialized_view_entry(view_name, ManifestEntry(
+                query_hash=get_query_hash(_get_view_query(view_name)),
+                project=project,
+                dataset=dataset_view_data.get(DATASET_NAME_KEY),
+                table_name=dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+            ))
+        return False
+
+    deploy_func_by_node_type = {
+        CONFIG_TABLE_NODE_TYPE: _deploy_config_table,
+        VIEW_NODE_TYPE: _deploy_view,
+        MATERIALIZED_VIEW_NODE_TYPE: _deploy_materialized_view
+    }
+
+    def _deploy_node(node: DeployNode) -> DeployNodeResult:
+        start = time.perf_counter()
+        skipped = deploy_func_by_node_type[node.node_type](node.name)
+        return DeployNodeResult(
+            node=node,
+            duration=time.perf_counter() - start,
+            skipped=skipped,
+            budget_exceeded=(
+                node.node_type == MATERIALIZED_VIEW_NODE_TYPE
+                and node.name in budget_exceeded_view_names
+            )
+        )
+
+    start = time.perf_counter()
+    result = DeployResult(result_list=list(run_with_dependencies(
+        _deploy_node,
+        dependencies_by_node.keys(),
+        dependencies_by_node,
+        max_workers=max_workers
+    ).values()))
+    LOGGER.info(
+        "deployed %s (skipped: %d, budget exceeded: %d), took: %.3fs",
+        dict(Counter(node_result.node.node_type for node_result in result.result_list)),
+        len(result.skipped_result_list),
+        len(result.budget_exceeded_result_list),
+        time.perf_counter() - start
+    )
+    return result
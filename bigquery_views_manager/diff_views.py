@@ -1,15 +1,21 @@
 import logging
 from difflib import context_diff
-from typing import List, Set, Iterable
+from typing import Dict, List, Optional, Set, Iterable
 from collections import OrderedDict
 import re
 
 from google.cloud import bigquery
+from google.cloud.exceptions import BadRequest, Forbidden, NotFound
 
 import crayons
 
-from .update_views import get_local_view_query
-from .views import get_bq_view_query, get_bq_view_names
+from .scheduler import DEFAULT_MAX_WORKERS, run_concurrently
+from .views import (
+    get_bq_view_query,
+    get_bq_view_query_by_view_name_map,
+    get_bq_view_names,
+    get_local_view_query
+)
 from .view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
 
 LOGGER = logging.getLogger(__name__)
@@ -68,6 +74,44 @@ def get_view_to_view_file(view_names: dict):
     return view_to_view_file
 
 
+def is_view_query_equal(local_view_query: str, remote_view_query: str) -> bool:
+    return re.sub(r"\s+", "", local_view_query) == re.sub(r"\s+", "", remote_view_query)
+
+
+def get_remote_view_query_by_view_name_map(
+        client: bigquery.Client,
+        dataset: str,
+        view_names: Set[str]
+) -> Dict[str, Optional[str]]:
+    """
+    Returns a map with all of the remote views of the dataset.
+    The view query will be present for remote views within view_names.
+    If the view definitions can't be queried (e.g. missing permissions, a missing dataset
+    or a different region), the views are retrieved individually instead.
+    """
+    try:
+        return get_bq_view_query_by_view_name_map(client, dataset=dataset)
+    except (Forbidden, NotFound, BadRequest) as exc:
+        LOGGER.warning(
+            'unable to query view definitions of %s, falling back to retrieving views: %s',
+            dataset,
+            exc
+        )
+    try:
+        bq_view_names = get_bq_view_names(client, dataset=dataset)
+    except NotFound:
+        LOGGER.info('dataset not found, no remote views: %s', dataset)
+        return {}
+    return {
+        view_name: (
+            get_bq_view_query(client, view_name, dataset=dataset)
+            if view_name in view_names
+            else None
+        )
+        for view_name in bq_view_names
+    }
+
+
 def get_diff_result(  # pylint: disable=too-many-arguments,too-many-locals
         client: bigquery.Client,
         base_dir: str,
@@ -75,6 +119,7 @@ def get_diff_result(  # pylint: disable=too-many-arguments,too-many-locals
         project: str,
         default_dataset: str,
         view_to_dataset_mapping: dict,
+        max_workers: int = DEFAULT_MAX_WORKERS,
 ):
     dataset_to_table_list = get_dataset_to_table_dict(view_names_dict)
     view_to_view_file = get_view_to_view_file(view_names_dict)
@@ -86,8 +131,19 @@ def get_diff_result(  # pylint: disable=too-many-arguments,too-many-locals
     remote_view_names = []
     changed_views: List[ChangedView] = []
 
-    for dataset, table_list in dataset_to_table_list.items():
-        bq_view_names = get_bq_view_names(client, dataset=dataset)
+    # the datasets are independent, retrieve them concurrently
+    remote_view_query_by_view_name_maps = run_concurrently(
+        lambda dataset: get_remote_view_query_by_view_name_map(
+            client,
+            dataset=dataset,
+            view_names=set(dataset_to_table_list[dataset])
+        ),
+        dataset_to_table_list.keys(),
+        max_workers=max_workers
+    )
+    for (dataset, table_list), remote_view_query_by_view_name in zip(
+            dataset_to_table_list.items(), remote_view_query_by_view_name_maps):
+        bq_view_names = list(remote_view_query_by_view_name.keys())
         remote_view_names.extend([dataset + "." + x for x in bq_view_names])
         remote_and_local_views = set(bq_view_names) & set(table_list)
         for view_name in remote_and_local_views:
@@ -99,11 +155,8 @@ def get_diff_result(  # pylint: disable=too-many-arguments,too-many-locals
                 default_dataset=default_dataset,
                 view_to_dataset_mapping=view_to_dataset_mapping,
             )
-            bq_view_query = get_bq_view_query(client,
-                                              view_name,
-                                              dataset=dataset)
-            if re.sub(r"\s+", "",
-                      local_view_query) == re.sub(r"\s+", "", bq_view_query):
+            bq_view_query = remote_view_query_by_view_name[view_name]
+            if is_view_query_equal(local_view_query, bq_view_query):
                 unchanged_view_names.add(dataset + "." + view_name)
             else:
                 changed_views.append(
@@ -190,6 +243,7 @@ def diff_views(  # pylint: disable=too-many-arguments
         project: str,
         default_dataset: str,
         view_to_dataset_mapping: dict,
+        max_workers: int = DEFAULT_MAX_WORKERS,
 ):
     LOGGER.debug("view_names: %s", view_names_dict)
     diff_result = get_diff_result(
@@ -199,6 +253,7 @@ def diff_views(  # pylint: disable=too-many-arguments
         project=project,
         default_dataset=default_dataset,
         view_to_dataset_mapping=view_to_dataset_mapping,
+        max_workers=max_workers,
     )
     LOGGER.info("diff_result:\n%s", format_diff_result(diff_result))
     return diff_result.changed_views
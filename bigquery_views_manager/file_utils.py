@@ -0,0 +1,19 @@
+import os
+import uuid
+from pathlib import Path
+
+
+def write_text_atomically(filename: str, text: str):
+    """
+    Writes the text to a temporary file next to the target file first and then renames it,
+    so that the target file is never left partially written.
+    """
+    path = Path(filename)
+    temp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        temp_path.write_text(text, encoding='utf-8')
+        os.replace(temp_path, path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
@@ -1,8 +1,10 @@
 import logging
+import time
 from collections import OrderedDict
 
 from google.cloud import bigquery
 
+from .scheduler import DEFAULT_MAX_WORKERS, run_concurrently
 from .views import get_bq_view_query, get_view_template_file
 from .view_template import ViewTemplate
 from .view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
@@ -33,17 +35,28 @@ def get_views(
         base_dir: str,
         view_names_ordered_dict: OrderedDict,
         project: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
 ):
     LOGGER.debug("view_names: %s", view_names_ordered_dict)
-    for (
-            view_template_name,
-            dataset_table_or_view_data,
-    ) in view_names_ordered_dict.items():
-        get_view(
+    if not view_names_ordered_dict:
+        return
+    start = time.perf_counter()
+    run_concurrently(
+        lambda view_template_name: get_view(
             client,
             base_dir,
-            dataset_table_or_view_data.get(VIEW_OR_TABLE_NAME_KEY),
+            view_names_ordered_dict[view_template_name].get(VIEW_OR_TABLE_NAME_KEY),
             view_template_name,
             project=project,
-            dataset=dataset_table_or_view_data.get(DATASET_NAME_KEY),
-        )
+            dataset=view_names_ordered_dict[view_template_name].get(DATASET_NAME_KEY),
+        ),
+        view_names_ordered_dict.keys(),
+        max_workers=max_workers
+    )
+    duration = time.perf_counter() - start
+    LOGGER.info(
+        'retrieved views, number of views: %d, took: %.3fs (%.1f views / second)',
+        len(view_names_ordered_dict),
+        duration,
+        len(view_names_ordered_dict) / duration if duration else 0.0
+    )
@@ -0,0 +1,187 @@
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_utils import write_text_atomically
+from .template_repository import (
+    TemplateCacheEntry,
+    TemplateRepository,
+    ViewGraph,
+    get_template_repository
+)
+from .view_list import (
+    ViewListConfig,
+    build_view_graph,
+    load_view_list_config
+)
+from .views import get_view_template_file
+
+LOGGER = logging.getLogger(__name__)
+
+GRAPH_INDEX_VERSION = 2
+
+GRAPH_INDEX_FILE_SUFFIX = ".graph-index.json"
+
+
+def get_graph_index_file(view_list_config_path: str) -> Path:
+    path = Path(view_list_config_path)
+    return path.with_name(path.stem + GRAPH_INDEX_FILE_SUFFIX)
+
+
+@dataclass(frozen=True)
+class GraphIndex:
+    """
+    The view graph of a view list config, together with the hash and table references
+    of every view template (keyed by view name, so that the index can be committed
+    or cached alongside the view list config).
+    """
+    template_entry_by_view_name: Dict[str, TemplateCacheEntry]
+    view_graph: ViewGraph
+
+    @staticmethod
+    def from_value(value: dict) -> 'GraphIndex':
+        return GraphIndex(
+            template_entry_by_view_name={
+                view_name: TemplateCacheEntry.from_value(entry_value)
+                for view_name, entry_value in value['templates'].items()
+            },
+            view_graph=ViewGraph(
+                view_names=value['views'],
+                view_by_materialized_table_name=value['materialized'],
+                referenced_view_names_by_view_name=value['references'],
+                dependent_view_names_by_view_name=value['dependents']
+            )
+        )
+
+    def to_value(self) -> dict:
+        return {
+            'version': GRAPH_INDEX_VERSION,
+            'views': self.view_graph.view_names,
+            'templates': {
+                view_name: entry.to_value()
+                for view_name, entry in self.template_entry_by_view_name.items()
+            },
+            'references': self.view_graph.referenced_view_names_by_view_name,
+            'dependents': self.view_graph.dependent_view_names_by_view_name,
+            'materialized': self.view_graph.view_by_materialized_table_name
+        }
+
+
+def build_graph_index(
+        base_dir: str,
+        view_list_config: ViewListConfig,
+        template_repository: TemplateRepository = None) -> GraphIndex:
+    """
+    Builds the graph index, only parsing view templates the template repository
+    does not already know about (or which have changed). Views without a template are left out.
+    """
+    if template_repository is None:
+        template_repository = get_template_repository()
+    dummy_dataset = 'dummy_dataset'
+    views_ordered_dict = view_list_config.to_views_ordered_dict(dummy_dataset)
+    template_entry_by_view_name = {}
+    for view_name in views_ordered_dict.keys():
+        view_template_file = get_view_template_file(base_dir, view_name)
+        if not Path(view_template_file).exists():
+            LOGGER.debug('not indexing missing view template: %s', view_template_file)
+            continue
+        template_entry_by_view_name[view_name] = template_repository.get_entry(
+            view_template_file
+        )
+    return GraphIndex(
+        template_entry_by_view_name=template_entry_by_view_name,
+        view_graph=build_view_graph(
+            OrderedDict([
+                (view_name, dataset_view_data)
+                for view_name, dataset_view_data in views_ordered_dict.items()
+                if view_name in template_entry_by_view_name
+            ]),
+            {
+                view_name: entry.referenced_table_names
+                for view_name, entry in template_entry_by_view_name.items()
+            },
+            view_list_config.to_materialized_view_ordered_dict(dummy_dataset)
+        )
+    )
+
+
+def load_graph_index(graph_index_file: str) -> Optional[GraphIndex]:
+    if not Path(graph_index_file).exists():
+        LOGGER.info('graph index does not exist yet: %s', graph_index_file)
+        return None
+    try:
+        value = json.loads(Path(graph_index_file).read_text(encoding='utf-8'))
+        if value.get('version') != GRAPH_INDEX_VERSION:
+            LOGGER.info('ignoring graph index with different version: %s', graph_index_file)
+            return None
+        return GraphIndex.from_value(value)
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        LOGGER.warning('ignoring invalid graph index %s: %r', graph_index_file, exc)
+        return None
+
+
+def add_graph_index_to_template_repository(
+        graph_index: GraphIndex,
+        base_dir: str,
+        template_repository: TemplateRepository = None):
+    """
+    Adds the indexed view templates and view graph to the template repository,
+    so that only view templates whose content hash changed will be parsed again,
+    and the view graph is used while the references of the view templates are unchanged.
+    """
+    if template_repository is None:
+        template_repository = get_template_repository()
+    template_repository.add_view_graph(
+        graph_index.view_graph,
+        OrderedDict([
+            (str(get_view_template_file(base_dir, view_name)), entry)
+            for view_name, entry in graph_index.template_entry_by_view_name.items()
+        ])
+    )
+
+
+def save_graph_index(graph_index: GraphIndex, graph_index_file: str):
+    text = json.dumps(graph_index.to_value(), indent=2) + '\n'
+    path = Path(graph_index_file)
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        LOGGER.debug('graph index unchanged: %s', graph_index_file)
+        return
+    LOGGER.info('saving graph index to %s', graph_index_file)
+    write_text_atomically(graph_index_file, text)
+
+
+def load_graph_index_for_view_list_config(
+        view_list_config_path: str,
+        graph_index_file: str = None) -> Optional[GraphIndex]:
+    if graph_index_file is None:
+        graph_index_file = get_graph_index_file(view_list_config_path)
+    graph_index = load_graph_index(graph_index_file)
+    if graph_index is not None:
+        add_graph_index_to_template_repository(
+            graph_index, Path(view_list_config_path).parent
+        )
+    return graph_index
+
+
+def update_graph_index_for_view_list_config(
+        view_list_config_path: str,
+        graph_index_file: str = None,
+        previous_graph_index: GraphIndex = None):
+    """
+    Saves the graph index, unless it is the same as the previous (loaded) graph index.
+    """
+    if not Path(view_list_config_path).exists():
+        return
+    if graph_index_file is None:
+        graph_index_file = get_graph_index_file(view_list_config_path)
+    graph_index = build_graph_index(
+        Path(view_list_config_path).parent,
+        load_view_list_config(view_list_config_path)
+    )
+    if graph_index == previous_graph_index:
+        LOGGER.debug('graph index unchanged: %s', graph_index_file)
+        return
+    save_graph_index(graph_index, graph_index_file)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_utils import write_text_atomically
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+VIEWS_KEY = "views"
+MATERIALIZED_VIEWS_KEY = "materialized_views"
+
+
+def get_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    query_hash: str
+    project: str
+    dataset: str
+    table_name: str
+
+
+class DeployManifest:
+    """
+    Records per view (template name) the hash of the rendered query and the target table,
+    as of the last successful deployment.
+    """
+    def __init__(
+            self,
+            view_entries: Dict[str, ManifestEntry] = None,
+            materialized_view_entries: Dict[str, ManifestEntry] = None):
+        self.view_entries = dict(view_entries or {})
+        self.materialized_view_entries = dict(materialized_view_entries or {})
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            type(self).__name__
+            + f'(view_entries={repr(self.view_entries)}'
+            + f', materialized_view_entries={repr(self.materialized_view_entries)})'
+        )
+
+    @staticmethod
+    def from_value(value: dict) -> 'DeployManifest':
+        return DeployManifest(
+            view_entries={
+                view_name: ManifestEntry(**entry_value)
+                for view_name, entry_value in value.get(VIEWS_KEY, {}).items()
+            },
+            materialized_view_entries={
+                view_name: ManifestEntry(**entry_value)
+                for view_name, entry_value in value.get(MATERIALIZED_VIEWS_KEY, {}).items()
+            }
+        )
+
+    def to_value(self) -> dict:
+        with self._lock:
+            return {
+                'version': MANIFEST_VERSION,
+                VIEWS_KEY: {
+                    view_name: asdict(entry)
+                    for view_name, entry in sorted(self.view_entries.items())
+                },
+                MATERIALIZED_VIEWS_KEY: {
+                    view_name: asdict(entry)
+                    for view_name, entry in sorted(self.materialized_view_entries.items())
+                }
+            }
+
+    def get_view_entry(self, view_name: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self.view_entries.get(view_name)
+
+    def is_view_unchanged(self, view_name: str, entry: ManifestEntry) -> bool:
+        return self.get_view_entry(view_name) == entry
+
+    def set_view_entry(self, view_name: str, entry: ManifestEntry):
+        with self._lock:
+            self.view_entries[view_name] = entry
+
+    def set_materialized_view_entry(self, view_name: str, entry: ManifestEntry):
+        with self._lock:
+            self.materialized_view_entries[view_name] = entry
+
+
+def load_manifest(path: str) -> DeployManifest:
+    if not Path(path).exists():
+        LOGGER.info('manifest does not exist yet: %s', path)
+        return DeployManifest()
+    return DeployManifest.from_value(
+        json.loads(Path(path).read_text(encoding='utf-8'))
+    )
+
+
+def save_manifest(manifest: DeployManifest, path: str):
+    LOGGER.info('saving manifest to %s', path)
+    write_text_atomically(path, json.dumps(manifest.to_value(), indent=2) + '\n')
@@ -1,17 +1,32 @@
 import logging
+import threading
 import time
 from collections import OrderedDict
+from datetime import datetime, timezone
 from itertools import islice
 from dataclasses import dataclass
-from typing import Optional, Sequence
+from typing import Dict, List, Optional, Sequence
 
 from google.cloud import bigquery
 from google.cloud.bigquery.job import QueryJobConfig
+from google.cloud.exceptions import NotFound
 
-from .view_list import VIEW_OR_TABLE_NAME_KEY, DATASET_NAME_KEY
+from .defaults import DEFAULT_ON_DEMAND_PRICE_PER_TIB
+from .scheduler import DEFAULT_MAX_WORKERS, run_concurrently, run_with_dependencies
+from .view_list import (
+    MAX_BYTES_BILLED_KEY,
+    TEMPLATE_TABLE_PREFIX,
+    VIEW_OR_TABLE_NAME_KEY,
+    DATASET_NAME_KEY,
+    get_referenced_materialized_view_names_by_view_name_map,
+    get_referenced_table_names_by_view_name_map,
+    get_referenced_table_names_for_view_name
+)
 
 LOGGER = logging.getLogger(__name__)
 
+BYTES_PER_TIB = 2 ** 40
+
 
 @dataclass(frozen=True)
 class MaterializeViewResult:  # pylint: disable=too-many-instance-attributes
@@ -25,6 +40,11 @@ class MaterializeViewResult:  # pylint: disable=too-many-instance-attributes
     cache_hit: bool
     slot_millis: Optional[int]
     total_bytes_billed: int
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    skipped: bool = False
+    dry_run: bool = False
+    budget_exceeded: bool = False
 
 
 @dataclass(frozen=True)
@@ -34,12 +54,77 @@ class MaterializeViewListResult:
     def __bool__(self):
         return bool(self.result_list)
 
+    @property
+    def materialized_result_list(self) -> Sequence[MaterializeViewResult]:
+        return [result for result in self.result_list if not result.skipped]
+
+    @property
+    def skipped_result_list(self) -> Sequence[MaterializeViewResult]:
+        return [result for result in self.result_list if result.skipped]
+
+    @property
+    def budget_exceeded_result_list(self) -> Sequence[MaterializeViewResult]:
+        return [result for result in self.result_list if result.budget_exceeded]
+
+
+class TotalBytesBudget:
+    """
+    Keeps track of the bytes billed during a run, as well as the estimated bytes
+    of the queries that are currently running.
+    Once a reservation was rejected, the budget is considered exceeded.
+    """
+    def __init__(self, max_total_bytes: int):
+        self.max_total_bytes = max_total_bytes
+        self.total_bytes_billed = 0
+        self.reserved_bytes = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str, estimated_bytes: int) -> bool:
+        with self._lock:
+            if self.exceeded:
+                return False
+            expected_total_bytes = (
+                self.total_bytes_billed + self.reserved_bytes + estimated_bytes
+            )
+            if expected_total_bytes > self.max_total_bytes:
+                LOGGER.warning(
+                    (
+                        'not materializing %s, as it would exceed the maximum total bytes'
+                        ' (%d > %d, billed so far: %d), not materializing any further views'
+                    ),
+                    name, expected_total_bytes, self.max_total_bytes, self.total_bytes_billed
+                )
+                self.exceeded = True
+                return False
+            self.reserved_bytes += estimated_bytes
+            return True
+
+    def release(self, estimated_bytes: int, total_bytes_billed: Optional[int]):
+        with self._lock:
+            self.reserved_bytes -= estimated_bytes
+            self.total_bytes_billed += total_bytes_billed or 0
+
+
+class MaxTotalBytesExceededError(RuntimeError):
+    def __init__(self, view_names: Sequence[str]):
+        super().__init__(
+            f'not materialized, as the maximum total bytes would have been exceeded: {view_names}'
+        )
+        self.view_names = view_names
+
 
 def get_select_all_from_query(view_name: str, project: str,
                               dataset: str) -> str:
     return f"SELECT * FROM `{project}.{dataset}.{view_name}`"
 
 
+def get_estimated_on_demand_cost(
+        total_bytes_processed: int,
+        price_per_tib: float = DEFAULT_ON_DEMAND_PRICE_PER_TIB) -> float:
+    return (total_bytes_processed or 0) / BYTES_PER_TIB * price_per_tib
+
+
 def materialize_view(  # pylint: disable=too-many-arguments, too-many-locals
         client: bigquery.Client,
         source_view_name: str,
@@ -47,6 +132,7 @@ def materialize_view(  # pylint: disable=too-many-arguments, too-many-locals
         project: str,
         source_dataset: str,
         destination_dataset: str,
+        max_bytes_billed: Optional[int] = None,
 ) -> MaterializeViewResult:
     query = get_select_all_from_query(source_view_name,
                                       project=project,
@@ -60,6 +146,7 @@ def materialize_view(  # pylint: disable=too-many-arguments, too-many-locals
     )
     LOGGER.debug("materialize_view: %s=%s", destination_table_name, [query])
 
+    start_time = datetime.now(timezone.utc)
     start = time.perf_counter()
     dataset_ref = client.dataset(destination_dataset)
     destination_table_ref = dataset_ref.table(destination_table_name)
@@ -67,11 +154,14 @@ def materialize_view(  # pylint: disable=too-many-arguments, too-many-locals
     job_config = QueryJobConfig()
     job_config.destination = destination_table_ref
     job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+    if max_bytes_billed is not None:
+        job_config.maximum_bytes_billed = max_bytes_billed
 
     query_job = client.query(query, job_config=job_config)
     # getting the result will make sure that the query ran successfully
     result: bigquery.table.RowIterator = query_job.result()
     duration = time.perf_counter() - start
+    end_time = datetime.now(timezone.utc)
     total_bytes_processed = query_job.total_bytes_processed
     cache_hit = query_job.cache_hit
     slot_millis = query_job.slot_millis
@@ -97,48 +187,395 @@ def materialize_view(  # pylint: disable=too-many-arguments, too-many-locals
         duration=duration,
         cache_hit=cache_hit,
         slot_millis=slot_millis,
-        total_bytes_billed=total_bytes_billed
+        total_bytes_billed=total_bytes_billed,
+        start_time=start_time,
+        end_time=end_time
     )
 
 
-def materialize_views(
+def estimate_materialize_view(  # pylint: disable=too-many-arguments
+        client: bigquery.Client,
+        source_view_name: str,
+        destination_table_name: str,
+        project: str,
+        source_dataset: str,
+        destination_dataset: str,
+) -> MaterializeViewResult:
+    query = get_select_all_from_query(source_view_name,
+                                      project=project,
+                                      dataset=source_dataset)
+    LOGGER.debug("estimate_materialize_view: %s=%s", destination_table_name, [query])
+
+    start_time = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    job_config = QueryJobConfig()
+    job_config.dry_run = True
+    job_config.use_query_cache = False
+
+    # a dry run query job is complete straight away
+    query_job = client.query(query, job_config=job_config)
+    duration = time.perf_counter() - start
+    return MaterializeViewResult(
+        source_dataset=source_dataset,
+        source_view_name=source_view_name,
+        destination_dataset=destination_dataset,
+        destination_table_name=destination_table_name,
+        total_bytes_processed=query_job.total_bytes_processed,
+        total_rows=None,
+        duration=duration,
+        cache_hit=False,
+        slot_millis=None,
+        total_bytes_billed=0,
+        start_time=start_time,
+        end_time=datetime.now(timezone.utc),
+        dry_run=True
+    )
+
+
+def estimate_materialize_views(  # pylint: disable=too-many-arguments
         client: bigquery.Client,
         materialized_view_dict: OrderedDict,
         source_view_dict: OrderedDict,
         project: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        price_per_tib: float = DEFAULT_ON_DEMAND_PRICE_PER_TIB,
 ) -> MaterializeViewListResult:
     LOGGER.info("view_names: %s", materialized_view_dict)
-    if not materialized_view_dict:
-        return MaterializeViewListResult(result_list=[])
-    start = time.perf_counter()
-    total_bytes_processed = 0
-    total_rows = 0
-    result_list = []
-    for view_template_file_name, dataset_view_data in materialized_view_dict.items():
-        result = materialize_view(
+    # dry runs do not create any tables, they therefore do not need to wait for each other
+    list_result = MaterializeViewListResult(run_concurrently(
+        lambda view_template_file_name: estimate_materialize_view(
             client,
             source_view_name=source_view_dict.get(view_template_file_name).get(
                 VIEW_OR_TABLE_NAME_KEY),
-            destination_table_name=dataset_view_data.get(
+            destination_table_name=materialized_view_dict[view_template_file_name].get(
                 VIEW_OR_TABLE_NAME_KEY),
             project=project,
             source_dataset=source_view_dict.get(view_template_file_name).get(
                 DATASET_NAME_KEY),
-            destination_dataset=dataset_view_data.get(DATASET_NAME_KEY),
+            destination_dataset=materialized_view_dict[view_template_file_name].get(
+                DATASET_NAME_KEY),
+        ),
+        materialized_view_dict.keys(),
+        max_workers=max_workers
+    ))
+    LOGGER.info(
+        "estimated materialize views:\n%s",
+        format_estimate_result(list_result, price_per_tib=price_per_tib)
+    )
+    return list_result
+
+
+def format_estimate_result(
+        list_result: MaterializeViewListResult,
+        price_per_tib: float = DEFAULT_ON_DEMAND_PRICE_PER_TIB) -> str:
+    total_bytes_processed = sum(
+        result.total_bytes_processed or 0 for result in list_result.result_list
+    )
+    return "\n".join([
+        (
+            f"{result.source_dataset}.{result.source_view_name}"
+            f" -> {result.destination_dataset}.{result.destination_table_name}:"
+            f" {result.total_bytes_processed} bytes,"
+            f" ${get_estimated_on_demand_cost(result.total_bytes_processed, price_per_tib):.4f}"
         )
-        result_list.append(result)
-        total_bytes_processed += (result.total_bytes_processed or 0)
-        total_rows += (result.total_rows or 0)
+        for result in list_result.result_list
+    ] + [
+        (
+            f"total ({len(list_result.result_list)} views): {total_bytes_processed} bytes,"
+            f" ${get_estimated_on_demand_cost(total_bytes_processed, price_per_tib):.4f}"
+            f" (at ${price_per_tib} per TiB)"
+        )
+    ])
+
+
+def get_resolved_table_id(
+        table_name: str,
+        project: str,
+        default_dataset: str,
+        view_to_dataset_mapping: dict
+) -> str:
+    if table_name.startswith(TEMPLATE_TABLE_PREFIX):
+        short_table_name = table_name[len(TEMPLATE_TABLE_PREFIX):]
+        dataset = view_to_dataset_mapping.get(short_table_name, default_dataset)
+        return f"{project}.{dataset}.{short_table_name}"
+    return table_name.replace("{project}", project).replace("{dataset}", default_dataset)
+
+
+def get_upstream_table_ids(  # pylint: disable=too-many-arguments
+        base_dir: str,
+        view_template_file_name: str,
+        source_view_dict: OrderedDict,
+        project: str,
+        default_dataset: str,
+        view_to_dataset_mapping: dict,
+) -> List[str]:
+    """
+    Returns the view itself and all of the tables and views it references,
+    following references to other local views (but not materialized tables).
+    """
+    source_view_data = source_view_dict[view_template_file_name]
+    upstream_table_ids = [
+        f"{project}.{source_view_data.get(DATASET_NAME_KEY)}"
+        f".{source_view_data.get(VIEW_OR_TABLE_NAME_KEY)}"
+    ]
+    visited_view_names = {view_template_file_name}
+    remaining_view_names = [view_template_file_name]
+    while remaining_view_names:
+        view_name = remaining_view_names.pop(0)
+        for referenced_table_name in get_referenced_table_names_for_view_name(
+                base_dir, view_name):
+            table_id = get_resolved_table_id(
+                referenced_table_name,
+                project=project,
+                default_dataset=default_dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping
+            )
+            if table_id not in upstream_table_ids:
+                upstream_table_ids.append(table_id)
+            short_table_name = table_id.split(".")[-1]
+            if short_table_name in source_view_dict and short_table_name not in visited_view_names:
+                visited_view_names.add(short_table_name)
+                remaining_view_names.append(short_table_name)
+    return upstream_table_ids
+
+
+def get_table_modified(client: bigquery.Client, table_id: str) -> Optional[datetime]:
+    try:
+        return client.get_table(table_id).modified
+    except NotFound:
+        return None
+
+
+def is_materialized_table_up_to_date(
+        client: bigquery.Client,
+        destination_table_id: str,
+        upstream_table_ids: List[str]
+) -> bool:
+    destination_modified = get_table_modified(client, destination_table_id)
+    if destination_modified is None:
+        LOGGER.debug("materialized table does not exist: %s", destination_table_id)
+        return False
+    for upstream_table_id in upstream_table_ids:
+        upstream_modified = get_table_modified(client, upstream_table_id)
+        if upstream_modified is None or upstream_modified > destination_modified:
+            LOGGER.debug(
+                "upstream table %s modified after %s (%s > %s)",
+                upstream_table_id, destination_table_id, upstream_modified, destination_modified
+            )
+            return False
+    return True
+
+
+def get_skipped_materialize_view_result(
+        source_view_name: str,
+        destination_table_name: str,
+        source_dataset: str,
+        destination_dataset: str,
+        budget_exceeded: bool = False,
+) -> MaterializeViewResult:
+    return MaterializeViewResult(
+        source_dataset=source_dataset,
+        source_view_name=source_view_name,
+        destination_dataset=destination_dataset,
+        destination_table_name=destination_table_name,
+        total_bytes_processed=None,
+        total_rows=None,
+        duration=0.0,
+        cache_hit=False,
+        slot_millis=None,
+        total_bytes_billed=0,
+        skipped=True,
+        budget_exceeded=budget_exceeded
+    )
+
+
+def materialize_view_within_budget(  # pylint: disable=too-many-arguments
+        client: bigquery.Client,
+        budget: Optional[TotalBytesBudget],
+        name: str,
+        source_view_name: str,
+        destination_table_name: str,
+        project: str,
+        source_dataset: str,
+        destination_dataset: str,
+        max_bytes_billed: Optional[int] = None,
+) -> Optional[MaterializeViewResult]:
+    """
+    Materializes the view, after reserving its estimated bytes (if there is a budget).
+    Returns None, without materializing the view, if the budget would be exceeded.
+    """
+    if budget is None:
+        return materialize_view(
+            client,
+            source_view_name=source_view_name,
+            destination_table_name=destination_table_name,
+            project=project,
+            source_dataset=source_dataset,
+            destination_dataset=destination_dataset,
+            max_bytes_billed=max_bytes_billed,
+        )
+    estimated_bytes = estimate_materialize_view(
+        client,
+        source_view_name=source_view_name,
+        destination_table_name=destination_table_name,
+        project=project,
+        source_dataset=source_dataset,
+        destination_dataset=destination_dataset,
+    ).total_bytes_processed or 0
+    # views scheduled after the budget was exceeded will not be materialized either
+    if not budget.reserve(name, estimated_bytes):
+        return None
+    result = None
+    try:
+        result = materialize_view(
+            client,
+            source_view_name=source_view_name,
+            destination_table_name=destination_table_name,
+            project=project,
+            source_dataset=source_dataset,
+            destination_dataset=destination_dataset,
+            max_bytes_billed=max_bytes_billed,
+        )
+        return result
+    finally:
+        budget.release(
+            estimated_bytes,
+            total_bytes_billed=result.total_bytes_billed if result is not None else None
+        )
+
+
+def get_materialized_view_dependencies_map(
+        base_dir: str,
+        materialized_view_dict: OrderedDict,
+        source_view_dict: OrderedDict,
+) -> Dict[str, List[str]]:
+    return get_referenced_materialized_view_names_by_view_name_map(
+        source_view_dict,
+        get_referenced_table_names_by_view_name_map(base_dir, source_view_dict),
+        materialized_view_dict
+    )
+
+
+def materialize_views(  # pylint: disable=too-many-arguments, too-many-locals
+        client: bigquery.Client,
+        materialized_view_dict: OrderedDict,
+        source_view_dict: OrderedDict,
+        project: str,
+        base_dir: str = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        incremental: bool = False,
+        default_dataset: str = None,
+        view_to_dataset_mapping: dict = None,
+        max_total_bytes: Optional[int] = None,
+) -> MaterializeViewListResult:
+    LOGGER.info("view_names: %s", materialized_view_dict)
+    if not materialized_view_dict:
+        return MaterializeViewListResult(result_list=[])
+    if (max_workers > 1 or incremental) and base_dir is None:
+        raise ValueError('base_dir required to materialize views concurrently or incrementally')
+    if max_workers > 1:
+        dependencies_map = get_materialized_view_dependencies_map(
+            base_dir,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict
+        )
+        LOGGER.debug('materialized view dependencies: %s', dependencies_map)
+    else:
+        dependencies_map = {}
+    budget = TotalBytesBudget(max_total_bytes) if max_total_bytes is not None else None
+    start = time.perf_counter()
+
+    def _materialize_view(view_template_file_name: str) -> MaterializeViewResult:
+        dataset_view_data = materialized_view_dict[view_template_file_name]
+        source_view_name = source_view_dict.get(view_template_file_name).get(
+            VIEW_OR_TABLE_NAME_KEY)
+        source_dataset = source_view_dict.get(view_template_file_name).get(DATASET_NAME_KEY)
+        destination_table_name = dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+        destination_dataset = dataset_view_data.get(DATASET_NAME_KEY)
+        if budget is not None and budget.exceeded:
+            return get_skipped_materialize_view_result(
+                source_view_name=source_view_name,
+                destination_table_name=destination_table_name,
+                source_dataset=source_dataset,
+                destination_dataset=destination_dataset,
+                budget_exceeded=True
+            )
+        # the upstream tables are only checked once the views it depends on are materialized
+        if incremental and is_materialized_table_up_to_date(
+            client,
+            f"{project}.{destination_dataset}.{destination_table_name}",
+            get_upstream_table_ids(
+                base_dir,
+                view_template_file_name,
+                source_view_dict=source_view_dict,
+                project=project,
+                default_dataset=default_dataset or source_dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping or {}
+            )
+        ):
+            LOGGER.info(
+                "skipping materialized view, upstream tables not modified: %s.%s",
+                destination_dataset,
+                destination_table_name
+            )
+            return get_skipped_materialize_view_result(
+                source_view_name=source_view_name,
+                destination_table_name=destination_table_name,
+                source_dataset=source_dataset,
+                destination_dataset=destination_dataset,
+            )
+        result = materialize_view_within_budget(
+            client,
+            budget,
+            view_template_file_name,
+            source_view_name=source_view_name,
+            destination_table_name=destination_table_name,
+            project=project,
+            source_dataset=source_dataset,
+            destination_dataset=destination_dataset,
+            max_bytes_billed=dataset_view_data.get(MAX_BYTES_BILLED_KEY),
+        )
+        if result is None:
+            return get_skipped_materialize_view_result(
+                source_view_name=source_view_name,
+                destination_table_name=destination_table_name,
+                source_dataset=source_dataset,
+                destination_dataset=destination_dataset,
+                budget_exceeded=True
+            )
+        return result
+
+    list_result = MaterializeViewListResult(list(run_with_dependencies(
+        _materialize_view,
+        materialized_view_dict.keys(),
+        dependencies_map,
+        max_workers=max_workers
+    ).values()))
     duration = time.perf_counter() - start
+    result_list = list_result.materialized_result_list
+    total_bytes_processed = sum(result.total_bytes_processed or 0 for result in result_list)
+    total_rows = sum(result.total_rows or 0 for result in result_list)
+    for result in result_list:
+        LOGGER.debug(
+            'materialized view %s.%s: %s - %s',
+            result.source_dataset,
+            result.source_view_name,
+            result.start_time,
+            result.end_time
+        )
     LOGGER.info(
         (
-            'materialized views, number of views: %d,'
+            'materialized views, number of views: %d (skipped: %d, budget exceeded: %d),'
             ' total rows: %s, %s bytes processed, took: %.3fs (%0.3fs / views)'
+            ', sum of view durations: %.3fs'
         ),
-        len(materialized_view_dict),
+        len(result_list),
+        len(list_result.skipped_result_list),
+        len(list_result.budget_exceeded_result_list),
         total_rows,
         total_bytes_processed,
         duration,
         duration / len(materialized_view_dict),
+        sum(result.duration for result in result_list),
     )
-    return MaterializeViewListResult(result_list)
+    return list_result
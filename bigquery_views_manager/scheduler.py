@@ -0,0 +1,138 @@
+import heapq
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Mapping, Set, TypeVar
+
+LOGGER = logging.getLogger(__name__)
+
+K = TypeVar('K')
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_MAX_WORKERS = 1
+
+
+class CircularDependencyError(ValueError):
+    pass
+
+
+class _DependencyTracker:
+    def __init__(self, keys: List[K], dependencies_by_key: Mapping[K, Iterable[K]]):
+        self.keys = keys
+        self.index_by_key = {key: index for index, key in enumerate(keys)}
+        self.remaining_dependencies_by_key: Dict[K, Set[K]] = {
+            key: {
+                dependency
+                for dependency in dependencies_by_key.get(key, [])
+                if dependency in self.index_by_key and dependency != key
+            }
+            for key in keys
+        }
+        self.dependents_by_key: Dict[K, List[K]] = {key: [] for key in keys}
+        for key, dependencies in self.remaining_dependencies_by_key.items():
+            for dependency in dependencies:
+                self.dependents_by_key[dependency].append(key)
+        self.ready_indices = [
+            self.index_by_key[key]
+            for key, dependencies in self.remaining_dependencies_by_key.items()
+            if not dependencies
+        ]
+        heapq.heapify(self.ready_indices)
+        self.pending_keys = set(keys)
+
+    def has_ready(self) -> bool:
+        return bool(self.ready_indices)
+
+    def pop_ready(self) -> K:
+        key = self.keys[heapq.heappop(self.ready_indices)]
+        self.pending_keys.remove(key)
+        return key
+
+    def mark_done(self, key: K):
+        for dependent in self.dependents_by_key[key]:
+            remaining_dependencies = self.remaining_dependencies_by_key[dependent]
+            remaining_dependencies.remove(key)
+            if not remaining_dependencies:
+                heapq.heappush(self.ready_indices, self.index_by_key[dependent])
+
+    def raise_if_pending(self):
+        if self.pending_keys:
+            pending_keys = sorted(self.pending_keys, key=self.index_by_key.get)
+            raise CircularDependencyError(
+                f'unable to schedule due to circular dependencies: {pending_keys}'
+            )
+
+
+def run_with_dependencies(
+        func: Callable[[K], R],
+        keys: Iterable[K],
+        dependencies_by_key: Mapping[K, Iterable[K]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[K, R]:
+    """
+    Calls func for every key, using at most max_workers threads.
+    A key is only started once all of its dependencies (that are part of keys) are done.
+    Keys that are ready at the same time are started in the order of keys.
+    Results are returned in the order of keys.
+    On failure, no further keys are started and the first error is raised
+    once the already running keys have finished.
+    """
+    keys = list(keys)
+    tracker = _DependencyTracker(keys, dependencies_by_key)
+    result_by_key: Dict[K, R] = {}
+    if max_workers <= 1:
+        while tracker.has_ready():
+            key = tracker.pop_ready()
+            result_by_key[key] = func(key)
+            tracker.mark_done(key)
+        tracker.raise_if_pending()
+        return {key: result_by_key[key] for key in keys}
+    running_key_by_future: Dict[Future, K] = {}
+    first_error = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            while (
+                tracker.has_ready()
+                and first_error is None
+                and len(running_key_by_future) < max_workers
+            ):
+                key = tracker.pop_ready()
+                running_key_by_future[executor.submit(func, key)] = key
+            if not running_key_by_future:
+                break
+            done_futures, _ = wait(running_key_by_future, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                key = running_key_by_future.pop(future)
+                error = future.exception()
+                if error is not None:
+                    LOGGER.debug('failed to process %r: %r', key, error)
+                    if first_error is None:
+                        first_error = error
+                    continue
+                result_by_key[key] = future.result()
+                tracker.mark_done(key)
+    if first_error is not None:
+        raise first_error
+    tracker.raise_if_pending()
+    return {key: result_by_key[key] for key in keys}
+
+
+def run_concurrently(
+        func: Callable[[T], R],
+        items: Iterable[T],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[R]:
+    """
+    Calls func for every item, using at most max_workers threads.
+    Results are returned in the order of the items.
+    On failure, no further items are started and the first error is raised
+    once the already running items have finished.
+    """
+    items = list(items)
+    result_by_index = run_with_dependencies(
+        lambda index: func(items[index]),
+        range(len(items)),
+        {},
+        max_workers=max_workers
+    )
+    return list(result_by_index.values())
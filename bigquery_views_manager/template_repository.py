@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .view_template import (
+    ViewTemplate,
+    compile_query_template,
+    get_referenced_table_names_for_query
+)
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class TemplateCacheEntry:
+    """
+    The table references of a view template. The modification time and size are only known
+    for files read in this run, and are not persisted (entries of an index are reused
+    if the content hash matches).
+    """
+    mtime_ns: Optional[int] = field(compare=False)
+    size: Optional[int] = field(compare=False)
+    referenced_table_names: List[str]
+    first_table_name: Optional[str] = None
+    content_hash: Optional[str] = None
+    view_template: Optional[ViewTemplate] = field(default=None, compare=False)
+
+    @staticmethod
+    def from_value(value: dict) -> 'TemplateCacheEntry':
+        return TemplateCacheEntry(
+            mtime_ns=None,
+            size=None,
+            referenced_table_names=value['referenced_table_names'],
+            first_table_name=value.get('first_table_name'),
+            content_hash=value.get('content_hash')
+        )
+
+    def to_value(self) -> dict:
+        return {
+            'referenced_table_names': self.referenced_table_names,
+            'first_table_name': self.first_table_name,
+            'content_hash': self.content_hash
+        }
+
+    def is_up_to_date(self, stat_result: os.stat_result) -> bool:
+        return (
+            self.mtime_ns is not None
+            and self.mtime_ns == stat_result.st_mtime_ns
+            and self.size == stat_result.st_size
+        )
+
+
+@dataclass(frozen=True)
+class ViewGraph:
+    """
+    The references between views (in both directions), for the given view names
+    and materialized table names (mapped to the view they are materialized from).
+    """
+    view_names: List[str]
+    view_by_materialized_table_name: Dict[str, str]
+    referenced_view_names_by_view_name: Dict[str, List[str]]
+    dependent_view_names_by_view_name: Dict[str, List[str]]
+
+
+@dataclass(frozen=True)
+class _IndexedViewGraph:
+    view_graph: ViewGraph
+    referenced_table_names_by_path_key: Dict[str, List[str]]
+
+
+def _get_path_key(path: str) -> str:
+    return str(Path(path).resolve())
+
+
+def get_template_content_hash(view_template_content: str) -> str:
+    return hashlib.blake2b(view_template_content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class TemplateRepository:
+    """
+    Reads every view template file once (until it changes, based on mtime and size),
+    and keeps the extracted table references.
+    Entries and view graphs can also be added from a graph index (see graph_index),
+    to avoid re-parsing unchanged files in later runs.
+    """
+    def __init__(self):
+        self._entry_by_path: Dict[str, TemplateCacheEntry] = {}
+        self._indexed_view_graph_by_path_keys: Dict[Tuple[str, ...], _IndexedViewGraph] = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entry_by_path = {}
+            self._indexed_view_graph_by_path_keys = {}
+
+    def _get_entry(self, path: str, require_view_template: bool) -> TemplateCacheEntry:
+        path_key = _get_path_key(path)
+        stat_result = os.stat(path_key)
+        with self._lock:
+            entry = self._entry_by_path.get(path_key)
+        if (
+            entry is not None
+            and entry.is_up_to_date(stat_result)
+            and (entry.view_template is not None or not require_view_template)
+        ):
+            return entry
+        LOGGER.debug('reading view template: %s', path_key)
+        view_template = ViewTemplate.from_file(path_key)
+        query_template = view_template.view_template_content
+        content_hash = get_template_content_hash(query_template)
+        if entry is not None and entry.content_hash == content_hash:
+            # e.g. an indexed entry (without modification time), or after a checkout
+            entry = TemplateCacheEntry(
+                mtime_ns=stat_result.st_mtime_ns,
+                size=stat_result.st_size,
+                referenced_table_names=entry.referenced_table_names,
+                first_table_name=entry.first_table_name,
+                content_hash=content_hash,
+                view_template=view_template
+            )
+        else:
+            entry = TemplateCacheEntry(
+                mtime_ns=stat_result.st_mtime_ns,
+                size=stat_result.st_size,
+                referenced_table_names=get_referenced_table_names_for_query(query_template),
+                first_table_name=compile_query_template(query_template).first_table_name,
+                content_hash=content_hash,
+                view_template=view_template
+            )
+        with self._lock:
+            self._entry_by_path[path_key] = entry
+        return entry
+
+    def get_entry(self, path: str) -> TemplateCacheEntry:
+        return self._get_entry(path, require_view_template=False)
+
+    def add_entries(self, entry_by_path: Dict[str, TemplateCacheEntry]):
+        """
+        Adds entries (e.g. from an index), without replacing entries already read in this run.
+        Entries are only used while they are up to date or the content hash matches.
+        """
+        entry_by_path_key = {
+            _get_path_key(path): entry for path, entry in entry_by_path.items()
+        }
+        with self._lock:
+            self._entry_by_path = {**entry_by_path_key, **self._entry_by_path}
+
+    def get_view_template(self, path: str) -> ViewTemplate:
+        return self._get_entry(path, require_view_template=True).view_template
+
+    def get_referenced_table_names(self, path: str) -> List[str]:
+        return list(
+            self._get_entry(path, require_view_template=False).referenced_table_names
+        )
+
+    def add_view_graph(
+            self,
+            view_graph: ViewGraph,
+            entry_by_path: Dict[str, TemplateCacheEntry]):
+        """
+        Adds a view graph (e.g. from an index), together with the entries of its view templates
+        (keyed by path, in the order of the view names).
+        The view graph is only used while the references of the view templates are unchanged.
+        """
+        self.add_entries(entry_by_path)
+        path_keys = tuple(_get_path_key(path) for path in entry_by_path.keys())
+        with self._lock:
+            self._indexed_view_graph_by_path_keys[path_keys] = _IndexedViewGraph(
+                view_graph=view_graph,
+                referenced_table_names_by_path_key={
+                    path_key: entry.referenced_table_names
+                    for path_key, entry in zip(path_keys, entry_by_path.values())
+                }
+            )
+
+    def get_view_graph(
+            self,
+            view_template_file_by_view_name: Dict[str, str],
+            view_by_materialized_table_name: Dict[str, str]) -> Optional[ViewGraph]:
+        """
+        Returns the added view graph for the same views and materialized tables,
+        or None if there is none or if the references of any of its view templates changed.
+        """
+        path_keys = tuple(
+            _get_path_key(path) for path in view_template_file_by_view_name.values()
+        )
+        with self._lock:
+            indexed_view_graph = self._indexed_view_graph_by_path_keys.get(path_keys)
+        if indexed_view_graph is None:
+            return None
+        view_graph = indexed_view_graph.view_graph
+        if (
+            view_graph.view_names != list(view_template_file_by_view_name.keys())
+            or view_graph.view_by_materialized_table_name != view_by_materialized_table_name
+        ):
+            return None
+        for path_key, referenced_table_names in (
+                indexed_view_graph.referenced_table_names_by_path_key.items()):
+            if self.get_referenced_table_names(path_key) != referenced_table_names:
+                LOGGER.debug('not using view graph, view template changed: %s', path_key)
+                return None
+        return view_graph
+
+
+DEFAULT_TEMPLATE_REPOSITORY = TemplateRepository()
+
+
+def get_template_repository() -> TemplateRepository:
+    return DEFAULT_TEMPLATE_REPOSITORY
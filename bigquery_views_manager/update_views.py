@@ -1,18 +1,35 @@
 import logging
 from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
 
 from google.cloud import bigquery
+from google.cloud.exceptions import GoogleCloudError
 
+from .diff_views import get_diff_result
 from .views import get_local_view_query
+from .manifest import DeployManifest, ManifestEntry, get_query_hash
 from .materialize_views import materialize_view
-from .view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
+from .scheduler import DEFAULT_MAX_WORKERS, run_concurrently
+from .view_list import (
+    DATASET_NAME_KEY,
+    MAX_BYTES_BILLED_KEY,
+    VIEW_OR_TABLE_NAME_KEY,
+    determine_view_insert_levels
+)
 
 LOGGER = logging.getLogger(__name__)
 
+# BigQuery limits the query text (of a script job) to 1024 KB, leave some room for the job
+DEFAULT_MAX_SCRIPT_BYTES = 1000 * 1000
+
+
+def get_create_or_replace_view_statement(dataset: str, view_name: str, view_query: str) -> str:
+    return f"CREATE OR REPLACE VIEW {dataset}.{view_name} AS {view_query}"
+
 
 def get_create_or_replace_view_query(view: bigquery.Table) -> str:
-    return (
-        f"CREATE OR REPLACE VIEW {view.dataset_id}.{view.table_id} AS {view.view_query}"
+    return get_create_or_replace_view_statement(
+        view.dataset_id, view.table_id, view.view_query
     )
 
 
@@ -27,13 +44,153 @@ def update_or_create_view(client: bigquery.Client, view_name: str,
     query_job = client.query(get_create_or_replace_view_query(view))
     query_job.result()  # wait for query job to finish
 
-    updated_view = client.get_table(view)
-    LOGGER.info("updated or replaced view: %s", updated_view.full_table_id)
-    LOGGER.debug("view schema (%s): %s", updated_view.full_table_id,
-                 updated_view.schema)
+    LOGGER.info("updated or replaced view: %s.%s", dataset, view_name)
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        updated_view = client.get_table(view)
+        LOGGER.debug("view schema (%s): %s", updated_view.full_table_id,
+                     updated_view.schema)
+
+
+class UpdateViewsScriptError(RuntimeError):
+    def __init__(
+            self,
+            message: str,
+            updated_view_names: List[str],
+            failed_view_names: List[str],
+            not_updated_view_names: List[str]):
+        super().__init__(message)
+        self.updated_view_names = updated_view_names
+        self.failed_view_names = failed_view_names
+        self.not_updated_view_names = not_updated_view_names
+
+
+def get_create_or_replace_views_script(
+        view_query_by_dataset_and_view_name: Dict[Tuple[str, str], str]) -> str:
+    statements = []
+    for (dataset, view_name), view_query in view_query_by_dataset_and_view_name.items():
+        statement = get_create_or_replace_view_statement(dataset, view_name, view_query).rstrip()
+        if not statement.endswith(';'):
+            # on a separate line, in case the query ends with a comment
+            statement += '\n;'
+        statements.append(statement)
+    return '\n'.join(statements) + '\n'
 
 
-def update_or_create_views(  # pylint: disable=too-many-arguments
+def get_ddl_target_table_name(child_job: bigquery.QueryJob) -> Optional[str]:
+    ddl_target_table = child_job.ddl_target_table
+    if ddl_target_table is None:
+        return None
+    return f"{ddl_target_table.dataset_id}.{ddl_target_table.table_id}"
+
+
+def get_failed_view_names(
+        child_jobs: List[bigquery.QueryJob], remaining_view_names: List[str]) -> List[str]:
+    failed_child_jobs = [child_job for child_job in child_jobs if child_job.error_result]
+    if not failed_child_jobs:
+        # the script failed without running a failing statement (e.g. a syntax error)
+        return []
+    failed_ddl_target_table_names = {
+        get_ddl_target_table_name(child_job) for child_job in failed_child_jobs
+    }
+    failed_view_names = [
+        view_name for view_name in remaining_view_names
+        if view_name in failed_ddl_target_table_names
+    ]
+    if failed_view_names:
+        return failed_view_names
+    # the failed statement did not report its target table,
+    # as statements run in order, it is the first statement that did not succeed
+    return remaining_view_names[:1]
+
+
+def update_or_create_views_using_script(
+        client: bigquery.Client,
+        view_query_by_dataset_and_view_name: Dict[Tuple[str, str], str]):
+    """
+    Updates multiple views using a single multi-statement script job.
+    BigQuery runs the statements in order and stops at the first failing statement,
+    which is mapped back to the view name using the failed child job of the script
+    (if the script failed without a failed child job, no view is considered updated).
+    """
+    view_names = [
+        f"{dataset}.{view_name}"
+        for dataset, view_name in view_query_by_dataset_and_view_name.keys()
+    ]
+    LOGGER.debug("update_views (script): %s", view_names)
+    script_job = client.query(
+        get_create_or_replace_views_script(view_query_by_dataset_and_view_name)
+    )
+    try:
+        script_job.result()  # wait for script job to finish
+    except GoogleCloudError as exc:
+        child_jobs = list(client.list_jobs(parent_job=script_job))
+        succeeded_view_names = {
+            get_ddl_target_table_name(child_job)
+            for child_job in child_jobs
+            if not child_job.error_result
+        }
+        updated_view_names = [
+            view_name for view_name in view_names if view_name in succeeded_view_names
+        ]
+        remaining_view_names = [
+            view_name for view_name in view_names if view_name not in succeeded_view_names
+        ]
+        failed_view_names = get_failed_view_names(child_jobs, remaining_view_names)
+        not_updated_view_names = [
+            view_name for view_name in remaining_view_names if view_name not in failed_view_names
+        ]
+        raise UpdateViewsScriptError(
+            f"failed to update view {failed_view_names}"
+            f" (not updated: {not_updated_view_names}): {exc}",
+            updated_view_names=updated_view_names,
+            failed_view_names=failed_view_names,
+            not_updated_view_names=not_updated_view_names
+        ) from exc
+    LOGGER.info("updated or replaced views (script): %s", view_names)
+
+
+def get_create_or_replace_views_script_size(
+        view_query_by_dataset_and_view_name: Dict[Tuple[str, str], str]) -> int:
+    return len(
+        get_create_or_replace_views_script(view_query_by_dataset_and_view_name).encode('utf-8')
+    )
+
+
+def get_batches(
+        items: List[str],
+        batch_size: Optional[int],
+        get_item_size: Optional[Callable[[str], int]] = None,
+        max_batch_item_size: Optional[int] = None) -> List[List[str]]:
+    """
+    Splits the items into batches of up to batch_size items,
+    and (if max_batch_item_size is set) with a total item size of up to max_batch_item_size
+    (an item larger than that will be in a batch on its own).
+    """
+    if batch_size is not None and batch_size < 1:
+        raise ValueError(f"batch size must be at least 1: {batch_size}")
+    batches = []
+    batch: List[str] = []
+    batch_item_size = 0
+    for item in items:
+        item_size = get_item_size(item) if get_item_size is not None else 0
+        if batch and (
+            (batch_size is not None and len(batch) >= batch_size)
+            or (
+                max_batch_item_size is not None
+                and batch_item_size + item_size > max_batch_item_size
+            )
+        ):
+            batches.append(batch)
+            batch = []
+            batch_item_size = 0
+        batch.append(item)
+        batch_item_size += item_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def update_or_create_views(  # pylint: disable=too-many-arguments, too-many-locals
         client: bigquery.Client,
         base_dir: str,
         view_names_dict: OrderedDict,
@@ -41,23 +198,127 @@ def update_or_create_views(  # pylint: disable=too-many-arguments
         project: str,
         default_dataset: str,
         view_to_dataset_mapping: dict,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        only_changed: bool = False,
+        manifest: DeployManifest = None,
+        trust_manifest: bool = False,
+        batch_ddl: bool = False,
+        batch_size: Optional[int] = None,
+        max_script_bytes: int = DEFAULT_MAX_SCRIPT_BYTES,
 ):
     LOGGER.info("view_names: %s (materialize: %s)", view_names_dict,
                 materialized_view_names)
-    for view_template_file_name, dataset_view_data in view_names_dict.items():
-        view_query = get_local_view_query(
+
+    view_query_by_view_template_file_name = {}
+
+    def _get_view_query(view_template_file_name: str) -> str:
+        view_query = view_query_by_view_template_file_name.get(view_template_file_name)
+        if view_query is None:
+            view_query = get_local_view_query(
+                base_dir,
+                view_template_file_name,
+                project=project,
+                default_dataset=default_dataset,
+                view_to_dataset_mapping=view_to_dataset_mapping,
+            )
+            view_query_by_view_template_file_name[view_template_file_name] = view_query
+        return view_query
+
+    def _get_manifest_entry(view_template_file_name: str) -> ManifestEntry:
+        dataset_view_data = view_names_dict[view_template_file_name]
+        return ManifestEntry(
+            query_hash=get_query_hash(_get_view_query(view_template_file_name)),
+            project=project,
+            dataset=dataset_view_data.get(DATASET_NAME_KEY),
+            table_name=dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+        )
+
+    skipped_view_template_file_names = set()
+    if manifest is not None and trust_manifest:
+        skipped_view_template_file_names = {
+            view_template_file_name
+            for view_template_file_name in view_names_dict.keys()
+            if manifest.is_view_unchanged(
+                view_template_file_name, _get_manifest_entry(view_template_file_name)
+            )
+        }
+        LOGGER.info(
+            "skipping %d views unchanged according to the manifest (out of %d)",
+            len(skipped_view_template_file_names),
+            len(view_names_dict)
+        )
+
+    if only_changed:
+        unchanged_view_names = get_diff_result(
+            client,
             base_dir,
-            view_template_file_name,
+            OrderedDict([
+                (view_template_file_name, dataset_view_data)
+                for view_template_file_name, dataset_view_data in view_names_dict.items()
+                if view_template_file_name not in skipped_view_template_file_names
+            ]),
             project=project,
             default_dataset=default_dataset,
             view_to_dataset_mapping=view_to_dataset_mapping,
+            max_workers=max_workers,
+        ).unchanged_view_names
+        LOGGER.info(
+            "skipping %d unchanged views (out of %d)",
+            len(unchanged_view_names),
+            len(view_names_dict)
+        )
+        skipped_view_template_file_names.update(
+            view_template_file_name
+            for view_template_file_name, dataset_view_data in view_names_dict.items()
+            if (
+                dataset_view_data.get(DATASET_NAME_KEY)
+                + "." + dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+            ) in unchanged_view_names
         )
+
+    def _update_or_create_view(view_template_file_name: str):
+        dataset_view_data = view_names_dict[view_template_file_name]
         view_name = dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
         dataset_name = dataset_view_data.get(DATASET_NAME_KEY)
-        update_or_create_view(client,
-                              view_name,
-                              view_query,
-                              dataset=dataset_name)
+        if view_template_file_name in skipped_view_template_file_names:
+            LOGGER.debug("skipping unchanged view: %s.%s", dataset_name, view_name)
+        else:
+            update_or_create_view(client,
+                                  view_name,
+                                  _get_view_query(view_template_file_name),
+                                  dataset=dataset_name)
+
+    def _get_view_query_by_dataset_and_view_name(
+            view_template_file_names: List[str]) -> Dict[Tuple[str, str], str]:
+        return OrderedDict([
+            (
+                (
+                    view_names_dict[view_template_file_name].get(DATASET_NAME_KEY),
+                    view_names_dict[view_template_file_name].get(VIEW_OR_TABLE_NAME_KEY)
+                ),
+                _get_view_query(view_template_file_name)
+            )
+            for view_template_file_name in view_template_file_names
+        ])
+
+    def _get_script_size(view_template_file_name: str) -> int:
+        return get_create_or_replace_views_script_size(
+            _get_view_query_by_dataset_and_view_name([view_template_file_name])
+        )
+
+    def _update_or_create_views_using_script(view_template_file_names: List[str]):
+        update_or_create_views_using_script(
+            client, _get_view_query_by_dataset_and_view_name(view_template_file_names)
+        )
+
+    def _record_and_materialize_view(view_template_file_name: str):
+        dataset_view_data = view_names_dict[view_template_file_name]
+        view_name = dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY)
+        dataset_name = dataset_view_data.get(DATASET_NAME_KEY)
+        if manifest is not None:
+            manifest.set_view_entry(
+                view_template_file_name, _get_manifest_entry(view_template_file_name)
+            )
         if view_template_file_name in materialized_view_names.keys():
             materialize_view(
                 client,
@@ -68,4 +329,72 @@ def update_or_create_views(  # pylint: disable=too-many-arguments
                 destination_dataset=materialized_view_names.get(
                     view_template_file_name).get(DATASET_NAME_KEY),
                 source_dataset=dataset_name,
+                max_bytes_billed=materialized_view_names.get(
+                    view_template_file_name).get(MAX_BYTES_BILLED_KEY),
             )
+            if manifest is not None:
+                manifest.set_materialized_view_entry(view_template_file_name, ManifestEntry(
+                    query_hash=get_query_hash(_get_view_query(view_template_file_name)),
+                    project=project,
+                    dataset=materialized_view_names.get(
+                        view_template_file_name).get(DATASET_NAME_KEY),
+                    table_name=materialized_view_names.get(
+                        view_template_file_name).get(VIEW_OR_TABLE_NAME_KEY)
+                ))
+
+    def _update_or_create_view_and_materialize(view_template_file_name: str):
+        _update_or_create_view(view_template_file_name)
+        _record_and_materialize_view(view_template_file_name)
+
+    if max_workers <= 1 and not batch_ddl:
+        for view_template_file_name in view_names_dict.keys():
+            _update_or_create_view_and_materialize(view_template_file_name)
+        return
+
+    # materialized tables are only resolved to their view if they are being materialized,
+    # otherwise the existing table can be used straight away
+    view_levels = determine_view_insert_levels(
+        base_dir,
+        view_names_dict,
+        materialized_view_names
+    )
+    LOGGER.info(
+        "updating %d views in %d levels (max workers: %d)",
+        len(view_names_dict), len(view_levels), max_workers
+    )
+    script_job_count = 0
+    for level_index, view_level in enumerate(view_levels):
+        LOGGER.debug("updating views (level %d): %s", level_index, list(view_level.keys()))
+        if batch_ddl:
+            batches = get_batches(
+                [
+                    view_template_file_name
+                    for view_template_file_name in view_level.keys()
+                    if view_template_file_name not in skipped_view_template_file_names
+                ],
+                batch_size,
+                get_item_size=_get_script_size,
+                max_batch_item_size=max_script_bytes
+            )
+            run_concurrently(
+                _update_or_create_views_using_script,
+                batches,
+                max_workers=max_workers
+            )
+            script_job_count += len(batches)
+            run_concurrently(
+                _record_and_materialize_view,
+                view_level.keys(),
+                max_workers=max_workers
+            )
+            continue
+        run_concurrently(
+            _update_or_create_view_and_materialize,
+            view_level.keys(),
+            max_workers=max_workers
+        )
+    if batch_ddl:
+        LOGGER.info(
+            "updated %d views using %d script jobs",
+            len(view_names_dict) - len(skipped_view_template_file_names), script_job_count
+        )
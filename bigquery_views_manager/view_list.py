@@ -1,12 +1,15 @@
 import logging
-import re
 from pathlib import Path
-from typing import Dict, List, Set, Union
-from collections import OrderedDict
+from typing import Dict, Iterable, List, Set, Union
+from collections import OrderedDict, deque
 
 import yaml
 
-from .views import get_local_view_template
+from .scheduler import CircularDependencyError
+from .template_repository import ViewGraph, get_template_repository
+from .views import get_view_template_file
+# re-exported, as it used to be defined in this module
+from .view_template import get_referenced_table_names_for_query  # noqa pylint: disable=unused-import
 
 
 LOGGER = logging.getLogger(__name__)
@@ -14,6 +17,7 @@ LOGGER = logging.getLogger(__name__)
 TEMPLATE_TABLE_PREFIX = "{project}.{dataset}."
 DATASET_NAME_KEY = "dataset_name"
 VIEW_OR_TABLE_NAME_KEY = "table_name"
+MAX_BYTES_BILLED_KEY = "max_bytes_billed"
 
 
 def get_default_destination_table_name_for_view_name(view_name: str) -> str:
@@ -92,14 +96,11 @@ def save_view_mapping(filename: str, view_mapping: OrderedDict,
     return Path(filename).write_text(file_content, encoding='utf-8')
 
 
-def get_referenced_table_names_for_query(view_query: str) -> List[str]:
-    return re.findall(r"`(.*)`", view_query)
-
-
 def get_referenced_table_names_for_view_name(base_dir: str,
                                              view_name: str) -> List[str]:
-    return get_referenced_table_names_for_query(
-        get_local_view_template(base_dir, view_name).view_template_content)
+    return get_template_repository().get_referenced_table_names(
+        get_view_template_file(base_dir, view_name)
+    )
 
 
 def get_referenced_table_names_by_view_name_map(base_dir: str,
@@ -134,34 +135,77 @@ def filter_map_values_in(unfiltered_map: Dict[str, List[str]],
     }
 
 
-def add_names_with_referenced_names_recursively(
-        result_name_list: List[str],
+def get_dependency_level_by_name_in_insert_order(
         name_list: List[str],
         referenced_names_by_name_map: Dict[str, List[str]],
-) -> List[str]:
-    for name in name_list:
-        add_names_with_referenced_names_recursively(
-            result_name_list,
-            referenced_names_by_name_map.get(name, []),
-            referenced_names_by_name_map,
-        )
-        if name not in result_name_list:
-            result_name_list.append(name)
-    return result_name_list
+) -> 'OrderedDict[str, int]':
+    """
+    Sorts the names topologically, i.e. every name comes after the names it references,
+    while otherwise keeping the order of name_list (and of the references).
+    The values are the dependency levels, where a name only references names of lower levels.
+    References to the name itself are ignored.
+    Raises CircularDependencyError if the references contain a cycle.
+    """
+    level_by_name: 'OrderedDict[str, int]' = OrderedDict()
+    in_progress_names: Dict[str, int] = {}
+    path: List[str] = []
+    stack = []
+    for root_name in name_list:
+        if root_name in level_by_name:
+            continue
+        in_progress_names[root_name] = len(path)
+        path.append(root_name)
+        stack.append((root_name, iter(referenced_names_by_name_map.get(root_name, []))))
+        while stack:
+            name, remaining_referenced_names = stack[-1]
+            for referenced_name in remaining_referenced_names:
+                if referenced_name == name or referenced_name in level_by_name:
+                    continue
+                if referenced_name in in_progress_names:
+                    cycle = path[in_progress_names[referenced_name]:] + [referenced_name]
+                    raise CircularDependencyError(
+                        f'circular dependency between views: {" -> ".join(cycle)}'
+                    )
+                in_progress_names[referenced_name] = len(path)
+                path.append(referenced_name)
+                stack.append((
+                    referenced_name,
+                    iter(referenced_names_by_name_map.get(referenced_name, []))
+                ))
+                break
+            else:
+                stack.pop()
+                path.pop()
+                del in_progress_names[name]
+                level_by_name[name] = 1 + max(
+                    (
+                        level_by_name[referenced_name]
+                        for referenced_name in referenced_names_by_name_map.get(name, [])
+                        if referenced_name != name
+                    ),
+                    default=-1
+                )
+    return level_by_name
+
+
+def get_view_by_materialized_view_name_map(
+        materialized_views_ordered_dict: OrderedDict) -> Dict[str, str]:
+    return {
+        dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY): template_name
+        for template_name, dataset_view_data in
+        materialized_views_ordered_dict.items()
+    }
 
 
-def determine_insert_order_for_view_names_and_referenced_tables(
+def get_referenced_view_names_by_view_name_map(
         view_mapping: OrderedDict,
         referenced_table_names_by_view_name: Dict[str, List[str]],
         materialized_views_ordered_dict: OrderedDict,
-) -> OrderedDict:
-    LOGGER.debug('referenced_table_names_by_view_name: %s', referenced_table_names_by_view_name)
-    view_by_materialized_view_name_map = {
-        dataset_view_data.get(VIEW_OR_TABLE_NAME_KEY): template_name
-        for template_name, dataset_view_data in
-        materialized_views_ordered_dict.items()
-    }
-    short_referenced_table_names_by_view_name = filter_map_values_in(
+) -> Dict[str, List[str]]:
+    view_by_materialized_view_name_map = get_view_by_materialized_view_name_map(
+        materialized_views_ordered_dict
+    )
+    return filter_map_values_in(
         {
             view_name: [
                 get_resolved_short_table_name(
@@ -173,11 +217,183 @@ def determine_insert_order_for_view_names_and_referenced_tables(
         },
         view_mapping,
     )
-    all_view_names = list(view_mapping.keys())
-    result_view_names = []
-    result_view_names = add_names_with_referenced_names_recursively(
-        result_view_names, all_view_names,
-        short_referenced_table_names_by_view_name)
+
+
+def get_dependent_view_names_by_view_name_map(
+        view_mapping: OrderedDict,
+        referenced_table_names_by_view_name: Dict[str, List[str]],
+        materialized_views_ordered_dict: OrderedDict,
+) -> Dict[str, List[str]]:
+    """
+    The reverse of get_referenced_view_names_by_view_name_map,
+    i.e. maps every view to the views referencing it (in the order of view_mapping).
+    """
+    dependent_view_names_by_view_name: Dict[str, List[str]] = {
+        view_name: [] for view_name in view_mapping.keys()
+    }
+    for view_name, referenced_view_names in get_referenced_view_names_by_view_name_map(
+            view_mapping,
+            referenced_table_names_by_view_name,
+            materialized_views_ordered_dict).items():
+        for referenced_view_name in OrderedDict.fromkeys(referenced_view_names):
+            if referenced_view_name != view_name:
+                dependent_view_names_by_view_name[referenced_view_name].append(view_name)
+    return dependent_view_names_by_view_name
+
+
+def build_view_graph(
+        view_mapping: OrderedDict,
+        referenced_table_names_by_view_name: Dict[str, List[str]],
+        materialized_views_ordered_dict: OrderedDict,
+) -> ViewGraph:
+    return ViewGraph(
+        view_names=list(view_mapping.keys()),
+        view_by_materialized_table_name=get_view_by_materialized_view_name_map(
+            materialized_views_ordered_dict
+        ),
+        referenced_view_names_by_view_name=get_referenced_view_names_by_view_name_map(
+            view_mapping,
+            referenced_table_names_by_view_name,
+            materialized_views_ordered_dict
+        ),
+        dependent_view_names_by_view_name=get_dependent_view_names_by_view_name_map(
+            view_mapping,
+            referenced_table_names_by_view_name,
+            materialized_views_ordered_dict
+        )
+    )
+
+
+def get_view_graph(
+        base_dir: str,
+        view_mapping: OrderedDict,
+        materialized_views_ordered_dict: OrderedDict,
+) -> ViewGraph:
+    """
+    Returns the indexed view graph (see graph_index) if it is for the same views
+    and materialized tables, and its view templates are unchanged.
+    Otherwise the view graph is built from the table references of the view templates.
+    """
+    view_graph = get_template_repository().get_view_graph(
+        OrderedDict([
+            (view_name, get_view_template_file(base_dir, view_name))
+            for view_name in view_mapping.keys()
+        ]),
+        get_view_by_materialized_view_name_map(materialized_views_ordered_dict)
+    )
+    if view_graph is not None:
+        LOGGER.debug('using indexed view graph (%d views)', len(view_graph.view_names))
+        return view_graph
+    return build_view_graph(
+        view_mapping,
+        get_referenced_table_names_by_view_name_map(base_dir, view_mapping),
+        materialized_views_ordered_dict
+    )
+
+
+def get_reachable_names(
+        start_names: Iterable[str],
+        next_names_by_name: Dict[str, List[str]]) -> List[str]:
+    """
+    Returns the start names and all of the names reachable from them (transitively),
+    in the order they were first reached.
+    """
+    reachable_names: 'OrderedDict[str, None]' = OrderedDict()
+    remaining_names = deque(start_names)
+    while remaining_names:
+        name = remaining_names.popleft()
+        if name in reachable_names:
+            continue
+        reachable_names[name] = None
+        remaining_names.extend(next_names_by_name.get(name, []))
+    return list(reachable_names.keys())
+
+
+SELECTOR_GRAPH_OPERATOR = "+"
+
+
+def is_view_name_selector(view_name_or_selector: str) -> bool:
+    return (
+        view_name_or_selector.startswith(SELECTOR_GRAPH_OPERATOR)
+        or view_name_or_selector.endswith(SELECTOR_GRAPH_OPERATOR)
+    )
+
+
+def resolve_view_name_selectors(
+        view_names_or_selectors: List[str],
+        base_dir: str,
+        view_names_ordered_dict: OrderedDict,
+        materialized_views_ordered_dict: OrderedDict,
+) -> List[str]:
+    """
+    Resolves selectors against the reference graph of the views:
+    "+view" selects the view and the views it references (transitively),
+    "view+" selects the view and the views referencing it (transitively),
+    "+view+" selects both.
+    Plain view names are returned as they are, and if there are no selectors,
+    the view names are returned unchanged (in the given order).
+    Otherwise, the selected views are returned in the order of view_names_ordered_dict,
+    followed by any plain view names that are not part of it.
+    """
+    if not any(is_view_name_selector(value) for value in view_names_or_selectors):
+        return view_names_or_selectors
+    view_graph = get_view_graph(
+        base_dir, view_names_ordered_dict, materialized_views_ordered_dict
+    )
+    selected_view_names: Set[str] = set()
+    other_view_names: List[str] = []
+    for value in view_names_or_selectors:
+        view_name = value.strip(SELECTOR_GRAPH_OPERATOR)
+        if not is_view_name_selector(value):
+            if view_name in view_names_ordered_dict:
+                selected_view_names.add(view_name)
+            elif view_name not in other_view_names:
+                other_view_names.append(view_name)
+            continue
+        if view_name not in view_names_ordered_dict:
+            raise ValueError(f'view selector {value} refers to unknown view: {view_name}')
+        selected_view_names.add(view_name)
+        if value.startswith(SELECTOR_GRAPH_OPERATOR):
+            selected_view_names.update(
+                get_reachable_names([view_name], view_graph.referenced_view_names_by_view_name)
+            )
+        if value.endswith(SELECTOR_GRAPH_OPERATOR):
+            selected_view_names.update(
+                get_reachable_names([view_name], view_graph.dependent_view_names_by_view_name)
+            )
+    result = [
+        view_name
+        for view_name in view_names_ordered_dict.keys()
+        if view_name in selected_view_names
+    ] + other_view_names
+    LOGGER.info('resolved view selectors %s to: %s', view_names_or_selectors, result)
+    return result
+
+
+def determine_insert_order_for_view_names_and_referenced_tables(
+        view_mapping: OrderedDict,
+        referenced_table_names_by_view_name: Dict[str, List[str]],
+        materialized_views_ordered_dict: OrderedDict,
+) -> OrderedDict:
+    LOGGER.debug('referenced_table_names_by_view_name: %s', referenced_table_names_by_view_name)
+    return determine_insert_order_for_view_names_and_referenced_view_names(
+        view_mapping,
+        get_referenced_view_names_by_view_name_map(
+            view_mapping,
+            referenced_table_names_by_view_name,
+            materialized_views_ordered_dict,
+        )
+    )
+
+
+def determine_insert_order_for_view_names_and_referenced_view_names(
+        view_mapping: OrderedDict,
+        referenced_view_names_by_view_name: Dict[str, List[str]],
+) -> OrderedDict:
+    result_view_names = get_dependency_level_by_name_in_insert_order(
+        list(view_mapping.keys()),
+        referenced_view_names_by_view_name
+    ).keys()
 
     view_insert_order_ordereddict = OrderedDict()
     for result_view_name in result_view_names:
@@ -191,27 +407,114 @@ def determine_view_insert_order(
         view_names_ordered_dict: OrderedDict,
         materialized_views_ordered_dict: OrderedDict,
 ) -> OrderedDict:
-    return determine_insert_order_for_view_names_and_referenced_tables(
+    return determine_insert_order_for_view_names_and_referenced_view_names(
+        view_names_ordered_dict,
+        get_view_graph(
+            base_dir, view_names_ordered_dict, materialized_views_ordered_dict
+        ).referenced_view_names_by_view_name
+    )
+
+
+def determine_insert_levels_for_view_names_and_referenced_tables(
+        view_mapping: OrderedDict,
+        referenced_table_names_by_view_name: Dict[str, List[str]],
+        materialized_views_ordered_dict: OrderedDict,
+) -> List[OrderedDict]:
+    """
+    Groups the views into levels, where every view only references views of previous levels.
+    Views within the same level do not depend on each other.
+    """
+    return determine_insert_levels_for_view_names_and_referenced_view_names(
+        view_mapping,
+        get_referenced_view_names_by_view_name_map(
+            view_mapping,
+            referenced_table_names_by_view_name,
+            materialized_views_ordered_dict,
+        )
+    )
+
+
+def determine_insert_levels_for_view_names_and_referenced_view_names(
+        view_mapping: OrderedDict,
+        referenced_view_names_by_view_name: Dict[str, List[str]],
+) -> List[OrderedDict]:
+    level_by_view_name = get_dependency_level_by_name_in_insert_order(
+        list(view_mapping.keys()),
+        referenced_view_names_by_view_name
+    )
+    levels: List[OrderedDict] = [
+        OrderedDict() for _ in range(1 + max(level_by_view_name.values(), default=-1))
+    ]
+    for view_name, level in level_by_view_name.items():
+        levels[level][view_name] = view_mapping.get(view_name)
+    return levels
+
+
+def determine_view_insert_levels(
+        base_dir: str,
+        view_names_ordered_dict: OrderedDict,
+        materialized_views_ordered_dict: OrderedDict,
+) -> List[OrderedDict]:
+    return determine_insert_levels_for_view_names_and_referenced_view_names(
         view_names_ordered_dict,
-        get_referenced_table_names_by_view_name_map(base_dir,
-                                                    view_names_ordered_dict),
-        materialized_views_ordered_dict,
+        get_view_graph(
+            base_dir, view_names_ordered_dict, materialized_views_ordered_dict
+        ).referenced_view_names_by_view_name
+    )
+
+
+def get_referenced_materialized_view_names_by_view_name_map(
+        view_mapping: OrderedDict,
+        referenced_table_names_by_view_name: Dict[str, List[str]],
+        materialized_views_ordered_dict: OrderedDict,
+) -> Dict[str, List[str]]:
+    """
+    Maps every materialized view to the materialized views whose tables it reads from,
+    either directly or via other (not materialized) views.
+    """
+    view_by_materialized_view_name_map = get_view_by_materialized_view_name_map(
+        materialized_views_ordered_dict
     )
+    result = {}
+    for view_name in materialized_views_ordered_dict.keys():
+        referenced_materialized_view_names = []
+        visited_view_names = {view_name}
+        remaining_view_names = [view_name]
+        while remaining_view_names:
+            current_view_name = remaining_view_names.pop()
+            for referenced_table_name in referenced_table_names_by_view_name.get(
+                    current_view_name, []):
+                short_table_name = get_short_table_name(referenced_table_name)
+                materialized_view_name = view_by_materialized_view_name_map.get(
+                    short_table_name
+                )
+                if materialized_view_name is not None:
+                    if materialized_view_name not in referenced_materialized_view_names:
+                        referenced_materialized_view_names.append(materialized_view_name)
+                    continue
+                if short_table_name in view_mapping and short_table_name not in visited_view_names:
+                    visited_view_names.add(short_table_name)
+                    remaining_view_names.append(short_table_name)
+        result[view_name] = referenced_materialized_view_names
+    return result
 
 
 class ViewCondition:
     def __init__(
             self,
             if_condition: Dict[str, str],
-            materialize_as: str = None):
+            materialize_as: str = None,
+            max_bytes_billed: int = None):
         self.if_condition = if_condition
         self.materialize_as = materialize_as
+        self.max_bytes_billed = max_bytes_billed
 
     @staticmethod
     def from_value(value: dict) -> 'ViewCondition':
         return ViewCondition(
             if_condition=value.get('if'),
-            materialize_as=value.get('materialize_as')
+            materialize_as=value.get('materialize_as'),
+            max_bytes_billed=value.get('max_bytes_billed')
         )
 
     def to_value(self) -> dict:
@@ -220,6 +523,8 @@ class ViewCondition:
             value['if'] = self.if_condition
         if self.materialize_as is not None:
             value['materialize_as'] = self.materialize_as
+        if self.max_bytes_billed is not None:
+            value['max_bytes_billed'] = self.max_bytes_billed
         return value
 
     def __str__(self):
@@ -229,7 +534,8 @@ class ViewCondition:
         return (
             type(self).__name__
             + f'(if_condition={repr(self.if_condition)}'
-            + f', materialize_as={repr(self.materialize_as)})'
+            + f', materialize_as={repr(self.materialize_as)}'
+            + f', max_bytes_billed={repr(self.max_bytes_billed)})'
         )
 
     def get_values(self) -> dict:
@@ -252,11 +558,13 @@ class ViewConfig:
             view_name: str,
             materialize: bool = None,
             materialize_as: str = None,
-            conditions: List[ViewCondition] = None):
+            conditions: List[ViewCondition] = None,
+            max_bytes_billed: int = None):
         self.view_name = view_name
         self.materialize = materialize
         self.materialize_as = materialize_as
         self.conditions = conditions or []
+        self.max_bytes_billed = max_bytes_billed
 
     @staticmethod
     def from_value(value: Union[str, dict]) -> 'ViewConfig':
@@ -271,7 +579,8 @@ class ViewConfig:
             return ViewConfig(
                 view_name,
                 materialize=view_args.get('materialize'),
-                conditions=conditions
+                conditions=conditions,
+                max_bytes_billed=view_args.get('max_bytes_billed')
             )
         raise ValueError(f'unrecognised view config: {repr(value)}')
 
@@ -281,6 +590,8 @@ class ViewConfig:
             view_args['materialize'] = self.materialize
         if self.materialize_as is not None:
             view_args['materialize_as'] = self.materialize_as
+        if self.max_bytes_billed is not None:
+            view_args['max_bytes_billed'] = self.max_bytes_billed
         if self.conditions:
             view_args['conditions'] = [
                 condition.to_value()
@@ -299,7 +610,8 @@ class ViewConfig:
             + f'({repr(self.view_name)}'
             + f', materialize={repr(self.materialize)}'
             + f', materialize_as={repr(self.materialize_as)}'
-            + f', conditions={repr(self.conditions)})'
+            + f', conditions={repr(self.conditions)}'
+            + f', max_bytes_billed={repr(self.max_bytes_billed)})'
         )
 
     @property
@@ -411,6 +723,8 @@ class ViewListConfig:
                 DATASET_NAME_KEY: output_dataset_name,
                 VIEW_OR_TABLE_NAME_KEY: output_table_name
             }
+            if view.max_bytes_billed is not None:
+                result[view.view_name][MAX_BYTES_BILLED_KEY] = view.max_bytes_billed
         return result
 
 
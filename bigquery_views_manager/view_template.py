@@ -1,11 +1,104 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import List, Optional, Union
 import re
 
+from .file_utils import write_text_atomically
+
+
+PROJECT_PLACEHOLDER = "{project}"
+DATASET_PLACEHOLDER = "{dataset}"
+PROJECT_DATASET_PLACEHOLDER = PROJECT_PLACEHOLDER + "." + DATASET_PLACEHOLDER + "."
+
+# note: the unescaped dots match any character (kept for compatibility)
+TABLE_REFERENCE_PATTERN = re.compile(
+    "".join([PROJECT_PLACEHOLDER, ".", DATASET_PLACEHOLDER, ".", r"[\w]*"])
+)
+
+
+def get_referenced_table_names_for_query(view_query: str) -> List[str]:
+    return re.findall(r"`(.*)`", view_query)
+
+
+@lru_cache(maxsize=32)
+def _get_project_dataset_prefix_pattern(project: str) -> re.Pattern:
+    return re.compile("".join(["`", project, r"\.[\w]*\."]))
+
 
 def replace_query_with_placeholders(query: str, project: str) -> str:
-    regex_pattern = "".join(["`", project, r"\.[\w]*\."])
-    n_query = re.sub(regex_pattern, "`{project}.{dataset}.", query)
-    return n_query
+    return _get_project_dataset_prefix_pattern(project).sub("`{project}.{dataset}.", query)
+
+
+class CompiledQueryTemplate:
+    """
+    A query template split into literal and placeholder segments, so that it can be
+    rendered in a single pass.
+
+    The dataset of the first referenced table is looked up in the view to dataset mapping
+    (wherever that table is referenced), any other dataset placeholder is replaced by
+    the default dataset. Templates without any table reference are left unchanged.
+    """
+    _PROJECT = 0
+    _DATASET = 1
+    _FIRST_TABLE_DATASET = 2
+
+    def __init__(self, segments: List[Union[str, int]], first_table_name: Optional[str]):
+        self.segments = segments
+        self.first_table_name = first_table_name
+
+    @staticmethod
+    def compile(query_template: str) -> 'CompiledQueryTemplate':
+        first_match = TABLE_REFERENCE_PATTERN.search(query_template)
+        if first_match is None:
+            return CompiledQueryTemplate([query_template], first_table_name=None)
+        first_table_name = first_match.group(0).replace(PROJECT_DATASET_PLACEHOLDER, "")
+        token_patterns = [re.escape(PROJECT_PLACEHOLDER)]
+        if PROJECT_PLACEHOLDER not in first_table_name:
+            token_patterns.append(re.escape(DATASET_PLACEHOLDER + "." + first_table_name))
+        token_patterns.append(re.escape(DATASET_PLACEHOLDER))
+        segments: List[Union[str, int]] = []
+        literal_start = 0
+        for match in re.finditer("|".join(token_patterns), query_template):
+            segments.append(query_template[literal_start:match.start()])
+            token = match.group(0)
+            if token == PROJECT_PLACEHOLDER:
+                segments.append(CompiledQueryTemplate._PROJECT)
+            elif token == DATASET_PLACEHOLDER:
+                segments.append(CompiledQueryTemplate._DATASET)
+            else:
+                segments.append(CompiledQueryTemplate._FIRST_TABLE_DATASET)
+            literal_start = match.end()
+        segments.append(query_template[literal_start:])
+        return CompiledQueryTemplate(
+            [segment for segment in segments if segment != ""],
+            first_table_name=first_table_name
+        )
+
+    def render(
+            self,
+            project: str,
+            default_dataset: str,
+            view_to_dataset_mapping: dict) -> str:
+        if self.first_table_name is None:
+            return "".join(self.segments)
+        values = {
+            CompiledQueryTemplate._PROJECT: project,
+            CompiledQueryTemplate._DATASET: default_dataset,
+            CompiledQueryTemplate._FIRST_TABLE_DATASET: "".join([
+                view_to_dataset_mapping.get(self.first_table_name, default_dataset),
+                ".",
+                self.first_table_name
+            ])
+        }
+        return "".join([
+            segment if isinstance(segment, str) else values[segment]
+            for segment in self.segments
+        ])
+
+
+@lru_cache(maxsize=1024)
+def compile_query_template(query_template: str) -> CompiledQueryTemplate:
+    return CompiledQueryTemplate.compile(query_template)
 
 
 def resolve_query_template_placeholders(
@@ -14,25 +107,11 @@ def resolve_query_template_placeholders(
         default_dataset: str,
         view_to_dataset_mapping: dict,
 ) -> str:
-    dataset_placeholder = "{dataset}."
-    project_placeholder = "{project}."
-    placeholder = "".join([project_placeholder, dataset_placeholder])
-    regex_pattern = "".join(
-        [project_placeholder, dataset_placeholder, r"[\w]*"])
-    all_occurrences = re.findall(regex_pattern, query_template)
-    tables_present_in_template = [
-        x.replace(placeholder, "") for x in all_occurrences
-    ]
-
-    for table in tables_present_in_template:
-        dataset_table_placeholder_to_replace = "".join(
-            [dataset_placeholder, table])
-        new_dataset_table_name = "".join(
-            [view_to_dataset_mapping.get(table, default_dataset), ".", table])
-        query_template = (query_template.replace("{project}", project).replace(
-            dataset_table_placeholder_to_replace,
-            new_dataset_table_name).replace("{dataset}", default_dataset))
-    return query_template
+    return compile_query_template(query_template).render(
+        project=project,
+        default_dataset=default_dataset,
+        view_to_dataset_mapping=view_to_dataset_mapping,
+    )
 
 
 def normalize_view_template(query_template: str) -> str:
@@ -66,7 +145,7 @@ class ViewTemplate:
         return self.view_template_content
 
     def to_file(self, filename: str):
-        return Path(filename).write_text(self.view_template_content, encoding='utf-8')
+        write_text_atomically(filename, self.view_template_content)
 
     def substitute(self, project: str, default_dataset: str,
                    view_to_dataset_mapping: dict) -> str:
@@ -1,25 +1,38 @@
 from pathlib import Path
-from typing import Dict
-
-from google.cloud import bigquery
+from typing import TYPE_CHECKING, Dict
 
+from .template_repository import get_template_repository
 from .view_template import ViewTemplate
 
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
 
-def get_bq_view_names(client: bigquery.Client, dataset: str):
+def get_bq_view_names(client: 'bigquery.Client', dataset: str):
     return [
         table.table_id for table in client.list_tables(dataset=dataset)
         if table.table_type == "VIEW"
     ]
 
 
-def get_bq_view_query(client: bigquery.Client, view_name: str, dataset: str):
+def get_bq_view_query(client: 'bigquery.Client', view_name: str, dataset: str):
     dataset_ref = client.dataset(dataset)
     view_ref = dataset_ref.table(view_name)
     view = client.get_table(view_ref)
     return view.view_query
 
 
+def get_bq_view_query_by_view_name_map(client: 'bigquery.Client', dataset: str) -> Dict[str, str]:
+    query = (
+        "SELECT table_name, view_definition"
+        f" FROM `{client.project}.{dataset}.INFORMATION_SCHEMA.VIEWS`"
+    )
+    return {
+        row["table_name"]: row["view_definition"]
+        for row in client.query(query).result()
+    }
+
+
 def get_view_template_file(base_dir: str, view_file_name: str) -> str:
     return Path(base_dir).joinpath(f"{view_file_name}.sql")
 
@@ -28,7 +41,7 @@ def get_local_view_template(base_dir: str,
                             view_template_file_name: str) -> ViewTemplate:
     view_template_file = get_view_template_file(base_dir,
                                                 view_template_file_name)
-    return ViewTemplate.from_file(view_template_file)
+    return get_template_repository().get_view_template(view_template_file)
 
 
 def get_local_view_query(
@@ -0,0 +1,224 @@
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from google.cloud import bigquery
+
+from .caching_client import CachingClient
+from .defaults import DEFAULT_POLL_INTERVAL
+from .scheduler import DEFAULT_MAX_WORKERS
+from .update_views import update_or_create_views
+from .view_list import (
+    determine_insert_order_for_view_names_and_referenced_view_names,
+    get_mapped_materialized_view_subset,
+    get_reachable_names,
+    get_view_graph,
+    load_view_list_config,
+    map_view_to_dataset_from_template_mapping_dict
+)
+
+LOGGER = logging.getLogger(__name__)
+
+FileState = Tuple[int, int]
+
+
+def get_file_state_by_path_map(paths: List[Path]) -> Dict[Path, FileState]:
+    file_state_by_path = {}
+    for path in paths:
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            continue
+        file_state_by_path[path] = (stat_result.st_mtime_ns, stat_result.st_size)
+    return file_state_by_path
+
+
+def get_changed_paths(
+        previous_file_state_by_path: Dict[Path, FileState],
+        file_state_by_path: Dict[Path, FileState]) -> Set[Path]:
+    return {
+        path
+        for path in set(previous_file_state_by_path) | set(file_state_by_path)
+        if previous_file_state_by_path.get(path) != file_state_by_path.get(path)
+    }
+
+
+class ViewsWatcher:  # pylint: disable=too-many-instance-attributes
+    """
+    Polls the view list config and the view templates for changes,
+    and redeploys the changed views together with the views depending on them.
+    Changed views that failed to deploy are retried on the next poll.
+    The view list config is only reloaded if it changed, and view templates are only
+    parsed again if they changed (via the template repository).
+    """
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            client: bigquery.Client,
+            view_list_config_path: str,
+            dataset: str,
+            max_workers: int = DEFAULT_MAX_WORKERS,
+            materialize: bool = False):
+        self.client = client
+        self.view_list_config_path = Path(view_list_config_path)
+        self.base_dir = self.view_list_config_path.parent
+        self.dataset = dataset
+        self.max_workers = max_workers
+        self.materialize = materialize
+        self.views_ordered_dict_all = OrderedDict()
+        self.materialized_view_ordered_dict_all = OrderedDict()
+        self._file_state_by_path: Dict[Path, FileState] = {}
+        self._pending_view_names: Set[str] = set()
+        self._load_view_list_config()
+        self._file_state_by_path = self._get_file_state_by_path_map()
+
+    def _get_file_state_by_path_map(self) -> Dict[Path, FileState]:
+        return get_file_state_by_path_map(
+            [self.view_list_config_path] + sorted(self.base_dir.glob('*.sql'))
+        )
+
+    def _load_view_list_config(self) -> Set[str]:
+        """
+        (Re)loads the view list config and returns the names of new or changed view entries.
+        """
+        view_list_config = load_view_list_config(
+            self.view_list_config_path
+        ).resolve_conditions({
+            'project': self.client.project,
+            'dataset': self.dataset
+        })
+        previous_views_ordered_dict_all = self.views_ordered_dict_all
+        previous_materialized_view_ordered_dict_all = self.materialized_view_ordered_dict_all
+        self.views_ordered_dict_all = view_list_config.to_views_ordered_dict(self.dataset)
+        self.materialized_view_ordered_dict_all = (
+            view_list_config.to_materialized_view_ordered_dict(self.dataset)
+        )
+        return {
+            view_name
+            for view_name, dataset_view_data in self.views_ordered_dict_all.items()
+            if (
+                previous_views_ordered_dict_all.get(view_name) != dataset_view_data
+                or previous_materialized_view_ordered_dict_all.get(view_name)
+                != self.materialized_view_ordered_dict_all.get(view_name)
+            )
+        }
+
+    @property
+    def _materialized_view_ordered_dict(self) -> OrderedDict:
+        return self.materialized_view_ordered_dict_all if self.materialize else OrderedDict()
+
+    def get_changed_view_names(self) -> Set[str]:
+        file_state_by_path = self._get_file_state_by_path_map()
+        changed_paths = get_changed_paths(self._file_state_by_path, file_state_by_path)
+        if not changed_paths:
+            return set()
+        LOGGER.debug('changed files: %s', sorted(changed_paths))
+        changed_view_names = set()
+        if self.view_list_config_path in changed_paths:
+            LOGGER.info('view list config changed: %s', self.view_list_config_path)
+            changed_view_names.update(self._load_view_list_config())
+        for path in changed_paths:
+            if path == self.view_list_config_path:
+                continue
+            if path not in file_state_by_path:
+                LOGGER.info('view template removed (not deploying): %s', path)
+                continue
+            if path.stem in self.views_ordered_dict_all:
+                changed_view_names.add(path.stem)
+        # only once the view list config was (re)loaded successfully
+        self._file_state_by_path = file_state_by_path
+        return changed_view_names
+
+    def get_affected_view_ordered_dict(self, changed_view_names: Set[str]) -> OrderedDict:
+        """
+        Returns the changed views and the views depending on them (transitively),
+        in insert order.
+        """
+        view_graph = get_view_graph(
+            self.base_dir, self.views_ordered_dict_all, self._materialized_view_ordered_dict
+        )
+        affected_view_names = set(get_reachable_names(
+            [
+                view_name
+                for view_name in self.views_ordered_dict_all.keys()
+                if view_name in changed_view_names
+            ],
+            view_graph.dependent_view_names_by_view_name
+        ))
+        return OrderedDict([
+            (view_name, dataset_view_data)
+            for view_name, dataset_view_data in (
+                determine_insert_order_for_view_names_and_referenced_view_names(
+                    self.views_ordered_dict_all,
+                    view_graph.referenced_view_names_by_view_name
+                ).items()
+            )
+            if view_name in affected_view_names
+        ])
+
+    def deploy_views(self, views_dict: OrderedDict):
+        view_to_dataset_mapping = map_view_to_dataset_from_template_mapping_dict(
+            self.views_ordered_dict_all
+        )
+        view_to_dataset_mapping.update(
+            map_view_to_dataset_from_template_mapping_dict(
+                self.materialized_view_ordered_dict_all
+            )
+        )
+        update_or_create_views(
+            self.client,
+            self.base_dir,
+            views_dict,
+            materialized_view_names=get_mapped_materialized_view_subset(
+                self._materialized_view_ordered_dict, set(views_dict.keys())
+            ),
+            project=self.client.project,
+            default_dataset=self.dataset,
+            view_to_dataset_mapping=view_to_dataset_mapping,
+            max_workers=self.max_workers
+        )
+
+    def poll_once(self) -> List[str]:
+        """
+        Redeploys the views affected by changes since the last poll,
+        and returns their names (errors are logged, so that watching can continue).
+        """
+        try:
+            changed_view_names = self.get_changed_view_names() | self._pending_view_names
+            if not changed_view_names:
+                return []
+            # kept until the views were deployed successfully
+            self._pending_view_names = changed_view_names
+            if isinstance(self.client, CachingClient):
+                # the tables may have been changed by others since the last deployment
+                self.client.clear_cache()
+            views_dict = self.get_affected_view_ordered_dict(changed_view_names)
+            LOGGER.info(
+                'redeploying %d views (changed: %s): %s',
+                len(views_dict), sorted(changed_view_names), list(views_dict.keys())
+            )
+            start = time.perf_counter()
+            self.deploy_views(views_dict)
+            self._pending_view_names = set()
+            LOGGER.info('redeployed views, took: %.3fs', time.perf_counter() - start)
+            return list(views_dict.keys())
+        except Exception as exc:  # pylint: disable=broad-except
+            LOGGER.error(
+                'failed to redeploy views (retrying on the next poll): %s', exc, exc_info=True
+            )
+            return []
+
+    def run(self, poll_interval: float = DEFAULT_POLL_INTERVAL, max_polls: Optional[int] = None):
+        LOGGER.info(
+            'watching %s and %s/*.sql for changes (press Ctrl+C to stop)',
+            self.view_list_config_path, self.base_dir
+        )
+        poll_count = 0
+        try:
+            while max_polls is None or poll_count < max_polls:
+                self.poll_once()
+                poll_count += 1
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            LOGGER.info('stopped watching')
@@ -21,6 +21,10 @@ setup(
     author="eLife Sciences Publications, Ltd",
     url="https://github.com/elifesciences/bigquery-views-manager",
     install_requires=REQUIRED_PACKAGES,
+    extras_require={
+        'parquet': ['pyarrow'],
+        'avro': ['fastavro']
+    },
     packages=packages,
     include_package_data=True,
     description='BigQuery Views Manager',
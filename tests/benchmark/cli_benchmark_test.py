@@ -0,0 +1,206 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List
+from unittest.mock import patch
+
+import pytest
+
+import bigquery_views_manager.cli as cli_module
+from bigquery_views_manager.cli import main
+from bigquery_views_manager.config_tables import CONFIG_TABLES_DIR, CONFIG_TABLES_SCHEMA_DIR
+from bigquery_views_manager.watch import ViewsWatcher
+
+from ..fake_bigquery_client import FakeBigQueryClient
+
+
+LOGGER = logging.getLogger(__name__)
+
+PROJECT_1 = 'project1'
+DATASET_1 = 'dataset1'
+
+VIEW_COUNTS = [10, 100, 1000, 10000]
+CONFIG_TABLE_COUNT = 5
+MATERIALIZE_EVERY_NTH_VIEW = 10
+
+LATENCY_VIEW_COUNT = 100
+LATENCY = 0.01
+LATENCY_JOBS = [1, 8]
+
+
+def _get_view_name(index: int) -> str:
+    return f'view_{index:05d}'
+
+
+def _get_config_table_name(index: int) -> str:
+    return f'config_table_{index}'
+
+
+def _get_view_query_template(index: int) -> str:
+    # every view references its "parent" view (forming a balanced tree),
+    # some views also reference a config table
+    referenced_table_names = [_get_view_name((index - 1) // 2)] if index else []
+    if index % MATERIALIZE_EVERY_NTH_VIEW == 0:
+        referenced_table_names.append(_get_config_table_name(index % CONFIG_TABLE_COUNT))
+    if not referenced_table_names:
+        return f'SELECT {index} AS id'
+    return '\nUNION ALL\n'.join(
+        f'SELECT id FROM `{{project}}.{{dataset}}.{table_name}`'
+        for table_name in referenced_table_names
+    )
+
+
+def _write_synthetic_repo(base_dir: Path, view_count: int) -> Path:
+    views_dir = base_dir / 'views'
+    views_dir.mkdir()
+    view_list_config_lines = []
+    for index in range(view_count):
+        view_name = _get_view_name(index)
+        (views_dir / f'{view_name}.sql').write_text(_get_view_query_template(index))
+        if index % MATERIALIZE_EVERY_NTH_VIEW == 0:
+            view_list_config_lines.extend([f'- {view_name}:', '    materialize: true'])
+        else:
+            view_list_config_lines.append(f'- {view_name}')
+    view_list_config_path = views_dir / 'views.yml'
+    view_list_config_path.write_text('\n'.join(view_list_config_lines) + '\n')
+
+    tables_dir = base_dir / 'config-tables' / CONFIG_TABLES_DIR
+    schema_dir = base_dir / 'config-tables' / CONFIG_TABLES_SCHEMA_DIR
+    tables_dir.mkdir(parents=True)
+    schema_dir.mkdir(parents=True)
+    for index in range(CONFIG_TABLE_COUNT):
+        config_table_name = _get_config_table_name(index)
+        (tables_dir / f'{config_table_name}.csv').write_text(
+            'id,name\n' + ''.join(f'{row},name {row}\n' for row in range(100))
+        )
+        (schema_dir / f'{config_table_name}_schema.json').write_text(json.dumps([
+            {'name': 'id', 'type': 'INTEGER', 'mode': 'REQUIRED'},
+            {'name': 'name', 'type': 'STRING'}
+        ]))
+    return view_list_config_path
+
+
+@pytest.fixture(name='production_log_level', autouse=True)
+def _production_log_level():
+    # debug logging would add API calls (e.g. get_table after updating a view)
+    logger = logging.getLogger('bigquery_views_manager')
+    previous_level = logger.level
+    logger.setLevel(logging.INFO)
+    yield
+    logger.setLevel(previous_level)
+
+
+class _Benchmark:
+    def __init__(self, client: FakeBigQueryClient, view_count: int):
+        self.client = client
+        self.view_count = view_count
+        self.report_lines: List[str] = []
+        self.duration_by_name: Dict[str, float] = {}
+
+    def measure(self, name: str, func) -> dict:
+        self.client.reset_call_counts()
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        self.duration_by_name[name] = duration
+        call_count_by_method_name = dict(self.client.call_count_by_method_name)
+        self.report_lines.append(
+            f'{self.view_count:>6} views | {name:<32} | {duration:>8.3f}s'
+            f' | {sum(call_count_by_method_name.values()):>6} API calls'
+            f' {dict(sorted(call_count_by_method_name.items()))}'
+        )
+        return call_count_by_method_name
+
+    def run_cli(self, args: List[str], name: str = None) -> dict:
+        return self.measure(name or args[0], lambda: main(args + [f'--dataset={DATASET_1}']))
+
+
+@pytest.mark.slow
+class TestCliBenchmark:
+    @pytest.mark.parametrize('view_count', VIEW_COUNTS)
+    def test_should_run_every_sub_command(  # pylint: disable=too-many-locals
+            self, temp_dir: Path, view_count: int):
+        view_list_config_path = _write_synthetic_repo(temp_dir, view_count)
+        view_list_config_arg = f'--view-list-config={view_list_config_path}'
+        config_tables_base_dir_arg = f'--config-tables-base-dir={temp_dir / "config-tables"}'
+        materialized_view_count = len(range(0, view_count, MATERIALIZE_EVERY_NTH_VIEW))
+        client = FakeBigQueryClient(project=PROJECT_1, datasets=[DATASET_1])
+        benchmark = _Benchmark(client, view_count)
+
+        with patch.object(cli_module, 'get_bigquery_client', return_value=client):
+            benchmark.run_cli(['sort-view-list', view_list_config_arg])
+            benchmark.run_cli(['validate-config-tables', config_tables_base_dir_arg])
+            call_counts = benchmark.run_cli(
+                ['create-or-replace-config-tables', config_tables_base_dir_arg]
+            )
+            assert call_counts['load_table_from_file'] == CONFIG_TABLE_COUNT
+            call_counts = benchmark.run_cli(['create-or-replace-views', view_list_config_arg])
+            assert call_counts['query'] == view_count
+            call_counts = benchmark.run_cli([
+                'create-or-replace-views', view_list_config_arg, '--only-changed'
+            ])
+            assert call_counts['query'] == 1
+            benchmark.run_cli(['create-or-replace-views', view_list_config_arg, '--batch-ddl'])
+            call_counts = benchmark.run_cli(['materialize-views', view_list_config_arg])
+            assert call_counts['query'] == materialized_view_count
+            benchmark.run_cli(['materialize-views', view_list_config_arg, '--incremental'])
+            benchmark.run_cli(['materialize-views', view_list_config_arg, '--dry-run'])
+            call_counts = benchmark.run_cli(['diff-views', view_list_config_arg])
+            assert call_counts['query'] == 1
+            benchmark.run_cli(['get-views', view_list_config_arg])
+            benchmark.run_cli(['deploy', view_list_config_arg, config_tables_base_dir_arg])
+
+            watcher = ViewsWatcher(client, str(view_list_config_path), dataset=DATASET_1)
+            leaf_view_template = view_list_config_path.parent / (
+                _get_view_name(view_count - 1) + '.sql'
+            )
+            leaf_view_template.write_text('SELECT 0 AS id')
+            redeployed_view_names = []
+            benchmark.measure(
+                'watch (one leaf view changed)',
+                lambda: redeployed_view_names.extend(watcher.poll_once())
+            )
+            assert redeployed_view_names == [_get_view_name(view_count - 1)]
+
+            call_counts = benchmark.run_cli(
+                ['delete-materialized-tables', view_list_config_arg]
+            )
+            assert call_counts['delete_table'] == materialized_view_count
+            call_counts = benchmark.run_cli(['delete-views', view_list_config_arg])
+            assert call_counts['list_tables'] == 1
+            assert call_counts['delete_table'] == view_count
+            benchmark.run_cli(['delete-config-tables', config_tables_base_dir_arg])
+
+        LOGGER.info('benchmark results:\n%s', '\n'.join(benchmark.report_lines))
+        assert not client.list_tables(DATASET_1)
+
+    def test_should_run_faster_with_more_jobs_when_api_calls_have_latency(
+            self, temp_dir: Path):
+        view_list_config_path = _write_synthetic_repo(temp_dir, LATENCY_VIEW_COUNT)
+        view_list_config_arg = f'--view-list-config={view_list_config_path}'
+        config_tables_base_dir_arg = f'--config-tables-base-dir={temp_dir / "config-tables"}'
+        report_lines = []
+        duration_by_name = {}
+        for jobs in LATENCY_JOBS:
+            # a new client for every run, so that every run has to do the same work
+            client = FakeBigQueryClient(project=PROJECT_1, datasets=[DATASET_1], latency=LATENCY)
+            benchmark = _Benchmark(client, LATENCY_VIEW_COUNT)
+            with patch.object(cli_module, 'get_bigquery_client', return_value=client):
+                for args in [
+                    ['deploy', view_list_config_arg, config_tables_base_dir_arg],
+                    ['create-or-replace-views', view_list_config_arg],
+                    ['materialize-views', view_list_config_arg]
+                ]:
+                    benchmark.run_cli(args + [f'--jobs={jobs}'], name=f'{args[0]} --jobs={jobs}')
+            report_lines.extend(benchmark.report_lines)
+            duration_by_name.update(benchmark.duration_by_name)
+
+        LOGGER.info(
+            'benchmark results (%.3fs latency per API call):\n%s',
+            LATENCY, '\n'.join(report_lines)
+        )
+        for name in ['deploy', 'create-or-replace-views', 'materialize-views']:
+            assert duration_by_name[f'{name} --jobs={max(LATENCY_JOBS)}'] < (
+                duration_by_name[f'{name} --jobs={min(LATENCY_JOBS)}']
+            )
@@ -0,0 +1,70 @@
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+
+LOGGER = logging.getLogger(__name__)
+
+HEAVY_MODULE_NAMES = ['google.cloud.bigquery', 'crayons']
+
+
+def _run_python(args: List[str], cwd: Path) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args,
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def _get_imported_module_names(importtime_output: str) -> List[str]:
+    return [
+        line.rsplit('|', maxsplit=1)[-1].strip()
+        for line in importtime_output.splitlines()
+        if line.startswith('import time:')
+    ]
+
+
+@pytest.mark.slow
+class TestCliStartupBenchmark:
+    def test_should_not_import_bigquery_for_local_sub_command(self, temp_dir: Path):
+        view_list_config_path = temp_dir / 'views.yml'
+        view_list_config_path.write_text('\n'.join(['- view1', '- view2']))
+        (temp_dir / 'view1.sql').write_text('SELECT * FROM `{project}.{dataset}.view2`')
+        (temp_dir / 'view2.sql').write_text('SELECT 1')
+        start = time.perf_counter()
+        result = _run_python(
+            [
+                '-m', 'bigquery_views_manager',
+                'sort-view-list',
+                '--dataset=dataset1',
+                f'--view-list-config={view_list_config_path}'
+            ],
+            cwd=Path(__file__).parents[2]
+        )
+        duration = time.perf_counter() - start
+        LOGGER.info('sort-view-list took: %.3fs', duration)
+        imported_module_names = _get_imported_module_names(result.stderr)
+        assert 'bigquery_views_manager.cli' in imported_module_names
+        for module_name in HEAVY_MODULE_NAMES:
+            assert module_name not in imported_module_names
+        assert view_list_config_path.read_text().splitlines() == ['- view2', '- view1']
+
+    def test_should_import_cli_faster_than_bigquery(self):
+        durations = {}
+        for module_name in ['bigquery_views_manager.cli', 'google.cloud.bigquery']:
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, '-c', f'import {module_name}'],
+                cwd=Path(__file__).parents[2],
+                check=True
+            )
+            durations[module_name] = time.perf_counter() - start
+        LOGGER.info('import durations: %s', durations)
+        assert durations['bigquery_views_manager.cli'] < durations['google.cloud.bigquery']
@@ -0,0 +1,77 @@
+import importlib.util
+import logging
+import time
+from pathlib import Path
+
+import pytest
+
+from google.cloud.bigquery.schema import SchemaField
+
+from bigquery_views_manager.config_table_formats import (
+    AVRO_UPLOAD_FORMAT,
+    CSV_UPLOAD_FORMAT,
+    GZIP_UPLOAD_FORMAT,
+    PARQUET_UPLOAD_FORMAT,
+    write_config_table_upload_file
+)
+
+
+LOGGER = logging.getLogger(__name__)
+
+ROW_COUNT = 200000
+
+SCHEMA_1 = [
+    SchemaField('id', 'INTEGER'),
+    SchemaField('name', 'STRING'),
+    SchemaField('category', 'STRING'),
+    SchemaField('score', 'FLOAT'),
+    SchemaField('enabled', 'BOOLEAN'),
+    SchemaField('created', 'DATE')
+]
+
+OPTIONAL_MODULE_NAME_BY_UPLOAD_FORMAT = {
+    PARQUET_UPLOAD_FORMAT: 'pyarrow',
+    AVRO_UPLOAD_FORMAT: 'fastavro'
+}
+
+
+def _write_large_csv_file(path: Path, row_count: int):
+    with path.open('w', encoding='utf-8') as fp:
+        fp.write(','.join(field.name for field in SCHEMA_1) + '\n')
+        for index in range(row_count):
+            fp.write(
+                f'{index},name {index},category {index % 20},{index / 7:.4f},'
+                f'{"true" if index % 2 else "false"},2020-01-{1 + index % 28:02d}\n'
+            )
+
+
+@pytest.mark.slow
+class TestConfigTablesUploadFormatBenchmark:
+    def test_should_reduce_upload_size_compared_to_csv(self, temp_dir: Path):
+        source_file = temp_dir / 'source.csv'
+        _write_large_csv_file(source_file, ROW_COUNT)
+        upload_formats = [CSV_UPLOAD_FORMAT, GZIP_UPLOAD_FORMAT] + [
+            upload_format
+            for upload_format, module_name in OPTIONAL_MODULE_NAME_BY_UPLOAD_FORMAT.items()
+            if importlib.util.find_spec(module_name) is not None
+        ]
+        size_by_upload_format = {}
+        for upload_format in upload_formats:
+            target_file = temp_dir / f'table1.{upload_format}'
+            start = time.perf_counter()
+            with source_file.open('rb') as source_fp, target_file.open('wb') as target_fp:
+                write_config_table_upload_file(source_fp, target_fp, upload_format, SCHEMA_1)
+            duration = time.perf_counter() - start
+            size_by_upload_format[upload_format] = target_file.stat().st_size
+            LOGGER.info(
+                'upload format %s: %d bytes (%.1f%% of csv), transcode took %.3fs',
+                upload_format,
+                size_by_upload_format[upload_format],
+                100.0 * size_by_upload_format[upload_format] / source_file.stat().st_size,
+                duration
+            )
+        for upload_format in upload_formats:
+            if upload_format != CSV_UPLOAD_FORMAT:
+                assert size_by_upload_format[upload_format] < size_by_upload_format[
+                    CSV_UPLOAD_FORMAT
+                ]
@@ -0,0 +1,69 @@
+import logging
+import time
+
+import pytest
+
+from bigquery_views_manager.view_template import (
+    compile_query_template,
+    resolve_query_template_placeholders
+)
+
+from ..view_template_test import legacy_resolve_query_template_placeholders
+
+
+LOGGER = logging.getLogger(__name__)
+
+TABLE_COUNT = 500
+REPEAT_COUNT = 5
+
+
+def _get_large_query_template(table_count: int) -> str:
+    return '\n'.join(
+        ['SELECT * FROM `{project}.{dataset}.table0` AS t0'] + [
+            (
+                f'LEFT JOIN `{{project}}.{{dataset}}.table{index}` AS t{index}'
+                f' ON t{index}.id = t{index - 1}.id'
+                f' AND t{index}.comment = "some comment to make the line a bit longer"'
+            )
+            for index in range(1, table_count)
+        ]
+    )
+
+
+def _measure(func, repeat_count: int = REPEAT_COUNT) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat_count):
+        func()
+    return (time.perf_counter() - start) / repeat_count
+
+
+@pytest.mark.slow
+class TestViewTemplateBenchmark:
+    def test_should_render_large_multi_reference_view_faster_than_before(self):
+        query_template = _get_large_query_template(TABLE_COUNT)
+        kwargs = {
+            'project': 'project1',
+            'default_dataset': 'dataset1',
+            'view_to_dataset_mapping': {
+                f'table{index}': 'dataset2' for index in range(0, TABLE_COUNT, 2)
+            }
+        }
+        expected_query = legacy_resolve_query_template_placeholders(query_template, **kwargs)
+        compile_query_template.cache_clear()
+        assert resolve_query_template_placeholders(query_template, **kwargs) == expected_query
+
+        legacy_duration = _measure(
+            lambda: legacy_resolve_query_template_placeholders(query_template, **kwargs)
+        )
+        compile_query_template.cache_clear()
+        compile_duration = _measure(
+            lambda: compile_query_template.__wrapped__(query_template), repeat_count=1
+        )
+        render_duration = _measure(
+            lambda: resolve_query_template_placeholders(query_template, **kwargs)
+        )
+        LOGGER.info(
+            'rendering %d references (%d chars): legacy=%.6fs, compile=%.6fs, render=%.6fs',
+            TABLE_COUNT, len(query_template), legacy_duration, compile_duration, render_duration
+        )
+        assert compile_duration + render_duration < legacy_duration
@@ -0,0 +1,167 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from google.cloud import bigquery
+from google.cloud.exceptions import NotFound
+
+from bigquery_views_manager.caching_client import (
+    CachingClient,
+    get_ddl_target_table_names_for_query
+)
+
+
+PROJECT_1 = 'project1'
+DATASET_1 = 'dataset1'
+TABLE_1 = 'table1'
+
+TABLE_ID_1 = f'{PROJECT_1}.{DATASET_1}.{TABLE_1}'
+
+
+@pytest.fixture(name='caching_client')
+def _caching_client(bq_client: MagicMock) -> CachingClient:
+    bq_client.project = PROJECT_1
+    return CachingClient(bq_client)
+
+
+class TestGetDdlTargetTableNamesForQuery:
+    def test_should_find_create_or_replace_view_target(self):
+        assert get_ddl_target_table_names_for_query(
+            'CREATE OR REPLACE VIEW dataset1.view1 AS SELECT 1\n;'
+            '\ncreate table if not exists `project1.dataset1.table1` AS SELECT 1'
+        ) == ['dataset1.view1', 'project1.dataset1.table1']
+
+    def test_should_not_find_anything_in_select_query(self):
+        assert not get_ddl_target_table_names_for_query('SELECT * FROM dataset1.table1')
+
+
+class TestCachingClient:
+    def test_should_delegate_other_attributes(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        assert caching_client.project == PROJECT_1
+        assert caching_client.dataset(DATASET_1) == bq_client.dataset.return_value
+
+    def test_should_list_tables_of_dataset_once(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        bq_client.list_tables.return_value = iter(['table_item1'])
+        assert caching_client.list_tables(DATASET_1) == ['table_item1']
+        assert caching_client.list_tables(
+            dataset=bigquery.DatasetReference(PROJECT_1, DATASET_1)
+        ) == ['table_item1']
+        bq_client.list_tables.assert_called_once()
+
+    def test_should_get_table_once(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        assert caching_client.get_table(TABLE_ID_1) == bq_client.get_table.return_value
+        assert caching_client.get_table(
+            bigquery.TableReference.from_string(TABLE_ID_1)
+        ) == bq_client.get_table.return_value
+        assert caching_client.get_table(
+            f'{DATASET_1}.{TABLE_1}'
+        ) == bq_client.get_table.return_value
+        bq_client.get_table.assert_called_once()
+
+    def test_should_remember_table_not_found(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        bq_client.get_table.side_effect = NotFound('not found')
+        for _ in range(2):
+            with pytest.raises(NotFound):
+                caching_client.get_table(TABLE_ID_1)
+        bq_client.get_table.assert_called_once()
+
+    def test_should_invalidate_query_destination(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        caching_client.get_table(TABLE_ID_1)
+        job_config = bigquery.QueryJobConfig()
+        job_config.destination = TABLE_ID_1
+        caching_client.query('SELECT 1', job_config=job_config)
+        caching_client.get_table(TABLE_ID_1)
+        assert bq_client.get_table.call_count == 2
+
+    def test_should_not_invalidate_query_destination_on_dry_run(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        caching_client.get_table(TABLE_ID_1)
+        job_config = bigquery.QueryJobConfig(dry_run=True)
+        job_config.destination = TABLE_ID_1
+        caching_client.query('SELECT 1', job_config=job_config)
+        caching_client.get_table(TABLE_ID_1)
+        assert bq_client.get_table.call_count == 1
+
+    def test_should_invalidate_ddl_target_table_and_dataset_listing(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.list_tables(DATASET_1)
+        caching_client.query(f'CREATE OR REPLACE VIEW {DATASET_1}.{TABLE_1} AS SELECT 1')
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.list_tables(DATASET_1)
+        assert bq_client.get_table.call_count == 2
+        assert bq_client.list_tables.call_count == 2
+
+    def test_should_invalidate_written_table_again_after_job_finished(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        job = caching_client.query(f'CREATE OR REPLACE VIEW {DATASET_1}.{TABLE_1} AS SELECT 1')
+        # e.g. fetched concurrently, while the job was still running
+        caching_client.get_table(TABLE_ID_1)
+        assert job.result() == bq_client.query.return_value.result.return_value
+        caching_client.get_table(TABLE_ID_1)
+        assert bq_client.get_table.call_count == 2
+
+    def test_should_invalidate_loaded_table_again_after_job_finished(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        job = caching_client.load_table_from_file('file_obj', TABLE_ID_1)
+        caching_client.get_table(TABLE_ID_1)
+        job.result()
+        caching_client.get_table(TABLE_ID_1)
+        assert bq_client.get_table.call_count == 2
+        assert job.job_id == bq_client.load_table_from_file.return_value.job_id
+
+    def test_should_invalidate_written_table_after_job_failed(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        bq_client.query.return_value.result.side_effect = RuntimeError('failed')
+        job = caching_client.query(f'CREATE OR REPLACE VIEW {DATASET_1}.{TABLE_1} AS SELECT 1')
+        caching_client.get_table(TABLE_ID_1)
+        with pytest.raises(RuntimeError):
+            job.result()
+        caching_client.get_table(TABLE_ID_1)
+        assert bq_client.get_table.call_count == 2
+
+    def test_should_not_wrap_jobs_not_writing_tables(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        assert caching_client.query('SELECT 1') == bq_client.query.return_value
+
+    def test_should_pass_wrapped_parent_job_to_list_jobs(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        job = caching_client.query(f'CREATE OR REPLACE VIEW {DATASET_1}.{TABLE_1} AS SELECT 1')
+        caching_client.list_jobs(parent_job=job)
+        bq_client.list_jobs.assert_called_with(parent_job=bq_client.query.return_value)
+
+    def test_should_clear_cache(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.list_tables(DATASET_1)
+        caching_client.clear_cache()
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.list_tables(DATASET_1)
+        assert bq_client.get_table.call_count == 2
+        assert bq_client.list_tables.call_count == 2
+
+    def test_should_invalidate_deleted_table(
+            self, caching_client: CachingClient, bq_client: MagicMock):
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.delete_table(TABLE_ID_1, not_found_ok=True)
+        bq_client.delete_table.assert_called_with(TABLE_ID_1, not_found_ok=True)
+        caching_client.get_table(TABLE_ID_1)
+        assert bq_client.get_table.call_count == 2
+
+    def test_should_count_api_calls_and_cache_hits(
+            self, caching_client: CachingClient):
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.get_table(TABLE_ID_1)
+        caching_client.query('SELECT 1')
+        assert caching_client.api_call_count_by_method_name == {
+            'get_table': 1, 'query': 1
+        }
+        assert caching_client.cache_hit_count_by_method_name == {'get_table': 1}
+        assert caching_client.get_api_call_summary() == (
+            'get_table=1 (cached: 1), query=1 (cached: 0)'
+        )
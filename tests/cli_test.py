@@ -9,8 +9,24 @@ from bigquery_views_manager.view_list import (
     VIEW_OR_TABLE_NAME_KEY,
     load_view_list_config
 )
+from bigquery_views_manager.caching_client import CachingClient
+from bigquery_views_manager.config_tables import ConfigTablesError
+from bigquery_views_manager.graph_index import load_graph_index
+from bigquery_views_manager.manifest import load_manifest
+from bigquery_views_manager.deploy import DeployNode, DeployNodeResult, DeployResult
+from bigquery_views_manager.materialize_views import (
+    MaterializeViewListResult,
+    MaxTotalBytesExceededError
+)
 
 import bigquery_views_manager.cli as target_module
+import bigquery_views_manager.delete_views_or_tables as delete_views_or_tables_module
+import bigquery_views_manager.deploy as deploy_module
+import bigquery_views_manager.diff_views as diff_views_module
+import bigquery_views_manager.get_views as get_views_module
+import bigquery_views_manager.materialize_views as materialize_views_module
+import bigquery_views_manager.update_views as update_views_module
+import bigquery_views_manager.views as views_module
 from bigquery_views_manager.cli import (
     main
 )
@@ -20,45 +36,59 @@ VIEW_1 = "view1,dataset1"
 VIEW_2 = "view2,dataset2"
 
 
-@pytest.fixture(name='bigquery_mock', autouse=True)
-def _bigquery_mock():
-    with patch.object(target_module, 'bigquery') as mock:
+@pytest.fixture(name='get_bigquery_client_mock', autouse=True)
+def _get_bigquery_client_mock():
+    with patch.object(target_module, 'get_bigquery_client') as mock:
         yield mock
 
 
 @pytest.fixture(name='update_or_create_views_mock', autouse=True)
 def _update_or_create_views_mock():
-    with patch.object(target_module, 'update_or_create_views') as mock:
+    with patch.object(update_views_module, 'update_or_create_views') as mock:
         yield mock
 
 
 @pytest.fixture(name='delete_views_or_tables_mock', autouse=True)
 def _delete_views_or_tables_mock():
-    with patch.object(target_module, 'delete_views_or_tables') as mock:
+    with patch.object(delete_views_or_tables_module, 'delete_views_or_tables') as mock:
         yield mock
 
 
 @pytest.fixture(name='materialize_views_mock', autouse=True)
 def _materialize_views_mock():
-    with patch.object(target_module, 'materialize_views') as mock:
+    with patch.object(materialize_views_module, 'materialize_views') as mock:
+        mock.return_value = MaterializeViewListResult([])
+        yield mock
+
+
+@pytest.fixture(name='estimate_materialize_views_mock', autouse=True)
+def _estimate_materialize_views_mock():
+    with patch.object(materialize_views_module, 'estimate_materialize_views') as mock:
         yield mock
 
 
 @pytest.fixture(name='diff_views_mock', autouse=True)
 def _diff_views_mock():
-    with patch.object(target_module, 'diff_views') as mock:
+    with patch.object(diff_views_module, 'diff_views') as mock:
+        yield mock
+
+
+@pytest.fixture(name='deploy_mock', autouse=True)
+def _deploy_mock():
+    with patch.object(deploy_module, 'deploy') as mock:
+        mock.return_value = DeployResult([])
         yield mock
 
 
 @pytest.fixture(name='get_views_mock', autouse=True)
 def _get_views_mock():
-    with patch.object(target_module, 'get_views') as mock:
+    with patch.object(get_views_module, 'get_views') as mock:
         yield mock
 
 
 @pytest.fixture(name='get_bq_view_names_mock', autouse=True)
 def _get_bq_view_names_mock():
-    with patch.object(target_module, 'get_bq_view_names') as mock:
+    with patch.object(views_module, 'get_bq_view_names') as mock:
         yield mock
 
 
@@ -85,6 +115,152 @@ class TestCreateOrReplaceViewsSubCommand:
         ])
         update_or_create_views_mock.assert_called()
 
+    def test_should_resolve_view_selectors(
+            self,
+            temp_dir: Path,
+            update_or_create_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1',
+            '- view2',
+            '- view3'
+        ]))
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        (temp_dir / 'view2.sql').write_text('SELECT * FROM `{project}.{dataset}.view1`')
+        (temp_dir / 'view3.sql').write_text('SELECT 3')
+        main([
+            'create-or-replace-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            'view1+'
+        ])
+        views_dict = update_or_create_views_mock.call_args[0][2]
+        assert list(views_dict.keys()) == ['view1', 'view2']
+
+    def test_should_pass_jobs_as_max_workers(
+            self,
+            temp_dir: Path,
+            update_or_create_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1'
+        ]))
+        main([
+            'create-or-replace-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            '--jobs=3'
+        ])
+        _, kwargs = update_or_create_views_mock.call_args
+        assert kwargs['max_workers'] == 3
+
+    def test_should_fail_after_deploy_if_max_total_bytes_exceeded(
+            self,
+            temp_dir: Path,
+            deploy_mock: MagicMock):
+        deploy_mock.return_value = DeployResult([
+            DeployNodeResult(
+                node=DeployNode('materialized_view', 'view1'),
+                duration=0.0,
+                skipped=True,
+                budget_exceeded=True
+            )
+        ])
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true'
+        ]))
+        manifest_path = temp_dir / 'manifest.json'
+        with pytest.raises(MaxTotalBytesExceededError) as exc_info:
+            main([
+                'deploy',
+                '--dataset=dataset1',
+                f'--view-list-config={view_config_path}',
+                f'--config-tables-base-dir={temp_dir / "config-tables"}',
+                f'--manifest-file={manifest_path}',
+                '--max-total-bytes=1000'
+            ])
+        assert exc_info.value.view_names == ['view1']
+        assert deploy_mock.call_args[1]['max_total_bytes'] == 1000
+        assert manifest_path.exists()
+
+    def test_should_pass_caching_client(
+            self,
+            temp_dir: Path,
+            get_bigquery_client_mock: MagicMock,
+            update_or_create_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1'
+        ]))
+        main([
+            'create-or-replace-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}'
+        ])
+        args, _ = update_or_create_views_mock.call_args
+        assert isinstance(args[0], CachingClient)
+        assert args[0].client == get_bigquery_client_mock.return_value
+
+    def test_should_pass_batch_ddl_and_batch_size(
+            self,
+            temp_dir: Path,
+            update_or_create_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1'
+        ]))
+        main([
+            'create-or-replace-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            '--batch-ddl',
+            '--batch-size=50'
+        ])
+        _, kwargs = update_or_create_views_mock.call_args
+        assert kwargs['batch_ddl']
+        assert kwargs['batch_size'] == 50
+
+    @pytest.mark.parametrize('batch_size', ['0', '-1'])
+    def test_should_reject_batch_size_less_than_one(
+            self,
+            temp_dir: Path,
+            update_or_create_views_mock: MagicMock,
+            batch_size: str):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('- view1')
+        with pytest.raises(SystemExit):
+            main([
+                'create-or-replace-views',
+                '--dataset=dataset1',
+                f'--view-list-config={view_config_path}',
+                '--batch-ddl',
+                f'--batch-size={batch_size}'
+            ])
+        update_or_create_views_mock.assert_not_called()
+
+    def test_should_save_manifest(
+            self,
+            temp_dir: Path,
+            update_or_create_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1'
+        ]))
+        manifest_path = temp_dir / 'manifest.json'
+        main([
+            'create-or-replace-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            f'--manifest-file={manifest_path}',
+            '--trust-manifest'
+        ])
+        _, kwargs = update_or_create_views_mock.call_args
+        assert kwargs['trust_manifest']
+        assert kwargs['manifest'] is not None
+        assert manifest_path.exists()
+
 
 class TestDeleteViewsSubCommand:
     def test_should_create_simple_view(
@@ -120,6 +296,123 @@ class TestMaterializeViewsSubCommand:
         ])
         materialize_views_mock.assert_called()
 
+    def test_should_pass_max_total_bytes_to_materialize_views(
+            self,
+            temp_dir: Path,
+            materialize_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true'
+        ]))
+        main([
+            'materialize-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            '--max-total-bytes=1000'
+        ])
+        _, kwargs = materialize_views_mock.call_args
+        assert kwargs['max_total_bytes'] == 1000
+
+    def test_should_estimate_instead_of_materialize_views_on_dry_run(
+            self,
+            temp_dir: Path,
+            materialize_views_mock: MagicMock,
+            estimate_materialize_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true'
+        ]))
+        main([
+            'materialize-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            '--dry-run'
+        ])
+        estimate_materialize_views_mock.assert_called()
+        materialize_views_mock.assert_not_called()
+
+    def test_should_record_materialized_views_in_manifest(
+            self,
+            temp_dir: Path,
+            get_bigquery_client_mock: MagicMock,
+            materialize_views_mock: MagicMock):
+        get_bigquery_client_mock.return_value.project = 'project1'
+        materialize_views_mock.return_value = MaterializeViewListResult([
+            MagicMock(name='result', skipped=False, budget_exceeded=False)
+        ])
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true'
+        ]))
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        manifest_path = temp_dir / 'manifest.json'
+        main([
+            'materialize-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            f'--manifest-file={manifest_path}'
+        ])
+        materialize_views_mock.assert_called()
+        manifest = load_manifest(manifest_path)
+        assert manifest.materialized_view_entries['view1'].table_name == 'mview1'
+
+    def test_should_not_record_views_not_materialized_due_to_budget_in_manifest(
+            self,
+            temp_dir: Path,
+            get_bigquery_client_mock: MagicMock,
+            materialize_views_mock: MagicMock):
+        get_bigquery_client_mock.return_value.project = 'project1'
+        materialize_views_mock.return_value = MaterializeViewListResult([
+            MagicMock(name='result1', skipped=False, budget_exceeded=False),
+            MagicMock(name='result2', skipped=True, budget_exceeded=True)
+        ])
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true',
+            '- view2:',
+            '    materialize: true'
+        ]))
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        (temp_dir / 'view2.sql').write_text('SELECT 2')
+        manifest_path = temp_dir / 'manifest.json'
+        with pytest.raises(MaxTotalBytesExceededError):
+            main([
+                'materialize-views',
+                '--dataset=dataset1',
+                f'--view-list-config={view_config_path}',
+                f'--manifest-file={manifest_path}',
+                '--max-total-bytes=1000'
+            ])
+        manifest = load_manifest(manifest_path)
+        assert set(manifest.materialized_view_entries.keys()) == {'view1'}
+
+    def test_should_save_manifest_if_materialize_views_fails(
+            self,
+            temp_dir: Path,
+            get_bigquery_client_mock: MagicMock,
+            materialize_views_mock: MagicMock):
+        get_bigquery_client_mock.return_value.project = 'project1'
+        materialize_views_mock.side_effect = RuntimeError('failed')
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true'
+        ]))
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        manifest_path = temp_dir / 'manifest.json'
+        with pytest.raises(RuntimeError):
+            main([
+                'materialize-views',
+                '--dataset=dataset1',
+                f'--view-list-config={view_config_path}',
+                f'--manifest-file={manifest_path}'
+            ])
+        assert manifest_path.exists()
+
 
 class TestDeleteMaterializedTablesSubCommand:
     def test_should_delete_materialized_tables(
@@ -138,6 +431,26 @@ class TestDeleteMaterializedTablesSubCommand:
         ])
         delete_views_or_tables_mock.assert_called()
 
+    def test_should_only_delete_materialized_tables_of_selected_views(
+            self,
+            temp_dir: Path,
+            delete_views_or_tables_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1',
+            '- view2:',
+            '    materialize: true'
+        ]))
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        (temp_dir / 'view2.sql').write_text('SELECT * FROM `{project}.{dataset}.view1`')
+        main([
+            'delete-materialized-tables',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            'view1+'
+        ])
+        assert list(delete_views_or_tables_mock.call_args[0][1].keys()) == ['view2']
+
 
 class TestDiffViewsSubCommand:
     def test_should_call_diff_views(
@@ -156,6 +469,35 @@ class TestDiffViewsSubCommand:
         ])
         diff_views_mock.assert_called()
 
+    def test_should_pass_jobs_to_diff_views(
+            self,
+            temp_dir: Path,
+            diff_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('- view1')
+        main([
+            'diff-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            '--jobs=3'
+        ])
+        assert diff_views_mock.call_args[1]['max_workers'] == 3
+
+    def test_should_not_save_graph_index(
+            self,
+            temp_dir: Path,
+            diff_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('- view1')
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        main([
+            'diff-views',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}'
+        ])
+        diff_views_mock.assert_called()
+        assert not (temp_dir / 'views.graph-index.json').exists()
+
 
 class TestGetViewsSubCommand:
     def test_should_call_get_views(
@@ -174,6 +516,24 @@ class TestGetViewsSubCommand:
         ])
         get_views_mock.assert_called()
 
+    def test_should_reject_view_selectors(
+            self,
+            temp_dir: Path,
+            get_views_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1',
+            '- view2'
+        ]))
+        with pytest.raises(ValueError, match='not supported by get-views'):
+            main([
+                'get-views',
+                '--dataset=dataset1',
+                f'--view-list-config={view_config_path}',
+                '+view2'
+            ])
+        get_views_mock.assert_not_called()
+
 
 class TestSortViewListSubCommand:
     def test_should_sort_view_list(
@@ -200,3 +560,133 @@ class TestSortViewListSubCommand:
             'view2',
             'view1'
         ]
+
+    def test_should_save_graph_index_file_at_specified_path(
+            self,
+            temp_dir: Path):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1',
+            '- view2'
+        ]))
+        (temp_dir / 'view1.sql').write_text(
+            'SELECT * FROM `{project}.{dataset}.view2`'
+        )
+        (temp_dir / 'view2.sql').write_text(
+            'SELECT 1'
+        )
+        graph_index_path = temp_dir / 'other' / 'graph-index.json'
+        graph_index_path.parent.mkdir()
+        main([
+            'sort-view-list',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            f'--graph-index-file={graph_index_path}'
+        ])
+        assert load_graph_index(graph_index_path).view_graph.view_names == ['view2', 'view1']
+        assert not (temp_dir / 'views.graph-index.json').exists()
+        assert load_view_list_config(view_config_path).view_names == [
+            'view2',
+            'view1'
+        ]
+
+    def test_should_save_graph_index_next_to_view_list_config(
+            self,
+            temp_dir: Path):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1',
+            '- view2'
+        ]))
+        (temp_dir / 'view1.sql').write_text(
+            'SELECT * FROM `{project}.{dataset}.view2`'
+        )
+        (temp_dir / 'view2.sql').write_text(
+            'SELECT 1'
+        )
+        main([
+            'sort-view-list',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}'
+        ])
+        graph_index = load_graph_index(temp_dir / 'views.graph-index.json')
+        assert graph_index.view_graph.dependent_view_names_by_view_name == {
+            'view2': ['view1'],
+            'view1': []
+        }
+
+    def test_should_not_save_graph_index_if_disabled(
+            self,
+            temp_dir: Path):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('- view1')
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        main([
+            'sort-view-list',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            '--no-graph-index'
+        ])
+        assert not (temp_dir / 'views.graph-index.json').exists()
+
+    def test_should_not_create_client(
+            self,
+            temp_dir: Path,
+            get_bigquery_client_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('- view1')
+        (temp_dir / 'view1.sql').write_text('SELECT 1')
+        main([
+            'sort-view-list',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}'
+        ])
+        get_bigquery_client_mock.assert_not_called()
+
+
+class TestValidateConfigTablesSubCommand:
+    def test_should_validate_config_tables_without_client(
+            self,
+            get_bigquery_client_mock: MagicMock,
+            temp_dir: Path):
+        (temp_dir / 'tables').mkdir()
+        (temp_dir / 'schema').mkdir()
+        (temp_dir / 'tables' / 'table1.csv').write_text('count\n1\nx\n')
+        (temp_dir / 'schema' / 'table1_schema.json').write_text(
+            '[{"name": "count", "type": "INTEGER"}]'
+        )
+        with pytest.raises(ConfigTablesError):
+            main([
+                'validate-config-tables',
+                '--dataset=dataset1',
+                f'--config-tables-base-dir={temp_dir}'
+            ])
+        get_bigquery_client_mock.assert_not_called()
+
+
+class TestDeploySubCommand:
+    def test_should_deploy_config_tables_views_and_materialized_views(
+            self,
+            temp_dir: Path,
+            deploy_mock: MagicMock):
+        view_config_path = temp_dir / 'views.yml'
+        view_config_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true',
+            '- view2'
+        ]))
+        (temp_dir / 'config-tables' / 'tables').mkdir(parents=True)
+        (temp_dir / 'config-tables' / 'tables' / 'table1.csv').write_text('a\n1\n')
+        main([
+            'deploy',
+            '--dataset=dataset1',
+            f'--view-list-config={view_config_path}',
+            f'--config-tables-base-dir={temp_dir / "config-tables"}',
+            '--jobs=3'
+        ])
+        deploy_mock.assert_called_once()
+        kwargs = deploy_mock.call_args[1]
+        assert kwargs['config_table_names'] == ['table1']
+        assert list(kwargs['view_names_dict'].keys()) == ['view1', 'view2']
+        assert list(kwargs['materialized_view_names_dict'].keys()) == ['view1']
+        assert kwargs['max_workers'] == 3
@@ -0,0 +1,281 @@
+import gzip
+import io
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytest
+
+from google.cloud.bigquery.schema import SchemaField
+
+from bigquery_views_manager.config_table_formats import (
+    AVRO_UPLOAD_FORMAT,
+    CSV_UPLOAD_FORMAT,
+    GZIP_UPLOAD_FORMAT,
+    PARQUET_UPLOAD_FORMAT,
+    ConfigTableValidationError,
+    get_effective_upload_format,
+    iter_config_table_validation_issues,
+    iter_typed_csv_rows,
+    parse_csv_boolean,
+    parse_csv_datetime,
+    parse_csv_decimal,
+    parse_csv_float,
+    parse_csv_integer,
+    parse_csv_time,
+    validate_config_table_csv_file,
+    write_config_table_upload_file
+)
+
+
+SCHEMA_1 = [
+    SchemaField('name', 'STRING'),
+    SchemaField('count', 'INTEGER'),
+    SchemaField('ratio', 'FLOAT'),
+    SchemaField('enabled', 'BOOLEAN'),
+    SchemaField('created', 'DATE')
+]
+
+CSV_CONTENT_1 = (
+    'name,count,ratio,enabled,created\n'
+    'a,1,0.5,true,2020-01-02\n'
+    '"b, c",,,,\n'
+)
+
+EXPECTED_ROWS_1 = [
+    ['a', 1, 0.5, True, date(2020, 1, 2)],
+    ['b, c', None, None, None, None]
+]
+
+
+def _transcode(upload_format: str, csv_content: str, schema=None) -> bytes:
+    target_fp = io.BytesIO()
+    write_config_table_upload_file(
+        io.BytesIO(csv_content.encode('utf-8')), target_fp, upload_format, schema
+    )
+    return target_fp.getvalue()
+
+
+class TestParseCsvBoolean:
+    @pytest.mark.parametrize('value', ['true', 'True', 'T', 'yes', 'y', '1'])
+    def test_should_parse_true_values(self, value: str):
+        assert parse_csv_boolean(value) is True
+
+    @pytest.mark.parametrize('value', ['false', 'FALSE', 'f', 'no', 'n', '0'])
+    def test_should_parse_false_values(self, value: str):
+        assert parse_csv_boolean(value) is False
+
+    def test_should_reject_other_values(self):
+        with pytest.raises(ValueError):
+            parse_csv_boolean('maybe')
+
+
+class TestParseCsvNumbers:
+    @pytest.mark.parametrize('value,expected', [('1', 1), ('-12', -12), ('+3', 3)])
+    def test_should_parse_integers(self, value: str, expected: int):
+        assert parse_csv_integer(value) == expected
+
+    @pytest.mark.parametrize('value', ['1_000', ' 1', '1 ', '1.0', '0x10', ''])
+    def test_should_reject_invalid_integers(self, value: str):
+        with pytest.raises(ValueError):
+            parse_csv_integer(value)
+
+    @pytest.mark.parametrize('value,expected', [
+        ('1', 1.0), ('-1.5', -1.5), ('.5', 0.5), ('1.', 1.0), ('1e3', 1000.0), ('inf', float('inf'))
+    ])
+    def test_should_parse_floats(self, value: str, expected: float):
+        assert parse_csv_float(value) == expected
+
+    @pytest.mark.parametrize('value', ['1_000.5', ' 1.5', '1.5 ', '1.5\n', 'e3', ''])
+    def test_should_reject_invalid_floats(self, value: str):
+        with pytest.raises(ValueError):
+            parse_csv_float(value)
+
+    def test_should_parse_decimal(self):
+        assert parse_csv_decimal('-1.25') == Decimal('-1.25')
+
+    @pytest.mark.parametrize('value', ['1_000', ' 1', 'NaN', 'Infinity'])
+    def test_should_reject_invalid_decimals(self, value: str):
+        with pytest.raises(ValueError):
+            parse_csv_decimal(value)
+
+
+class TestParseCsvDatetimeAndTime:
+    @pytest.mark.parametrize('fraction,microsecond', [
+        ('1', 100000), ('12', 120000), ('1234', 123400), ('12345', 123450), ('123456', 123456)
+    ])
+    def test_should_parse_time_with_fractional_seconds(self, fraction: str, microsecond: int):
+        assert parse_csv_time(f'03:04:05.{fraction}') == time(3, 4, 5, microsecond)
+
+    @pytest.mark.parametrize('fraction,microsecond', [
+        ('1', 100000), ('12', 120000), ('1234', 123400), ('12345', 123450)
+    ])
+    def test_should_parse_datetime_with_fractional_seconds(
+            self, fraction: str, microsecond: int):
+        assert parse_csv_datetime(f'2020-01-02 03:04:05.{fraction}') == datetime(
+            2020, 1, 2, 3, 4, 5, microsecond
+        )
+
+    def test_should_parse_datetime_with_t_separator_or_without_time(self):
+        assert parse_csv_datetime('2020-1-2T03:04:05') == datetime(2020, 1, 2, 3, 4, 5)
+        assert parse_csv_datetime('2020-01-02') == datetime(2020, 1, 2)
+
+    @pytest.mark.parametrize('value', [
+        '25:00:00', '03:04:05.1234567', ' 03:04:05', '03:04:05+01:00'
+    ])
+    def test_should_reject_invalid_times(self, value: str):
+        with pytest.raises(ValueError):
+            parse_csv_time(value)
+
+    @pytest.mark.parametrize('value', [
+        '2020-13-01', '2020-01-02X', '2020-01-02 03:04:05.1234567', '2020-01-02 03:04:05Z'
+    ])
+    def test_should_reject_invalid_datetimes(self, value: str):
+        with pytest.raises(ValueError):
+            parse_csv_datetime(value)
+
+    def test_should_reject_underscore_number_in_csv_file(self):
+        issues = list(iter_config_table_validation_issues(
+            io.StringIO('count,ratio\n1_000, 1.5\n'),
+            [SchemaField('count', 'INTEGER'), SchemaField('ratio', 'FLOAT')]
+        ))
+        assert len(issues) == 2
+
+
+class TestIterTypedCsvRows:
+    def test_should_skip_header_and_convert_values(self):
+        assert list(iter_typed_csv_rows(io.StringIO(CSV_CONTENT_1), SCHEMA_1)) == EXPECTED_ROWS_1
+
+    def test_should_report_line_of_invalid_value(self):
+        with pytest.raises(ValueError, match='line 2'):
+            list(iter_typed_csv_rows(
+                io.StringIO('count\nabc\n'), [SchemaField('count', 'INTEGER')]
+            ))
+
+    def test_should_reject_missing_required_value(self):
+        with pytest.raises(ValueError, match='required'):
+            list(iter_typed_csv_rows(
+                io.StringIO('name\n\n""\n'), [SchemaField('name', 'STRING', mode='REQUIRED')]
+            ))
+
+    def test_should_reject_rows_with_different_number_of_columns(self):
+        with pytest.raises(ValueError, match='expected 2 columns'):
+            list(iter_typed_csv_rows(
+                io.StringIO('a,b\n1\n'),
+                [SchemaField('a', 'STRING'), SchemaField('b', 'STRING')]
+            ))
+
+
+class TestIterConfigTableValidationIssues:
+    def test_should_not_report_issues_for_valid_rows(self):
+        assert not list(iter_config_table_validation_issues(
+            io.StringIO(CSV_CONTENT_1), SCHEMA_1
+        ))
+
+    def test_should_report_every_invalid_row_and_column(self):
+        issues = list(iter_config_table_validation_issues(io.StringIO(
+            'name,count,ratio,enabled,created\n'
+            'a,x,0.5,true,2020-01-02\n'
+            'b,1,0.5,true,2020-01-02\n'
+            'c,1,y,maybe,2020-13-01\n'
+            'd,1\n'
+        ), SCHEMA_1))
+        assert [
+            (issue.line_number, issue.column_name) for issue in issues
+        ] == [
+            (2, 'count'),
+            (4, 'ratio'),
+            (4, 'enabled'),
+            (4, 'created'),
+            (5, None)
+        ]
+        assert 'expected 5 columns but found 2' in str(issues[-1])
+
+    def test_should_report_missing_required_value(self):
+        issues = list(iter_config_table_validation_issues(
+            io.StringIO('name\n""\n'), [SchemaField('name', 'STRING', mode='REQUIRED')]
+        ))
+        assert [str(issue) for issue in issues] == [
+            'line 2, column name: missing value for required field'
+        ]
+
+    def test_should_validate_numeric_datetime_and_time_values(self):
+        schema = [
+            SchemaField('amount', 'NUMERIC'),
+            SchemaField('updated', 'DATETIME'),
+            SchemaField('start', 'TIME')
+        ]
+        assert not list(iter_config_table_validation_issues(
+            io.StringIO('amount,updated,start\n1.25,2020-01-02T03:04:05,03:04\n'), schema
+        ))
+        assert len(list(iter_config_table_validation_issues(
+            io.StringIO('amount,updated,start\nabc,2020-01-02X,25:00\n'), schema
+        ))) == 3
+
+
+class TestValidateConfigTableCsvFile:
+    def test_should_raise_error_with_all_issues(self, temp_dir):
+        source_file = temp_dir / 'table1.csv'
+        source_file.write_text('count\n1\nx\ny\n', encoding='utf-8')
+        with pytest.raises(ConfigTableValidationError) as exc_info:
+            validate_config_table_csv_file(source_file, [SchemaField('count', 'INTEGER')])
+        assert [issue.line_number for issue in exc_info.value.issues] == [3, 4]
+        assert 'line 3, column count' in str(exc_info.value)
+
+    def test_should_pass_valid_file(self, temp_dir):
+        source_file = temp_dir / 'table1.csv'
+        source_file.write_text('count\n1\n2\n', encoding='utf-8')
+        validate_config_table_csv_file(source_file, [SchemaField('count', 'INTEGER')])
+
+
+class TestGetEffectiveUploadFormat:
+    def test_should_keep_csv_and_gzip(self):
+        assert get_effective_upload_format(CSV_UPLOAD_FORMAT, None) == CSV_UPLOAD_FORMAT
+        assert get_effective_upload_format(GZIP_UPLOAD_FORMAT, None) == GZIP_UPLOAD_FORMAT
+
+    def test_should_keep_parquet_for_supported_schema(self):
+        assert (
+            get_effective_upload_format(PARQUET_UPLOAD_FORMAT, SCHEMA_1)
+            == PARQUET_UPLOAD_FORMAT
+        )
+
+    def test_should_fall_back_to_gzip_without_schema(self):
+        assert get_effective_upload_format(AVRO_UPLOAD_FORMAT, None) == GZIP_UPLOAD_FORMAT
+
+    def test_should_fall_back_to_gzip_for_unsupported_field_types(self):
+        assert get_effective_upload_format(
+            PARQUET_UPLOAD_FORMAT, [SchemaField('ts', 'TIMESTAMP')]
+        ) == GZIP_UPLOAD_FORMAT
+
+    def test_should_fall_back_to_gzip_for_repeated_fields(self):
+        assert get_effective_upload_format(
+            PARQUET_UPLOAD_FORMAT, [SchemaField('names', 'STRING', mode='REPEATED')]
+        ) == GZIP_UPLOAD_FORMAT
+
+    def test_should_reject_unknown_format(self):
+        with pytest.raises(ValueError):
+            get_effective_upload_format('other', None)
+
+
+class TestWriteConfigTableUploadFile:
+    def test_should_copy_csv(self):
+        assert _transcode(CSV_UPLOAD_FORMAT, CSV_CONTENT_1) == CSV_CONTENT_1.encode('utf-8')
+
+    def test_should_write_gzip_csv(self):
+        assert gzip.decompress(
+            _transcode(GZIP_UPLOAD_FORMAT, CSV_CONTENT_1)
+        ) == CSV_CONTENT_1.encode('utf-8')
+
+    def test_should_write_parquet(self):
+        pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+        table = pyarrow_parquet.read_table(
+            io.BytesIO(_transcode(PARQUET_UPLOAD_FORMAT, CSV_CONTENT_1, SCHEMA_1))
+        )
+        assert table.column_names == [field.name for field in SCHEMA_1]
+        assert [list(row.values()) for row in table.to_pylist()] == EXPECTED_ROWS_1
+
+    def test_should_write_avro(self):
+        fastavro = pytest.importorskip('fastavro')
+        records = list(fastavro.reader(
+            io.BytesIO(_transcode(AVRO_UPLOAD_FORMAT, CSV_CONTENT_1, SCHEMA_1))
+        ))
+        assert [list(record.values()) for record in records] == EXPECTED_ROWS_1
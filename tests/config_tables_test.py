@@ -1,9 +1,29 @@
-from unittest.mock import patch
+import re
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import pytest
 
+from google.cloud.bigquery.schema import SchemaField
+
 import bigquery_views_manager.config_tables as config_tables_module
-from bigquery_views_manager.config_tables import update_or_create_table_from_csv
+from bigquery_views_manager.config_table_formats import (
+    ConfigTableValidationError,
+    ConfigTableValidationIssue,
+    GZIP_UPLOAD_FORMAT,
+    PARQUET_UPLOAD_FORMAT
+)
+from bigquery_views_manager.config_tables import (
+    ConfigTableListResult,
+    ConfigTableResult,
+    ConfigTablesError,
+    CONTENT_HASH_LABEL_KEY,
+    format_config_table_list_result,
+    get_config_table_content_hash,
+    update_or_create_config_tables,
+    update_or_create_table_from_csv,
+    validate_config_tables
+)
 
 PROJECT_1 = "project1"
 DATASET_1 = "dataset1"
@@ -45,6 +65,18 @@ def _get_table_schema():
         yield mock
 
 
+@pytest.fixture(name="validate_config_table_csv_file_mock", autouse=True)
+def _validate_config_table_csv_file():
+    with patch.object(config_tables_module, "validate_config_table_csv_file") as mock:
+        yield mock
+
+
+@pytest.fixture(name="write_config_table_upload_file_mock")
+def _write_config_table_upload_file():
+    with patch.object(config_tables_module, "write_config_table_upload_file") as mock:
+        yield mock
+
+
 # pylint: disable=invalid-name
 class TestUpdateOrCreateTableFromCsv:
     def test_should_call_load_table_from_file(
@@ -94,3 +126,260 @@ class TestUpdateOrCreateTableFromCsv:
             source_schema_file=SOURCE_SCHEMA_1,
         )
         assert LoadJobConfig.return_value.schema == get_table_schema_mock.return_value
+
+    @pytest.mark.usefixtures("LoadJobConfig")
+    def test_should_return_result_with_load_job_statistics(self, bq_client):
+        load_job = bq_client.load_table_from_file.return_value
+        load_job.input_file_bytes = 123
+        load_job.output_rows = 10
+        result = update_or_create_table_from_csv(
+            bq_client,
+            TABLE_1,
+            SOURCE_FILE_1,
+            dataset=DATASET_1,
+            source_schema_file=SOURCE_SCHEMA_1,
+        )
+        assert result.table_name == TABLE_1
+        assert result.input_file_bytes == 123
+        assert result.output_rows == 10
+        assert not result.failed
+
+    @pytest.mark.usefixtures("LoadJobConfig")
+    def test_should_set_content_hash_label(self, bq_client, bigquery):
+        update_or_create_table_from_csv(
+            bq_client,
+            TABLE_1,
+            SOURCE_FILE_1,
+            dataset=DATASET_1,
+            source_schema_file=SOURCE_SCHEMA_1,
+            content_hash='hash1'
+        )
+        table = bigquery.Table.return_value
+        assert table.labels == {CONTENT_HASH_LABEL_KEY: 'hash1'}
+        bq_client.update_table.assert_called_with(table, ['labels'])
+
+    def test_should_upload_transcoded_gzip_file(
+            self, bq_client, LoadJobConfig, open_mock, write_config_table_upload_file_mock
+    ):
+        update_or_create_table_from_csv(
+            bq_client,
+            TABLE_1,
+            SOURCE_FILE_1,
+            dataset=DATASET_1,
+            source_schema_file=SOURCE_SCHEMA_1,
+            upload_format=GZIP_UPLOAD_FORMAT
+        )
+        source_fp = open_mock.return_value.__enter__.return_value
+        write_config_table_upload_file_mock.assert_called_once()
+        assert write_config_table_upload_file_mock.call_args[0][0] == source_fp
+        assert write_config_table_upload_file_mock.call_args[0][2] == GZIP_UPLOAD_FORMAT
+        upload_fp = bq_client.load_table_from_file.call_args[0][0]
+        assert upload_fp != source_fp
+        assert LoadJobConfig.return_value.source_format == "CSV"
+        assert LoadJobConfig.return_value.skip_leading_rows == 1
+
+    @pytest.mark.usefixtures("write_config_table_upload_file_mock")
+    def test_should_use_parquet_source_format_for_supported_schema(
+            self, bq_client, LoadJobConfig, get_table_schema_mock
+    ):
+        get_table_schema_mock.return_value = [SchemaField("name", "STRING")]
+        update_or_create_table_from_csv(
+            bq_client,
+            TABLE_1,
+            SOURCE_FILE_1,
+            dataset=DATASET_1,
+            source_schema_file=SOURCE_SCHEMA_1,
+            upload_format=PARQUET_UPLOAD_FORMAT
+        )
+        assert LoadJobConfig.return_value.source_format == "PARQUET"
+
+    def test_should_fall_back_to_gzip_without_schema(
+            self, bq_client, LoadJobConfig, mock_exists, write_config_table_upload_file_mock
+    ):
+        mock_exists.return_value = False
+        update_or_create_table_from_csv(
+            bq_client,
+            TABLE_1,
+            SOURCE_FILE_1,
+            dataset=DATASET_1,
+            source_schema_file=SOURCE_SCHEMA_1,
+            upload_format=PARQUET_UPLOAD_FORMAT
+        )
+        assert LoadJobConfig.return_value.source_format == "CSV"
+        assert write_config_table_upload_file_mock.call_args[0][2] == GZIP_UPLOAD_FORMAT
+
+    @pytest.mark.usefixtures("LoadJobConfig")
+    def test_should_validate_csv_file_before_upload(
+            self, bq_client, get_table_schema_mock, validate_config_table_csv_file_mock
+    ):
+        validate_config_table_csv_file_mock.side_effect = ConfigTableValidationError(
+            SOURCE_FILE_1, [ConfigTableValidationIssue(2, 'count', 'invalid INTEGER value')]
+        )
+        with pytest.raises(ConfigTableValidationError):
+            update_or_create_table_from_csv(
+                bq_client,
+                TABLE_1,
+                SOURCE_FILE_1,
+                dataset=DATASET_1,
+                source_schema_file=SOURCE_SCHEMA_1,
+            )
+        validate_config_table_csv_file_mock.assert_called_with(
+            SOURCE_FILE_1, get_table_schema_mock.return_value
+        )
+        bq_client.load_table_from_file.assert_not_called()
+
+    @pytest.mark.usefixtures("LoadJobConfig")
+    def test_should_not_validate_csv_file_if_disabled(
+            self, bq_client, validate_config_table_csv_file_mock
+    ):
+        update_or_create_table_from_csv(
+            bq_client,
+            TABLE_1,
+            SOURCE_FILE_1,
+            dataset=DATASET_1,
+            source_schema_file=SOURCE_SCHEMA_1,
+            validate=False
+        )
+        validate_config_table_csv_file_mock.assert_not_called()
+        bq_client.load_table_from_file.assert_called()
+
+
+class TestGetConfigTableContentHash:
+    def test_should_return_same_hash_for_same_content(self, temp_dir: Path):
+        (temp_dir / 'table1.csv').write_text('a,b\n1,2\n')
+        (temp_dir / 'table2.csv').write_text('a,b\n1,2\n')
+        (temp_dir / 'schema.json').write_text('[]')
+        assert get_config_table_content_hash(
+            temp_dir / 'table1.csv', temp_dir / 'schema.json'
+        ) == get_config_table_content_hash(
+            temp_dir / 'table2.csv', temp_dir / 'schema.json'
+        )
+
+    def test_should_return_different_hash_for_different_schema(self, temp_dir: Path):
+        (temp_dir / 'table1.csv').write_text('a,b\n1,2\n')
+        (temp_dir / 'schema1.json').write_text('[]')
+        (temp_dir / 'schema2.json').write_text('[{}]')
+        assert get_config_table_content_hash(
+            temp_dir / 'table1.csv', temp_dir / 'schema1.json'
+        ) != get_config_table_content_hash(
+            temp_dir / 'table1.csv', temp_dir / 'schema2.json'
+        )
+
+    def test_should_return_label_compatible_hash(self, temp_dir: Path):
+        (temp_dir / 'table1.csv').write_text('a,b\n1,2\n')
+        (temp_dir / 'schema.json').write_text('[]')
+        content_hash = get_config_table_content_hash(
+            temp_dir / 'table1.csv', temp_dir / 'schema.json'
+        )
+        assert re.match(r'^[a-z0-9_-]{1,63}$', content_hash)
+
+
+class TestUpdateOrCreateConfigTables:
+    @pytest.fixture(name="get_config_table_content_hash_mock", autouse=True)
+    def _get_config_table_content_hash_mock(self):
+        with patch.object(config_tables_module, "get_config_table_content_hash") as mock:
+            mock.side_effect = lambda source_file, _: f'hash_of_{Path(source_file).stem}'
+            yield mock
+
+    @pytest.fixture(name="update_or_create_table_from_csv_mock")
+    def _update_or_create_table_from_csv_mock(self):
+        with patch.object(config_tables_module, "update_or_create_table_from_csv") as mock:
+            mock.side_effect = lambda _, table_name, *__, **___: ConfigTableResult(
+                table_name=table_name, duration=0.1, input_file_bytes=100
+            )
+            yield mock
+
+    def test_should_load_all_tables_concurrently(
+            self, bq_client, update_or_create_table_from_csv_mock):
+        table_names = [f'table{index}' for index in range(10)]
+        list_result = update_or_create_config_tables(
+            bq_client, 'base_dir', table_names, dataset=DATASET_1, max_workers=3
+        )
+        assert update_or_create_table_from_csv_mock.call_count == 10
+        assert [result.table_name for result in list_result.result_list] == table_names
+        assert list_result.total_input_file_bytes == 1000
+
+    def test_should_load_remaining_tables_and_report_failed_tables(
+            self, bq_client, update_or_create_table_from_csv_mock):
+        side_effect = update_or_create_table_from_csv_mock.side_effect
+
+        def _update_or_create_table_from_csv(client, table_name, *args, **kwargs):
+            if table_name == 'table1':
+                raise RuntimeError('invalid csv')
+            return side_effect(client, table_name, *args, **kwargs)
+
+        update_or_create_table_from_csv_mock.side_effect = _update_or_create_table_from_csv
+        with pytest.raises(ConfigTablesError) as exc_info:
+            update_or_create_config_tables(
+                bq_client, 'base_dir', ['table1', 'table2'], dataset=DATASET_1
+            )
+        assert update_or_create_table_from_csv_mock.call_count == 2
+        list_result = exc_info.value.list_result
+        assert [result.table_name for result in list_result.failed_result_list] == ['table1']
+        assert 'table1' in str(exc_info.value)
+
+    def test_should_skip_tables_with_unchanged_content_hash_label(
+            self, bq_client, update_or_create_table_from_csv_mock):
+        table_item = MagicMock(name='table_item1')
+        table_item.table_id = 'table1'
+        table_item.labels = {CONTENT_HASH_LABEL_KEY: 'hash_of_table1'}
+        bq_client.list_tables.return_value = [table_item]
+        list_result = update_or_create_config_tables(
+            bq_client, 'base_dir', ['table1', 'table2'], dataset=DATASET_1
+        )
+        bq_client.list_tables.assert_called_once_with(dataset=DATASET_1)
+        assert [
+            call_args[0][1] for call_args in update_or_create_table_from_csv_mock.call_args_list
+        ] == ['table2']
+        assert update_or_create_table_from_csv_mock.call_args[1]['content_hash'] == (
+            'hash_of_table2'
+        )
+        assert [result.table_name for result in list_result.skipped_result_list] == ['table1']
+
+    def test_should_not_skip_tables_with_unchanged_content_hash_label_if_forced(
+            self, bq_client, update_or_create_table_from_csv_mock):
+        update_or_create_config_tables(
+            bq_client, 'base_dir', ['table1'], dataset=DATASET_1, force=True
+        )
+        bq_client.list_tables.assert_not_called()
+        assert update_or_create_table_from_csv_mock.call_count == 1
+
+
+class TestValidateConfigTables:
+    def test_should_validate_all_tables_and_report_invalid_tables(
+            self, temp_dir: Path, validate_config_table_csv_file_mock
+    ):
+        (temp_dir / 'tables').mkdir()
+        for table_name in ['table1', 'table2']:
+            (temp_dir / 'tables' / f'{table_name}.csv').write_text('a\n1\n')
+
+        def _validate_config_table_csv_file(source_file, _):
+            if Path(source_file).stem == 'table1':
+                raise ConfigTableValidationError(
+                    source_file, [ConfigTableValidationIssue(2, 'a', 'invalid INTEGER value')]
+                )
+
+        validate_config_table_csv_file_mock.side_effect = _validate_config_table_csv_file
+        with pytest.raises(ConfigTablesError) as exc_info:
+            validate_config_tables(str(temp_dir), ['table1', 'table2'])
+        assert validate_config_table_csv_file_mock.call_count == 2
+        list_result = exc_info.value.list_result
+        assert [result.table_name for result in list_result.failed_result_list] == ['table1']
+        assert 'line 2, column a' in str(list_result.failed_result_list[0].error)
+
+
+class TestFormatConfigTableListResult:
+    def test_should_include_table_results_and_total(self):
+        formatted = format_config_table_list_result(ConfigTableListResult(result_list=[
+            ConfigTableResult(
+                table_name='table1', duration=1.5, input_file_bytes=100, output_rows=10
+            ),
+            ConfigTableResult(
+                table_name='table2', duration=0.5, error=RuntimeError('invalid csv')
+            )
+        ]))
+        assert formatted.splitlines() == [
+            'table1: 100 bytes, 10 rows, 1.500s',
+            'table2: failed after 0.500s: invalid csv',
+            'total: 2 tables (0 skipped, 1 failed), 100 bytes'
+        ]
@@ -3,6 +3,7 @@ from typing import List
 from collections import OrderedDict
 
 from google.cloud import bigquery
+from google.cloud.exceptions import NotFound
 
 from bigquery_views_manager.delete_views_or_tables import delete_views_or_tables
 
@@ -37,6 +38,7 @@ def _to_mock_table_list_items(
 
 class TestDeleteViewsOrTables:
     def test_should_call_delete_table_if_table_in_dataset(self, bq_client):
+        bq_client.list_tables.return_value = _to_mock_table_list_items([TABLE_1])
         delete_views_or_tables(bq_client, get_input_ordered_dict_view_mapping())
 
         bq_client.dataset.assert_called_with(DATASET_1)
@@ -45,4 +47,29 @@ class TestDeleteViewsOrTables:
         dataset_ref.table.assert_called_with(TABLE_1)
         table_ref = dataset_ref.table.return_value
 
-        bq_client.delete_table.assert_called_with(table_ref)
+        bq_client.delete_table.assert_called_with(table_ref, not_found_ok=True)
+
+    def test_should_not_call_delete_table_if_table_not_in_dataset(self, bq_client):
+        bq_client.list_tables.return_value = _to_mock_table_list_items(['other'])
+        delete_views_or_tables(bq_client, get_input_ordered_dict_view_mapping())
+        bq_client.delete_table.assert_not_called()
+
+    def test_should_not_call_delete_table_if_dataset_does_not_exist(self, bq_client):
+        bq_client.list_tables.side_effect = NotFound('not found')
+        delete_views_or_tables(bq_client, get_input_ordered_dict_view_mapping())
+        bq_client.delete_table.assert_not_called()
+
+    def test_should_list_each_dataset_once_and_delete_existing_tables(self, bq_client):
+        table_names = [f'table{index}' for index in range(20)]
+        bq_client.list_tables.return_value = _to_mock_table_list_items(table_names[:10])
+        view_mapping = OrderedDict([
+            (table_name, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: table_name})
+            for table_name in table_names
+        ])
+        delete_views_or_tables(bq_client, view_mapping, max_workers=5)
+        bq_client.list_tables.assert_called_once_with(dataset=DATASET_1)
+        bq_client.get_table.assert_not_called()
+        assert bq_client.delete_table.call_count == 10
+        assert sorted(
+            call_args[0][0] for call_args in bq_client.dataset.return_value.table.call_args_list
+        ) == sorted(table_names[:10])
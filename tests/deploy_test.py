@@ -0,0 +1,283 @@
+import threading
+from collections import OrderedDict
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import bigquery_views_manager.deploy as deploy_module
+from bigquery_views_manager.config_tables import ConfigTableResult
+from bigquery_views_manager.deploy import (
+    CONFIG_TABLE_NODE_TYPE,
+    MATERIALIZED_VIEW_NODE_TYPE,
+    VIEW_NODE_TYPE,
+    DeployNode,
+    deploy,
+    get_deploy_dependencies_by_node_map
+)
+from bigquery_views_manager.manifest import DeployManifest
+from bigquery_views_manager.scheduler import CircularDependencyError
+from bigquery_views_manager.view_list import (
+    DATASET_NAME_KEY,
+    VIEW_OR_TABLE_NAME_KEY
+)
+
+
+PROJECT_1 = 'project1'
+DATASET_1 = 'dataset1'
+
+CONFIG_TABLE_1 = 'config_table1'
+VIEW_1 = 'view1'
+VIEW_2 = 'view2'
+VIEW_3 = 'view3'
+M_VIEW_1 = 'mview1'
+
+
+def _get_view_names_dict(view_names):
+    return OrderedDict([
+        (view_name, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: view_name})
+        for view_name in view_names
+    ])
+
+
+def _table(table_name: str) -> str:
+    return '{project}.{dataset}.' + table_name
+
+
+@pytest.fixture(name='get_referenced_table_names_by_view_name_map_mock')
+def _get_referenced_table_names_by_view_name_map_mock():
+    with patch.object(deploy_module, 'get_referenced_table_names_by_view_name_map') as mock:
+        yield mock
+
+
+@pytest.fixture(name='update_or_create_config_table_mock', autouse=True)
+def _update_or_create_config_table_mock():
+    with patch.object(deploy_module, 'update_or_create_config_table') as mock:
+        mock.side_effect = lambda _, __, table_name, **___: ConfigTableResult(
+            table_name=table_name, duration=0.1
+        )
+        yield mock
+
+
+@pytest.fixture(name='update_or_create_view_mock', autouse=True)
+def _update_or_create_view_mock():
+    with patch.object(deploy_module, 'update_or_create_view') as mock:
+        yield mock
+
+
+@pytest.fixture(name='materialize_view_mock', autouse=True)
+def _materialize_view_mock():
+    with patch.object(deploy_module, 'materialize_view_within_budget') as mock:
+        yield mock
+
+
+@pytest.fixture(name='get_local_view_query_mock', autouse=True)
+def _get_local_view_query_mock():
+    with patch.object(deploy_module, 'get_local_view_query') as mock:
+        mock.side_effect = lambda _, view_name, **__: f'SELECT * FROM {view_name}_source'
+        yield mock
+
+
+@pytest.fixture(name='get_content_hash_by_table_name_map_mock', autouse=True)
+def _get_content_hash_by_table_name_map_mock():
+    with patch.object(deploy_module, 'get_content_hash_by_table_name_map') as mock:
+        mock.return_value = {}
+        yield mock
+
+
+class TestGetDeployDependenciesByNodeMap:
+    def test_should_link_views_to_config_tables_views_and_materialized_tables(self):
+        dependencies_by_node = get_deploy_dependencies_by_node_map(
+            [CONFIG_TABLE_1],
+            _get_view_names_dict([VIEW_1, VIEW_2, VIEW_3]),
+            OrderedDict([
+                (VIEW_1, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: M_VIEW_1})
+            ]),
+            {
+                VIEW_1: [_table(CONFIG_TABLE_1), _table('other_table')],
+                VIEW_2: [_table(M_VIEW_1)],
+                VIEW_3: [_table(VIEW_1), _table(VIEW_2)]
+            }
+        )
+        assert dependencies_by_node == OrderedDict([
+            (DeployNode(CONFIG_TABLE_NODE_TYPE, CONFIG_TABLE_1), []),
+            (DeployNode(VIEW_NODE_TYPE, VIEW_1), [
+                DeployNode(CONFIG_TABLE_NODE_TYPE, CONFIG_TABLE_1)
+            ]),
+            (DeployNode(MATERIALIZED_VIEW_NODE_TYPE, VIEW_1), [
+                DeployNode(VIEW_NODE_TYPE, VIEW_1)
+            ]),
+            (DeployNode(VIEW_NODE_TYPE, VIEW_2), [
+                DeployNode(MATERIALIZED_VIEW_NODE_TYPE, VIEW_1)
+            ]),
+            (DeployNode(VIEW_NODE_TYPE, VIEW_3), [
+                DeployNode(VIEW_NODE_TYPE, VIEW_1),
+                DeployNode(VIEW_NODE_TYPE, VIEW_2)
+            ])
+        ])
+
+    def test_should_ignore_references_to_own_materialized_table(self):
+        dependencies_by_node = get_deploy_dependencies_by_node_map(
+            [],
+            _get_view_names_dict([VIEW_1]),
+            OrderedDict([
+                (VIEW_1, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: M_VIEW_1})
+            ]),
+            {VIEW_1: [_table(M_VIEW_1), _table(VIEW_1)]}
+        )
+        assert dependencies_by_node[DeployNode(VIEW_NODE_TYPE, VIEW_1)] == []
+
+
+def _deploy(bq_client: MagicMock, **kwargs):
+    return deploy(
+        bq_client,
+        'base_dir',
+        config_tables_base_dir='config_tables_base_dir',
+        project=PROJECT_1,
+        default_dataset=DATASET_1,
+        view_to_dataset_mapping={},
+        **kwargs
+    )
+
+
+class TestDeploy:
+    def test_should_deploy_config_tables_views_and_materialized_views_in_order(
+            self,
+            bq_client: MagicMock,
+            get_referenced_table_names_by_view_name_map_mock: MagicMock,
+            update_or_create_config_table_mock: MagicMock,
+            update_or_create_view_mock: MagicMock,
+            materialize_view_mock: MagicMock):
+        get_referenced_table_names_by_view_name_map_mock.return_value = {
+            VIEW_1: [_table(CONFIG_TABLE_1)],
+            VIEW_2: [_table(M_VIEW_1)]
+        }
+        events = []
+        update_or_create_config_table_mock.side_effect = (
+            lambda _, __, table_name, **___: events.append(table_name) or ConfigTableResult(
+                table_name=table_name, duration=0.1
+            )
+        )
+        update_or_create_view_mock.side_effect = (
+            lambda _, view_name, *__, **___: events.append(view_name)
+        )
+        materialize_view_mock.side_effect = (
+            lambda *_, **kwargs: events.append(kwargs['destination_table_name']) or MagicMock()
+        )
+        result = _deploy(
+            bq_client,
+            config_table_names=[CONFIG_TABLE_1],
+            view_names_dict=_get_view_names_dict([VIEW_2, VIEW_1]),
+            materialized_view_names_dict=OrderedDict([
+                (VIEW_1, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: M_VIEW_1})
+            ]),
+            max_workers=3
+        )
+        assert events.index(CONFIG_TABLE_1) < events.index(VIEW_1)
+        assert events.index(VIEW_1) < events.index(M_VIEW_1)
+        assert events.index(M_VIEW_1) < events.index(VIEW_2)
+        assert len(result.result_list) == 4
+
+    def test_should_run_independent_nodes_concurrently(
+            self,
+            bq_client: MagicMock,
+            get_referenced_table_names_by_view_name_map_mock: MagicMock,
+            update_or_create_config_table_mock: MagicMock,
+            update_or_create_view_mock: MagicMock):
+        get_referenced_table_names_by_view_name_map_mock.return_value = {}
+        # both nodes need to be running at the same time for the barrier to be passed
+        barrier = threading.Barrier(2, timeout=5)
+
+        def _update_or_create_config_table(_, __, table_name, **___):
+            barrier.wait()
+            return ConfigTableResult(table_name=table_name, duration=0.1)
+
+        update_or_create_config_table_mock.side_effect = _update_or_create_config_table
+        update_or_create_view_mock.side_effect = lambda *_, **__: barrier.wait()
+        _deploy(
+            bq_client,
+            config_table_names=[CONFIG_TABLE_1],
+            view_names_dict=_get_view_names_dict([VIEW_1]),
+            materialized_view_names_dict=OrderedDict(),
+            max_workers=2
+        )
+        update_or_create_view_mock.assert_called_once()
+
+    def test_should_not_deploy_dependents_of_failed_config_table(
+            self,
+            bq_client: MagicMock,
+            get_referenced_table_names_by_view_name_map_mock: MagicMock,
+            update_or_create_config_table_mock: MagicMock,
+            update_or_create_view_mock: MagicMock):
+        get_referenced_table_names_by_view_name_map_mock.return_value = {
+            VIEW_1: [_table(CONFIG_TABLE_1)]
+        }
+        update_or_create_config_table_mock.side_effect = RuntimeError('invalid csv')
+        with pytest.raises(RuntimeError):
+            _deploy(
+                bq_client,
+                config_table_names=[CONFIG_TABLE_1],
+                view_names_dict=_get_view_names_dict([VIEW_1]),
+                materialized_view_names_dict=OrderedDict(),
+                max_workers=2
+            )
+        update_or_create_view_mock.assert_not_called()
+
+    def test_should_fail_before_deploying_anything_on_circular_dependency(
+            self,
+            bq_client: MagicMock,
+            get_referenced_table_names_by_view_name_map_mock: MagicMock,
+            update_or_create_config_table_mock: MagicMock):
+        get_referenced_table_names_by_view_name_map_mock.return_value = {
+            VIEW_1: [_table(VIEW_2)],
+            VIEW_2: [_table(VIEW_1)]
+        }
+        with pytest.raises(CircularDependencyError):
+            _deploy(
+                bq_client,
+                config_table_names=[CONFIG_TABLE_1],
+                view_names_dict=_get_view_names_dict([VIEW_1, VIEW_2]),
+                materialized_view_names_dict=OrderedDict()
+            )
+        update_or_create_config_table_mock.assert_not_called()
+
+    def test_should_record_deployed_views_in_manifest(
+            self,
+            bq_client: MagicMock,
+            get_referenced_table_names_by_view_name_map_mock: MagicMock):
+        get_referenced_table_names_by_view_name_map_mock.return_value = {}
+        manifest = DeployManifest()
+        _deploy(
+            bq_client,
+            config_table_names=[],
+            view_names_dict=_get_view_names_dict([VIEW_1]),
+            materialized_view_names_dict=OrderedDict([
+                (VIEW_1, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: M_VIEW_1})
+            ]),
+            manifest=manifest
+        )
+        assert manifest.get_view_entry(VIEW_1).table_name == VIEW_1
+        assert manifest.materialized_view_entries[VIEW_1].table_name == M_VIEW_1
+
+    def test_should_skip_materialized_views_exceeding_budget(
+            self,
+            bq_client: MagicMock,
+            get_referenced_table_names_by_view_name_map_mock: MagicMock,
+            materialize_view_mock: MagicMock):
+        get_referenced_table_names_by_view_name_map_mock.return_value = {}
+        materialize_view_mock.return_value = None
+        manifest = DeployManifest()
+        result = _deploy(
+            bq_client,
+            config_table_names=[],
+            view_names_dict=_get_view_names_dict([VIEW_1]),
+            materialized_view_names_dict=OrderedDict([
+                (VIEW_1, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: M_VIEW_1})
+            ]),
+            manifest=manifest,
+            max_total_bytes=1000
+        )
+        assert materialize_view_mock.call_args[0][1].max_total_bytes == 1000
+        assert [
+            node_result.node for node_result in result.budget_exceeded_result_list
+        ] == [DeployNode(MATERIALIZED_VIEW_NODE_TYPE, VIEW_1)]
+        assert VIEW_1 not in manifest.materialized_view_entries
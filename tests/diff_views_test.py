@@ -4,9 +4,11 @@ from unittest.mock import patch
 
 import pytest
 
+from google.cloud.exceptions import BadRequest, Forbidden, NotFound
+
 from bigquery_views_manager.view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
 import bigquery_views_manager.diff_views as diff_views_module
-from bigquery_views_manager.diff_views import get_diff_result
+from bigquery_views_manager.diff_views import get_diff_result, is_view_query_equal
 
 PROJECT_1 = "project1"
 DATASET_1 = "dataset1"
@@ -49,12 +51,28 @@ def _get_bq_view_query():
         yield mock
 
 
+@pytest.fixture(name="get_bq_view_query_by_view_name_map", autouse=True)
+def _get_bq_view_query_by_view_name_map():
+    with patch.object(diff_views_module, "get_bq_view_query_by_view_name_map") as mock:
+        # by default simulate the fallback to retrieving individual views
+        mock.side_effect = Forbidden('not permitted')
+        yield mock
+
+
 @pytest.fixture(name="get_bq_view_names", autouse=True)
 def _get_bq_view_names():
     with patch.object(diff_views_module, "get_bq_view_names") as mock:
         yield mock
 
 
+class TestIsViewQueryEqual:
+    def test_should_ignore_whitespace(self):
+        assert is_view_query_equal('SELECT 1\nFROM x', 'SELECT  1 FROM x ')
+
+    def test_should_detect_different_query(self):
+        assert not is_view_query_equal('SELECT 1', 'SELECT 2')
+
+
 class TestGetDiffResult:
     def test_should_return_result_for_single_unchanged_view(
             self, bq_client, get_local_view_query, get_bq_view_query,
@@ -148,3 +166,98 @@ class TestGetDiffResult:
             ".".join([DATASET_1, VIEW_2])
         }
         assert diff_result.changed_view_names == set()
+
+    def test_should_use_view_definitions_of_dataset_without_retrieving_views(
+            self, bq_client, get_local_view_query, get_bq_view_query,
+            get_bq_view_names, get_bq_view_query_by_view_name_map):
+        get_local_view_query.return_value = VIEW_QUERY_1
+        get_bq_view_query_by_view_name_map.side_effect = None
+        get_bq_view_query_by_view_name_map.return_value = {
+            VIEW_1: VIEW_QUERY_2,
+            VIEW_2: VIEW_QUERY_2
+        }
+        diff_result = get_diff_result(
+            bq_client,
+            BASE_DIR,
+            view_names_dict=get_input_ordered_dict_view_mapping(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+        )
+        get_bq_view_query_by_view_name_map.assert_called_with(bq_client, dataset=DATASET_1)
+        get_bq_view_query.assert_not_called()
+        get_bq_view_names.assert_not_called()
+        assert diff_result.changed_view_names == {VIEW_1}
+        assert diff_result.changed_views[0].remote_view_query == VIEW_QUERY_2
+        assert diff_result.remote_only_view_names == {
+            ".".join([DATASET_1, VIEW_2])
+        }
+
+    def test_should_only_retrieve_local_views_when_falling_back(
+            self, bq_client, get_local_view_query, get_bq_view_query,
+            get_bq_view_names):
+        get_local_view_query.return_value = VIEW_QUERY_1
+        get_bq_view_query.return_value = VIEW_QUERY_1
+        get_bq_view_names.return_value = [VIEW_1, VIEW_2]
+        get_diff_result(
+            bq_client,
+            BASE_DIR,
+            view_names_dict=get_input_ordered_dict_view_mapping(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+        )
+        get_bq_view_query.assert_called_once_with(bq_client, VIEW_1, dataset=DATASET_1)
+
+    @pytest.mark.parametrize('exc', [
+        NotFound('dataset not found'),
+        BadRequest('unrecognized name: INFORMATION_SCHEMA')
+    ])
+    def test_should_fall_back_on_not_found_or_bad_request(  # pylint: disable=too-many-arguments
+            self, bq_client, get_local_view_query, get_bq_view_query,
+            get_bq_view_names, get_bq_view_query_by_view_name_map, exc: Exception):
+        get_bq_view_query_by_view_name_map.side_effect = exc
+        get_local_view_query.return_value = VIEW_QUERY_1
+        get_bq_view_query.return_value = VIEW_QUERY_1
+        get_bq_view_names.return_value = [VIEW_1]
+        diff_result = get_diff_result(
+            bq_client,
+            BASE_DIR,
+            view_names_dict=get_input_ordered_dict_view_mapping(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+        )
+        assert diff_result.unchanged_view_names == {".".join([DATASET_1, VIEW_1])}
+
+    def test_should_treat_views_of_missing_dataset_as_local_only(
+            self, bq_client, get_bq_view_names, get_bq_view_query_by_view_name_map):
+        get_bq_view_query_by_view_name_map.side_effect = NotFound('dataset not found')
+        get_bq_view_names.side_effect = NotFound('dataset not found')
+        diff_result = get_diff_result(
+            bq_client,
+            BASE_DIR,
+            view_names_dict=get_input_ordered_dict_view_mapping(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+        )
+        assert diff_result.local_only_view_names == {".".join([DATASET_1, VIEW_1])}
+
+    def test_should_limit_concurrent_datasets_to_max_workers(self, bq_client):
+        view_names_dict = OrderedDict([
+            (f'view{index}', {DATASET_NAME_KEY: f'dataset{index}', VIEW_OR_TABLE_NAME_KEY: 'v'})
+            for index in range(5)
+        ])
+        with patch.object(diff_views_module, 'run_concurrently') as run_concurrently_mock:
+            run_concurrently_mock.return_value = [{} for _ in range(5)]
+            get_diff_result(
+                bq_client,
+                BASE_DIR,
+                view_names_dict=view_names_dict,
+                project=PROJECT_1,
+                default_dataset=DATASET_1,
+                view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+                max_workers=2
+            )
+        assert run_concurrently_mock.call_args[1]['max_workers'] == 2
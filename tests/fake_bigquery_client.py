@@ -0,0 +1,332 @@
+import gzip
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+
+from google.cloud import bigquery
+from google.cloud.exceptions import Conflict, NotFound
+
+
+CREATE_OR_REPLACE_VIEW_PATTERN = re.compile(
+    r"\bCREATE\s+OR\s+REPLACE\s+VIEW\s+`?([\w.:-]+)`?\s+AS\s+",
+    re.IGNORECASE
+)
+
+INFORMATION_SCHEMA_VIEWS_PATTERN = re.compile(
+    r"\bFROM\s+`([\w-]+)\.(\w+)\.INFORMATION_SCHEMA\.VIEWS`",
+    re.IGNORECASE
+)
+
+TABLE_REFERENCE_PATTERN = re.compile(r"`([\w-]+\.\w+\.\w+)`")
+
+DEFAULT_TOTAL_BYTES_PROCESSED = 1024 * 1024
+
+VIEW_TABLE_TYPE = 'VIEW'
+TABLE_TABLE_TYPE = 'TABLE'
+
+
+@dataclass
+class FakeTable:  # pylint: disable=too-many-instance-attributes
+    """
+    Table metadata, used for both get_table and list_tables results.
+    """
+    project: str
+    dataset_id: str
+    table_id: str
+    table_type: str
+    view_query: Optional[str] = None
+    labels: Dict[str, str] = field(default_factory=dict)
+    num_rows: Optional[int] = None
+    schema: list = field(default_factory=list)
+    modified: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def full_table_id(self) -> str:
+        return f'{self.project}:{self.dataset_id}.{self.table_id}'
+
+
+class FakeRowIterator(list):
+    @property
+    def total_rows(self) -> int:
+        return len(self)
+
+
+@dataclass
+class FakeJob:  # pylint: disable=too-many-instance-attributes
+    rows: List[dict] = field(default_factory=list)
+    error: Optional[Exception] = None
+    total_bytes_processed: Optional[int] = None
+    total_bytes_billed: Optional[int] = None
+    cache_hit: bool = False
+    slot_millis: Optional[int] = None
+    input_file_bytes: Optional[int] = None
+    output_rows: Optional[int] = None
+    ddl_target_table: Optional[bigquery.TableReference] = None
+    error_result: Optional[dict] = None
+    child_jobs: List['FakeJob'] = field(default_factory=list)
+
+    def result(self) -> FakeRowIterator:
+        if self.error is not None:
+            raise self.error
+        return FakeRowIterator(self.rows)
+
+
+@dataclass
+class _InjectedError:
+    exception: Exception
+    remaining_count: Optional[int]
+
+
+class FakeBigQueryClient:  # pylint: disable=too-many-instance-attributes
+    """
+    A stateful in-memory stand-in for the subset of bigquery.Client used by this package.
+
+    Views are created via "CREATE OR REPLACE VIEW" queries (including scripts), tables via
+    query destinations and loads. Like BigQuery, creating a view or running a query fails
+    if a referenced table does not exist yet (unless validate_references is disabled).
+    Every API call can be delayed (latency, per method name) and made to fail (inject_error).
+    """
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            project: str = 'fake-project',
+            latency: float = 0.0,
+            latency_by_method_name: Dict[str, float] = None,
+            validate_references: bool = True,
+            datasets: List[str] = None):
+        self.project = project
+        self.latency = latency
+        self.latency_by_method_name = latency_by_method_name or {}
+        self.validate_references = validate_references
+        self.call_count_by_method_name: Counter = Counter()
+        self._lock = threading.Lock()
+        self._dataset_ids = set(datasets or [])
+        self._table_by_key: Dict[str, FakeTable] = {}
+        self._injected_errors_by_method_name: Dict[str, List[_InjectedError]] = {}
+
+    @property
+    def api_call_count(self) -> int:
+        # note: dataset() only creates a reference and is not counted
+        with self._lock:
+            return sum(self.call_count_by_method_name.values())
+
+    def reset_call_counts(self):
+        with self._lock:
+            self.call_count_by_method_name.clear()
+
+    def inject_error(self, method_name: str, exception: Exception, count: Optional[int] = 1):
+        """
+        Makes the next count calls of the method fail with the exception
+        (or every call, if count is None).
+        """
+        with self._lock:
+            self._injected_errors_by_method_name.setdefault(method_name, []).append(
+                _InjectedError(exception=exception, remaining_count=count)
+            )
+
+    def _call(self, method_name: str):
+        with self._lock:
+            self.call_count_by_method_name[method_name] += 1
+            injected_errors = self._injected_errors_by_method_name.get(method_name)
+            injected_error = injected_errors[0] if injected_errors else None
+            if injected_error is not None and injected_error.remaining_count is not None:
+                injected_error.remaining_count -= 1
+                if not injected_error.remaining_count:
+                    injected_errors.pop(0)
+        latency = self.latency_by_method_name.get(method_name, self.latency)
+        if latency:
+            time.sleep(latency)
+        if injected_error is not None:
+            raise injected_error.exception
+
+    def _get_dataset_id(self, dataset: Union[str, bigquery.DatasetReference]) -> str:
+        if isinstance(dataset, str):
+            return dataset.replace(':', '.').split('.')[-1]
+        return dataset.dataset_id
+
+    def _get_table_key(self, table) -> str:
+        if isinstance(table, str):
+            parts = table.replace(':', '.').split('.')
+            if len(parts) == 2:
+                parts = [self.project] + parts
+            return '.'.join(parts)
+        return f'{table.project}.{table.dataset_id}.{table.table_id}'
+
+    def _get_existing_table(self, table_key: str) -> FakeTable:
+        with self._lock:
+            table = self._table_by_key.get(table_key)
+        if table is None:
+            raise NotFound(f'Not found: Table {table_key}')
+        return table
+
+    def _put_table(self, table_key: str, **kwargs) -> FakeTable:
+        project, dataset_id, table_id = table_key.split('.')
+        with self._lock:
+            if dataset_id not in self._dataset_ids:
+                raise NotFound(f'Not found: Dataset {project}:{dataset_id}')
+            previous_table = self._table_by_key.get(table_key)
+            table = FakeTable(
+                project=project,
+                dataset_id=dataset_id,
+                table_id=table_id,
+                labels=dict(previous_table.labels) if previous_table is not None else {},
+                **kwargs
+            )
+            self._table_by_key[table_key] = table
+        return table
+
+    def _validate_references(self, query: str):
+        if not self.validate_references:
+            return
+        for table_key in TABLE_REFERENCE_PATTERN.findall(query):
+            self._get_existing_table(table_key)
+
+    def dataset(self, dataset_id: str) -> bigquery.DatasetReference:
+        return bigquery.DatasetReference(self.project, dataset_id)
+
+    def create_dataset(self, dataset, exists_ok: bool = False):
+        self._call('create_dataset')
+        dataset_id = self._get_dataset_id(dataset)
+        with self._lock:
+            if dataset_id in self._dataset_ids and not exists_ok:
+                raise Conflict(f'Already Exists: Dataset {self.project}:{dataset_id}')
+            self._dataset_ids.add(dataset_id)
+        return self.dataset(dataset_id)
+
+    def list_tables(self, dataset, **_) -> List[FakeTable]:
+        self._call('list_tables')
+        dataset_id = self._get_dataset_id(dataset)
+        with self._lock:
+            if dataset_id not in self._dataset_ids:
+                raise NotFound(f'Not found: Dataset {self.project}:{dataset_id}')
+            return [
+                table
+                for table_key, table in sorted(self._table_by_key.items())
+                if table.dataset_id == dataset_id
+            ]
+
+    def get_table(self, table, **_) -> FakeTable:
+        self._call('get_table')
+        return self._get_existing_table(self._get_table_key(table))
+
+    def create_table(self, table, exists_ok: bool = False, **_) -> FakeTable:
+        self._call('create_table')
+        table_key = self._get_table_key(table)
+        with self._lock:
+            exists = table_key in self._table_by_key
+        if exists:
+            if not exists_ok:
+                raise Conflict(f'Already Exists: Table {table_key}')
+            return self._get_existing_table(table_key)
+        view_query = getattr(table, 'view_query', None)
+        return self._put_table(
+            table_key,
+            table_type=VIEW_TABLE_TYPE if view_query else TABLE_TABLE_TYPE,
+            view_query=view_query
+        )
+
+    def update_table(self, table, fields: List[str], **_) -> FakeTable:
+        self._call('update_table')
+        existing_table = self._get_existing_table(self._get_table_key(table))
+        with self._lock:
+            for field_name in fields:
+                setattr(existing_table, field_name, getattr(table, field_name))
+            existing_table.modified = datetime.now(timezone.utc)
+        return existing_table
+
+    def delete_table(self, table, not_found_ok: bool = False, **_):
+        self._call('delete_table')
+        table_key = self._get_table_key(table)
+        with self._lock:
+            removed_table = self._table_by_key.pop(table_key, None)
+        if removed_table is None and not not_found_ok:
+            raise NotFound(f'Not found: Table {table_key}')
+
+    def list_jobs(self, parent_job: FakeJob = None, **_) -> List[FakeJob]:
+        self._call('list_jobs')
+        return list(parent_job.child_jobs) if parent_job is not None else []
+
+    def _run_create_or_replace_views(self, query: str) -> FakeJob:
+        matches = list(CREATE_OR_REPLACE_VIEW_PATTERN.finditer(query))
+        script_job = FakeJob()
+        for index, match in enumerate(matches):
+            end = matches[index + 1].start() if index + 1 < len(matches) else len(query)
+            view_query = query[match.end():end].strip().rstrip(';').strip()
+            table_key = self._get_table_key(match.group(1))
+            try:
+                self._validate_references(view_query)
+                self._put_table(table_key, table_type=VIEW_TABLE_TYPE, view_query=view_query)
+            except NotFound as exc:
+                # like a script, stop at the first failing statement
+                script_job.child_jobs.append(FakeJob(
+                    ddl_target_table=bigquery.TableReference.from_string(table_key),
+                    error_result={'message': str(exc)}
+                ))
+                script_job.error = exc
+                break
+            script_job.child_jobs.append(FakeJob(
+                ddl_target_table=bigquery.TableReference.from_string(table_key)
+            ))
+        if len(matches) == 1 and script_job.error is not None:
+            raise script_job.error
+        return script_job
+
+    def _run_information_schema_views_query(self, project: str, dataset_id: str) -> FakeJob:
+        with self._lock:
+            if dataset_id not in self._dataset_ids:
+                raise NotFound(f'Not found: Dataset {project}:{dataset_id}')
+            rows = [
+                {'table_name': table.table_id, 'view_definition': table.view_query}
+                for table in self._table_by_key.values()
+                if table.dataset_id == dataset_id and table.table_type == VIEW_TABLE_TYPE
+            ]
+        return FakeJob(rows=rows)
+
+    def query(self, query: str, job_config: bigquery.QueryJobConfig = None, **_) -> FakeJob:
+        self._call('query')
+        if CREATE_OR_REPLACE_VIEW_PATTERN.search(query):
+            return self._run_create_or_replace_views(query)
+        information_schema_match = INFORMATION_SCHEMA_VIEWS_PATTERN.search(query)
+        if information_schema_match:
+            return self._run_information_schema_views_query(*information_schema_match.groups())
+        self._validate_references(query)
+        if job_config is not None and job_config.dry_run:
+            return FakeJob(total_bytes_processed=DEFAULT_TOTAL_BYTES_PROCESSED)
+        if job_config is not None and job_config.destination is not None:
+            self._put_table(
+                self._get_table_key(job_config.destination),
+                table_type=TABLE_TABLE_TYPE,
+                num_rows=0
+            )
+        return FakeJob(
+            total_bytes_processed=DEFAULT_TOTAL_BYTES_PROCESSED,
+            total_bytes_billed=DEFAULT_TOTAL_BYTES_PROCESSED,
+            slot_millis=1
+        )
+
+    def load_table_from_file(
+            self,
+            file_obj,
+            destination,
+            job_config: bigquery.LoadJobConfig = None,
+            **_) -> FakeJob:
+        self._call('load_table_from_file')
+        content = file_obj.read()
+        input_file_bytes = len(content)
+        output_rows = None
+        if job_config is None or job_config.source_format in (None, 'CSV'):
+            if content[:2] == b'\x1f\x8b':
+                content = gzip.decompress(content)
+            output_rows = len(content.splitlines()) - (
+                (job_config.skip_leading_rows or 0) if job_config is not None else 0
+            )
+        self._put_table(
+            self._get_table_key(destination),
+            table_type=TABLE_TABLE_TYPE,
+            num_rows=output_rows,
+            schema=list(job_config.schema or []) if job_config is not None else []
+        )
+        return FakeJob(input_file_bytes=input_file_bytes, output_rows=output_rows)
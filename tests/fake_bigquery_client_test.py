@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+from google.cloud.exceptions import NotFound, ServiceUnavailable
+
+from bigquery_views_manager.config_tables import update_or_create_table_from_csv
+from bigquery_views_manager.delete_views_or_tables import delete_views_or_tables
+from bigquery_views_manager.materialize_views import materialize_view
+from bigquery_views_manager.update_views import (
+    UpdateViewsScriptError,
+    update_or_create_view,
+    update_or_create_views_using_script
+)
+from bigquery_views_manager.view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
+from bigquery_views_manager.views import get_bq_view_names, get_bq_view_query
+
+from .fake_bigquery_client import FakeBigQueryClient
+
+
+PROJECT_1 = 'project1'
+DATASET_1 = 'dataset1'
+
+QUERY_1 = 'SELECT 1 AS value'
+
+
+def _get_fake_bq_client(**kwargs) -> FakeBigQueryClient:
+    return FakeBigQueryClient(project=PROJECT_1, datasets=[DATASET_1], **kwargs)
+
+
+class TestFakeBigQueryClient:
+    def test_should_create_and_get_view(self):
+        client = _get_fake_bq_client()
+        update_or_create_view(client, 'view1', QUERY_1, dataset=DATASET_1)
+        assert get_bq_view_names(client, DATASET_1) == ['view1']
+        assert get_bq_view_query(client, 'view1', DATASET_1) == QUERY_1
+        assert client.call_count_by_method_name['query'] == 1
+        assert client.call_count_by_method_name['list_tables'] == 1
+
+    def test_should_fail_to_create_view_referencing_missing_table(self):
+        client = _get_fake_bq_client()
+        with pytest.raises(NotFound):
+            update_or_create_view(
+                client, 'view2', f'SELECT * FROM `{PROJECT_1}.{DATASET_1}.view1`',
+                dataset=DATASET_1
+            )
+
+    def test_should_report_failed_statement_of_script(self):
+        client = _get_fake_bq_client()
+        with pytest.raises(UpdateViewsScriptError) as exc_info:
+            update_or_create_views_using_script(client, OrderedDict([
+                ((DATASET_1, 'view1'), QUERY_1),
+                ((DATASET_1, 'view2'), f'SELECT * FROM `{PROJECT_1}.{DATASET_1}.other`'),
+                ((DATASET_1, 'view3'), QUERY_1)
+            ]))
+        assert exc_info.value.updated_view_names == [f'{DATASET_1}.view1']
+        assert exc_info.value.failed_view_names == [f'{DATASET_1}.view2']
+
+    def test_should_materialize_view_and_delete_tables(self):
+        client = _get_fake_bq_client()
+        update_or_create_view(client, 'view1', QUERY_1, dataset=DATASET_1)
+        materialize_view(
+            client,
+            source_view_name='view1',
+            destination_table_name='mview1',
+            project=PROJECT_1,
+            source_dataset=DATASET_1,
+            destination_dataset=DATASET_1
+        )
+        assert client.get_table(f'{DATASET_1}.mview1').table_type == 'TABLE'
+        delete_views_or_tables(client, OrderedDict([
+            (name, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: name})
+            for name in ['view1', 'mview1', 'other']
+        ]))
+        assert not client.list_tables(DATASET_1)
+
+    def test_should_load_csv_file(self, temp_dir: Path):
+        csv_file = temp_dir / 'table1.csv'
+        csv_file.write_text('id\n1\n2\n')
+        client = _get_fake_bq_client()
+        result = update_or_create_table_from_csv(
+            client, 'table1', str(csv_file), dataset=DATASET_1,
+            source_schema_file=str(temp_dir / 'missing_schema.json'),
+            content_hash='hash1'
+        )
+        assert result.output_rows == 2
+        assert client.get_table(f'{DATASET_1}.table1').labels == {
+            'config_table_content_hash': 'hash1'
+        }
+
+    def test_should_raise_injected_error_for_next_call_only(self):
+        client = _get_fake_bq_client()
+        client.inject_error('list_tables', ServiceUnavailable('unavailable'))
+        with pytest.raises(ServiceUnavailable):
+            client.list_tables(DATASET_1)
+        assert not client.list_tables(DATASET_1)
+        assert client.call_count_by_method_name['list_tables'] == 2
+
+    def test_should_delay_calls(self):
+        client = _get_fake_bq_client(latency_by_method_name={'list_tables': 0.05})
+        start = time.perf_counter()
+        client.list_tables(DATASET_1)
+        assert time.perf_counter() - start >= 0.05
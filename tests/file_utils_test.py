@@ -0,0 +1,28 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import bigquery_views_manager.file_utils as file_utils_module
+from bigquery_views_manager.file_utils import write_text_atomically
+
+
+class TestWriteTextAtomically:
+    def test_should_write_text(self, temp_dir: Path):
+        write_text_atomically(temp_dir / 'file.txt', 'text1')
+        assert (temp_dir / 'file.txt').read_text() == 'text1'
+
+    def test_should_replace_existing_file(self, temp_dir: Path):
+        (temp_dir / 'file.txt').write_text('old')
+        write_text_atomically(temp_dir / 'file.txt', 'new')
+        assert (temp_dir / 'file.txt').read_text() == 'new'
+
+    def test_should_keep_existing_file_and_remove_temp_file_on_failure(
+            self, temp_dir: Path):
+        (temp_dir / 'file.txt').write_text('old')
+        with patch.object(file_utils_module.os, 'replace') as replace_mock:
+            replace_mock.side_effect = OSError('failed')
+            with pytest.raises(OSError):
+                write_text_atomically(temp_dir / 'file.txt', 'new')
+        assert (temp_dir / 'file.txt').read_text() == 'old'
+        assert [p.name for p in temp_dir.iterdir()] == ['file.txt']
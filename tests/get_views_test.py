@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import bigquery_views_manager.get_views as get_views_module
+from bigquery_views_manager.get_views import get_views
+from bigquery_views_manager.view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
+
+PROJECT_1 = "project1"
+DATASET_1 = "dataset1"
+
+
+@pytest.fixture(name="get_bq_view_query", autouse=True)
+def _get_bq_view_query():
+    with patch.object(get_views_module, "get_bq_view_query") as mock:
+        yield mock
+
+
+def get_view_mapping(view_names):
+    return OrderedDict([
+        (view_name, {DATASET_NAME_KEY: DATASET_1, VIEW_OR_TABLE_NAME_KEY: view_name})
+        for view_name in view_names
+    ])
+
+
+class TestGetViews:
+    def test_should_write_view_templates_with_placeholders(
+            self, bq_client, temp_dir: Path, get_bq_view_query):
+        get_bq_view_query.side_effect = lambda _, view_name, dataset: (
+            f"SELECT * FROM `{PROJECT_1}.{dataset}.{view_name}_source`"
+        )
+        get_views(
+            bq_client,
+            temp_dir,
+            get_view_mapping(['view1', 'view2']),
+            project=PROJECT_1,
+            max_workers=2
+        )
+        assert (temp_dir / 'view1.sql').read_text() == (
+            "SELECT * FROM `{project}.{dataset}.view1_source`\n"
+        )
+        assert (temp_dir / 'view2.sql').read_text() == (
+            "SELECT * FROM `{project}.{dataset}.view2_source`\n"
+        )
+
+    def test_should_not_write_partial_view_template_on_failure(
+            self, bq_client, temp_dir: Path, get_bq_view_query):
+        get_bq_view_query.side_effect = RuntimeError('failed')
+        with pytest.raises(RuntimeError):
+            get_views(
+                bq_client,
+                temp_dir,
+                get_view_mapping(['view1']),
+                project=PROJECT_1,
+                max_workers=2
+            )
+        assert not list(temp_dir.iterdir())
@@ -0,0 +1,229 @@
+import json
+import os
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import bigquery_views_manager.template_repository as template_repository_module
+import bigquery_views_manager.view_list as view_list_module
+from bigquery_views_manager.graph_index import (
+    GRAPH_INDEX_VERSION,
+    GraphIndex,
+    add_graph_index_to_template_repository,
+    build_graph_index,
+    get_graph_index_file,
+    load_graph_index,
+    save_graph_index,
+    update_graph_index_for_view_list_config
+)
+from bigquery_views_manager.template_repository import TemplateRepository, ViewGraph
+from bigquery_views_manager.view_list import get_view_graph, load_view_list_config
+
+
+@pytest.fixture(name='get_referenced_table_names_for_query_mock')
+def _get_referenced_table_names_for_query_mock():
+    with patch.object(
+        template_repository_module, 'get_referenced_table_names_for_query',
+        wraps=template_repository_module.get_referenced_table_names_for_query
+    ) as mock:
+        yield mock
+
+
+@pytest.fixture(name='view_list_config_path')
+def _view_list_config_path(temp_dir: Path) -> Path:
+    view_list_config_path = temp_dir / 'views.yml'
+    view_list_config_path.write_text('\n'.join([
+        '- view1:',
+        '    materialize: true',
+        '    materialize_as: mview1',
+        '- view2',
+        '- view3'
+    ]))
+    (temp_dir / 'view1.sql').write_text('SELECT 1')
+    (temp_dir / 'view2.sql').write_text('SELECT * FROM `{project}.{dataset}.mview1`')
+    (temp_dir / 'view3.sql').write_text('SELECT * FROM `{project}.{dataset}.view2`')
+    return view_list_config_path
+
+
+def _build_graph_index(view_list_config_path: Path, template_repository: TemplateRepository):
+    return build_graph_index(
+        view_list_config_path.parent,
+        load_view_list_config(view_list_config_path),
+        template_repository
+    )
+
+
+class TestGetGraphIndexFile:
+    def test_should_place_index_next_to_view_list_config(self):
+        assert get_graph_index_file('/path/to/views.yml') == Path(
+            '/path/to/views.graph-index.json'
+        )
+
+
+class TestBuildGraphIndex:
+    def test_should_include_forward_and_reverse_edges_and_materialized_tables(
+            self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        assert graph_index.view_graph.referenced_view_names_by_view_name == {
+            'view1': [],
+            'view2': ['view1'],
+            'view3': ['view2']
+        }
+        assert graph_index.view_graph.dependent_view_names_by_view_name == {
+            'view1': ['view2'],
+            'view2': ['view3'],
+            'view3': []
+        }
+        assert graph_index.view_graph.view_by_materialized_table_name == {'mview1': 'view1'}
+        assert graph_index.template_entry_by_view_name['view3'].referenced_table_names == [
+            '{project}.{dataset}.view2'
+        ]
+
+    def test_should_skip_views_without_template(self, view_list_config_path: Path):
+        (view_list_config_path.parent / 'view3.sql').unlink()
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        assert set(graph_index.template_entry_by_view_name.keys()) == {'view1', 'view2'}
+        assert graph_index.view_graph.view_names == ['view1', 'view2']
+
+
+class TestSaveAndLoadGraphIndex:
+    def test_should_save_and_load_graph_index(self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        graph_index_file = get_graph_index_file(view_list_config_path)
+        save_graph_index(graph_index, graph_index_file)
+        assert load_graph_index(graph_index_file) == graph_index
+
+    def test_should_not_rewrite_unchanged_graph_index(self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        graph_index_file = get_graph_index_file(view_list_config_path)
+        save_graph_index(graph_index, graph_index_file)
+        mtime_ns = graph_index_file.stat().st_mtime_ns
+        save_graph_index(graph_index, graph_index_file)
+        assert graph_index_file.stat().st_mtime_ns == mtime_ns
+
+    def test_should_not_persist_modification_time_or_size(self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        graph_index_file = get_graph_index_file(view_list_config_path)
+        save_graph_index(graph_index, graph_index_file)
+        value = json.loads(graph_index_file.read_text(encoding='utf-8'))
+        assert set(value['templates']['view1'].keys()) == {
+            'referenced_table_names', 'first_table_name', 'content_hash'
+        }
+
+    def test_should_not_rewrite_graph_index_if_only_modification_time_changed(
+            self, view_list_config_path: Path):
+        graph_index_file = get_graph_index_file(view_list_config_path)
+        save_graph_index(
+            _build_graph_index(view_list_config_path, TemplateRepository()),
+            graph_index_file
+        )
+        text = graph_index_file.read_text(encoding='utf-8')
+        view_path = view_list_config_path.parent / 'view1.sql'
+        mtime_ns = view_path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(view_path, ns=(mtime_ns, mtime_ns))
+        save_graph_index(
+            _build_graph_index(view_list_config_path, TemplateRepository()),
+            graph_index_file
+        )
+        assert graph_index_file.read_text(encoding='utf-8') == text
+
+    def test_should_not_save_graph_index_same_as_previous_graph_index(
+            self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        update_graph_index_for_view_list_config(
+            view_list_config_path, previous_graph_index=graph_index
+        )
+        assert not get_graph_index_file(view_list_config_path).exists()
+        update_graph_index_for_view_list_config(view_list_config_path)
+        assert load_graph_index(get_graph_index_file(view_list_config_path)) == graph_index
+
+    def test_should_ignore_missing_invalid_or_other_version_graph_index(self, temp_dir: Path):
+        graph_index_file = temp_dir / 'views.graph-index.json'
+        assert load_graph_index(graph_index_file) is None
+        graph_index_file.write_text('invalid')
+        assert load_graph_index(graph_index_file) is None
+        graph_index_file.write_text(json.dumps({'version': GRAPH_INDEX_VERSION + 1}))
+        assert load_graph_index(graph_index_file) is None
+
+    def test_should_only_parse_changed_templates_after_loading_graph_index(
+            self,
+            view_list_config_path: Path,
+            get_referenced_table_names_for_query_mock):
+        graph_index_file = get_graph_index_file(view_list_config_path)
+        save_graph_index(
+            _build_graph_index(view_list_config_path, TemplateRepository()),
+            graph_index_file
+        )
+        (view_list_config_path.parent / 'view3.sql').write_text(
+            'SELECT * FROM `{project}.{dataset}.view1`'
+        )
+        get_referenced_table_names_for_query_mock.reset_mock()
+
+        template_repository = TemplateRepository()
+        add_graph_index_to_template_repository(
+            load_graph_index(graph_index_file),
+            view_list_config_path.parent,
+            template_repository
+        )
+        graph_index = _build_graph_index(view_list_config_path, template_repository)
+        assert graph_index.view_graph.referenced_view_names_by_view_name['view3'] == ['view1']
+        assert get_referenced_table_names_for_query_mock.call_count == 1
+
+
+class TestUseGraphIndex:
+    def _load_graph_index(self, view_list_config_path: Path, view_graph: ViewGraph):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        template_repository = TemplateRepository()
+        add_graph_index_to_template_repository(
+            GraphIndex(
+                template_entry_by_view_name=graph_index.template_entry_by_view_name,
+                view_graph=view_graph
+            ),
+            view_list_config_path.parent,
+            template_repository
+        )
+        return template_repository
+
+    def _get_view_graph(self, view_list_config_path: Path, materialize: bool = True):
+        view_list_config = load_view_list_config(view_list_config_path)
+        return get_view_graph(
+            view_list_config_path.parent,
+            view_list_config.to_views_ordered_dict('dataset1'),
+            (
+                view_list_config.to_materialized_view_ordered_dict('dataset1')
+                if materialize else OrderedDict()
+            )
+        )
+
+    def test_should_use_indexed_view_graph_if_view_templates_are_unchanged(
+            self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        # a distinguishable copy of the indexed view graph
+        indexed_view_graph = replace(
+            graph_index.view_graph,
+            dependent_view_names_by_view_name={'view1': ['view3']}
+        )
+        template_repository = self._load_graph_index(view_list_config_path, indexed_view_graph)
+        with patch.object(
+                view_list_module, 'get_template_repository', return_value=template_repository):
+            assert self._get_view_graph(view_list_config_path) == indexed_view_graph
+            assert self._get_view_graph(view_list_config_path, materialize=False) != (
+                indexed_view_graph
+            )
+
+    def test_should_not_use_indexed_view_graph_if_view_template_changed(
+            self, view_list_config_path: Path):
+        graph_index = _build_graph_index(view_list_config_path, TemplateRepository())
+        template_repository = self._load_graph_index(
+            view_list_config_path, graph_index.view_graph
+        )
+        (view_list_config_path.parent / 'view3.sql').write_text(
+            'SELECT * FROM `{project}.{dataset}.view1`'
+        )
+        with patch.object(
+                view_list_module, 'get_template_repository', return_value=template_repository):
+            view_graph = self._get_view_graph(view_list_config_path)
+        assert view_graph.referenced_view_names_by_view_name['view3'] == ['view1']
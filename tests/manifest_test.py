@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from bigquery_views_manager.manifest import (
+    DeployManifest,
+    ManifestEntry,
+    get_query_hash,
+    load_manifest,
+    save_manifest
+)
+
+
+ENTRY_1 = ManifestEntry(
+    query_hash=get_query_hash('SELECT 1'),
+    project='project1',
+    dataset='dataset1',
+    table_name='view1'
+)
+
+
+class TestGetQueryHash:
+    def test_should_return_different_hash_for_different_query(self):
+        assert get_query_hash('SELECT 1') != get_query_hash('SELECT 2')
+
+    def test_should_return_same_hash_for_same_query(self):
+        assert get_query_hash('SELECT 1') == get_query_hash('SELECT 1')
+
+
+class TestDeployManifest:
+    def test_should_detect_unchanged_view(self):
+        manifest = DeployManifest(view_entries={'view1': ENTRY_1})
+        assert manifest.is_view_unchanged('view1', ENTRY_1)
+
+    def test_should_detect_view_deployed_to_other_dataset(self):
+        manifest = DeployManifest(view_entries={'view1': ENTRY_1})
+        assert not manifest.is_view_unchanged('view1', ManifestEntry(
+            query_hash=ENTRY_1.query_hash,
+            project=ENTRY_1.project,
+            dataset='other_dataset',
+            table_name=ENTRY_1.table_name
+        ))
+
+    def test_should_detect_missing_view(self):
+        assert not DeployManifest().is_view_unchanged('view1', ENTRY_1)
+
+
+class TestLoadManifest:
+    def test_should_return_empty_manifest_if_file_does_not_exist(self, temp_dir: Path):
+        manifest = load_manifest(temp_dir / 'manifest.json')
+        assert not manifest.view_entries
+        assert not manifest.materialized_view_entries
+
+    def test_should_load_saved_manifest(self, temp_dir: Path):
+        manifest_path = temp_dir / 'manifest.json'
+        save_manifest(
+            DeployManifest(
+                view_entries={'view1': ENTRY_1},
+                materialized_view_entries={'view1': ENTRY_1}
+            ),
+            manifest_path
+        )
+        manifest = load_manifest(manifest_path)
+        assert manifest.view_entries == {'view1': ENTRY_1}
+        assert manifest.materialized_view_entries == {'view1': ENTRY_1}
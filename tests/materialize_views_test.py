@@ -1,16 +1,29 @@
-from unittest.mock import ANY, patch
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import ANY, MagicMock, patch
 
 import pytest
 
+from google.cloud.exceptions import NotFound
+
 import bigquery_views_manager.materialize_views as materialize_views_module
 from bigquery_views_manager.materialize_views import (
     MaterializeViewListResult,
     MaterializeViewResult,
+    estimate_materialize_views,
+    format_estimate_result,
+    get_estimated_on_demand_cost,
     get_select_all_from_query,
+    get_upstream_table_ids,
     materialize_view,
     materialize_views
 )
-from bigquery_views_manager.view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
+from bigquery_views_manager.view_list import (
+    DATASET_NAME_KEY,
+    MAX_BYTES_BILLED_KEY,
+    VIEW_OR_TABLE_NAME_KEY
+)
 
 PROJECT_1 = "project1"
 SOURCE_DATASET_1 = "dataset1"
@@ -18,6 +31,7 @@ DESTINATION_DATASET_1 = "dataset2"
 
 VIEW_1 = "view1"
 VIEW_2 = "view2"
+VIEW_3 = "view3"
 
 TABLE_1 = "table1"
 
@@ -36,6 +50,34 @@ def _query_job_config():
         yield mock
 
 
+MODIFIED_1 = datetime(2021, 1, 1)
+MODIFIED_2 = MODIFIED_1 + timedelta(hours=1)
+
+
+def _set_modified_by_table_id(bq_client, modified_by_table_id: dict):
+    def _get_table(table_id):
+        if table_id not in modified_by_table_id:
+            raise NotFound(table_id)
+        table = MagicMock(name=table_id)
+        table.modified = modified_by_table_id[table_id]
+        return table
+    bq_client.get_table.side_effect = _get_table
+
+
+def _get_source_and_materialized_view_dict(view_names, materialized_view_names):
+    source_view_dict = OrderedDict([
+        (view_name, {DATASET_NAME_KEY: SOURCE_DATASET_1, VIEW_OR_TABLE_NAME_KEY: view_name})
+        for view_name in view_names
+    ])
+    materialized_view_dict = OrderedDict([
+        (view_name, {
+            DATASET_NAME_KEY: DESTINATION_DATASET_1, VIEW_OR_TABLE_NAME_KEY: 'm' + view_name
+        })
+        for view_name in materialized_view_names
+    ])
+    return source_view_dict, materialized_view_dict
+
+
 class TestGetSelectAllFromQuery:
     def test_should_substitute_values(self):
         assert (get_select_all_from_query(
@@ -74,6 +116,32 @@ class TestMaterializeView:
         assert (QueryJobConfig.return_value.write_disposition ==
                 bigquery.WriteDisposition.WRITE_TRUNCATE)
 
+    def test_should_not_set_maximum_bytes_billed_by_default(
+            self, bq_client, QueryJobConfig):
+        QueryJobConfig.return_value.maximum_bytes_billed = None
+        materialize_view(
+            bq_client,
+            source_view_name=VIEW_1,
+            destination_table_name=TABLE_1,
+            project=PROJECT_1,
+            source_dataset=SOURCE_DATASET_1,
+            destination_dataset=DESTINATION_DATASET_1,
+        )
+        assert QueryJobConfig.return_value.maximum_bytes_billed is None
+
+    def test_should_set_maximum_bytes_billed_on_job_config(
+            self, bq_client, QueryJobConfig):
+        materialize_view(
+            bq_client,
+            source_view_name=VIEW_1,
+            destination_table_name=TABLE_1,
+            project=PROJECT_1,
+            source_dataset=SOURCE_DATASET_1,
+            destination_dataset=DESTINATION_DATASET_1,
+            max_bytes_billed=1000,
+        )
+        assert QueryJobConfig.return_value.maximum_bytes_billed == 1000
+
     def test_should_call_result_on_query_job(self, bq_client):
         materialize_view(
             bq_client,
@@ -107,6 +175,7 @@ class TestMaterializeView:
         assert return_value.source_view_name == VIEW_1
         assert return_value.destination_dataset == DESTINATION_DATASET_1
         assert return_value.destination_table_name == TABLE_1
+        assert return_value.start_time <= return_value.end_time
 
 
 class TestMaterializeViews:
@@ -148,6 +217,254 @@ class TestMaterializeViews:
                 duration=ANY,
                 cache_hit=ANY,
                 slot_millis=ANY,
-                total_bytes_billed=ANY
+                total_bytes_billed=ANY,
+                start_time=ANY,
+                end_time=ANY
             )]
         )
+
+    def test_should_materialize_referenced_materialized_view_first(
+            self, bq_client, temp_dir: Path):
+        (temp_dir / 'view1.sql').write_text('SELECT * FROM `{project}.{dataset}.view2`')
+        (temp_dir / 'view2.sql').write_text('SELECT * FROM `{project}.{dataset}.mview3`')
+        (temp_dir / 'view3.sql').write_text('SELECT 1')
+        source_view_dict = OrderedDict([
+            (view_name, {DATASET_NAME_KEY: SOURCE_DATASET_1, VIEW_OR_TABLE_NAME_KEY: view_name})
+            for view_name in ['view1', 'view2', 'view3']
+        ])
+        materialized_view_dict = OrderedDict([
+            (view_name, {
+                DATASET_NAME_KEY: DESTINATION_DATASET_1, VIEW_OR_TABLE_NAME_KEY: 'm' + view_name
+            })
+            for view_name in ['view1', 'view3']
+        ])
+        return_value = materialize_views(
+            client=bq_client,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict,
+            project=PROJECT_1,
+            base_dir=temp_dir,
+            max_workers=2
+        )
+        queries = [call_args[0][0] for call_args in bq_client.query.call_args_list]
+        assert queries == [
+            get_select_all_from_query('view3', project=PROJECT_1, dataset=SOURCE_DATASET_1),
+            get_select_all_from_query('view1', project=PROJECT_1, dataset=SOURCE_DATASET_1)
+        ]
+        assert [
+            result.source_view_name for result in return_value.result_list
+        ] == ['view1', 'view3']
+
+    def test_should_require_base_dir_to_materialize_views_concurrently(self, bq_client):
+        with pytest.raises(ValueError):
+            materialize_views(
+                client=bq_client,
+                materialized_view_dict={'view1': {}},
+                source_view_dict={'view1': {}},
+                project=PROJECT_1,
+                max_workers=2
+            )
+
+
+class TestMaterializeViewsWithByteBudget:
+    @pytest.fixture(name="query_job_by_dry_run")
+    def _query_job_by_dry_run(self, bq_client, QueryJobConfig):
+        dry_run_job_config = MagicMock(name='dry_run_job_config')
+        dry_run_job_config.dry_run = True
+        job_config = MagicMock(name='job_config')
+        job_config.dry_run = False
+        QueryJobConfig.side_effect = [dry_run_job_config, job_config] * 10
+        query_job_by_dry_run = {
+            True: MagicMock(name='dry_run_query_job'),
+            False: MagicMock(name='query_job')
+        }
+        bq_client.query.side_effect = lambda _, job_config: (
+            query_job_by_dry_run[job_config.dry_run]
+        )
+        return query_job_by_dry_run
+
+    def test_should_pass_max_bytes_billed_of_view(self, bq_client, QueryJobConfig):
+        source_view_dict, materialized_view_dict = _get_source_and_materialized_view_dict(
+            [VIEW_1], [VIEW_1]
+        )
+        materialized_view_dict[VIEW_1][MAX_BYTES_BILLED_KEY] = 1000
+        materialize_views(
+            client=bq_client,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict,
+            project=PROJECT_1
+        )
+        assert QueryJobConfig.return_value.maximum_bytes_billed == 1000
+
+    def test_should_materialize_views_within_budget(
+            self, bq_client, query_job_by_dry_run: dict):
+        query_job_by_dry_run[True].total_bytes_processed = 100
+        query_job_by_dry_run[False].total_bytes_billed = 100
+        source_view_dict, materialized_view_dict = _get_source_and_materialized_view_dict(
+            [VIEW_1, VIEW_2], [VIEW_1, VIEW_2]
+        )
+        return_value = materialize_views(
+            client=bq_client,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict,
+            project=PROJECT_1,
+            max_total_bytes=200
+        )
+        assert len(return_value.result_list) == 2
+
+    def test_should_stop_before_exceeding_budget(
+            self, bq_client, query_job_by_dry_run: dict):
+        query_job_by_dry_run[True].total_bytes_processed = 100
+        query_job_by_dry_run[False].total_bytes_billed = 150
+        source_view_dict, materialized_view_dict = _get_source_and_materialized_view_dict(
+            [VIEW_1, VIEW_2, VIEW_3], [VIEW_1, VIEW_2, VIEW_3]
+        )
+        return_value = materialize_views(
+            client=bq_client,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict,
+            project=PROJECT_1,
+            max_total_bytes=200
+        )
+        dry_run_flags = [
+            call_args[1]['job_config'].dry_run
+            for call_args in bq_client.query.call_args_list
+        ]
+        assert dry_run_flags == [True, False, True]
+        assert [
+            result.source_view_name for result in return_value.materialized_result_list
+        ] == [VIEW_1]
+        assert [
+            result.source_view_name for result in return_value.budget_exceeded_result_list
+        ] == [VIEW_2, VIEW_3]
+        assert return_value.skipped_result_list == return_value.budget_exceeded_result_list
+
+
+class TestGetUpstreamTableIds:
+    def test_should_include_view_and_transitively_referenced_tables(self, temp_dir: Path):
+        (temp_dir / 'view1.sql').write_text(
+            'SELECT * FROM `{project}.{dataset}.view2`\nJOIN `other_project.other.table3`'
+        )
+        (temp_dir / 'view2.sql').write_text('SELECT * FROM `{project}.{dataset}.table2`')
+        source_view_dict, _ = _get_source_and_materialized_view_dict(['view1', 'view2'], [])
+        assert get_upstream_table_ids(
+            temp_dir,
+            'view1',
+            source_view_dict=source_view_dict,
+            project=PROJECT_1,
+            default_dataset=SOURCE_DATASET_1,
+            view_to_dataset_mapping={'table2': 'other_dataset'}
+        ) == [
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.view1',
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.view2',
+            'other_project.other.table3',
+            f'{PROJECT_1}.other_dataset.table2',
+        ]
+
+
+class TestMaterializeViewsIncrementally:
+    def _materialize_views(self, bq_client, temp_dir: Path):
+        (temp_dir / 'view1.sql').write_text('SELECT * FROM `{project}.{dataset}.table1`')
+        source_view_dict, materialized_view_dict = _get_source_and_materialized_view_dict(
+            ['view1'], ['view1']
+        )
+        return materialize_views(
+            client=bq_client,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict,
+            project=PROJECT_1,
+            base_dir=temp_dir,
+            incremental=True,
+            default_dataset=SOURCE_DATASET_1
+        )
+
+    def test_should_skip_view_if_upstream_tables_were_not_modified(
+            self, bq_client, temp_dir: Path):
+        _set_modified_by_table_id(bq_client, {
+            f'{PROJECT_1}.{DESTINATION_DATASET_1}.mview1': MODIFIED_2,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.view1': MODIFIED_1,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.table1': MODIFIED_1,
+        })
+        result = self._materialize_views(bq_client, temp_dir)
+        bq_client.query.assert_not_called()
+        assert [r.source_view_name for r in result.skipped_result_list] == ['view1']
+        assert not result.materialized_result_list
+
+    def test_should_materialize_view_if_upstream_table_was_modified(
+            self, bq_client, temp_dir: Path):
+        _set_modified_by_table_id(bq_client, {
+            f'{PROJECT_1}.{DESTINATION_DATASET_1}.mview1': MODIFIED_1,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.view1': MODIFIED_1,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.table1': MODIFIED_2,
+        })
+        result = self._materialize_views(bq_client, temp_dir)
+        bq_client.query.assert_called()
+        assert [r.source_view_name for r in result.materialized_result_list] == ['view1']
+
+    def test_should_materialize_view_if_view_definition_was_modified(
+            self, bq_client, temp_dir: Path):
+        _set_modified_by_table_id(bq_client, {
+            f'{PROJECT_1}.{DESTINATION_DATASET_1}.mview1': MODIFIED_1,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.view1': MODIFIED_2,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.table1': MODIFIED_1,
+        })
+        result = self._materialize_views(bq_client, temp_dir)
+        assert len(result.materialized_result_list) == 1
+
+    def test_should_materialize_view_if_materialized_table_does_not_exist(
+            self, bq_client, temp_dir: Path):
+        _set_modified_by_table_id(bq_client, {
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.view1': MODIFIED_1,
+            f'{PROJECT_1}.{SOURCE_DATASET_1}.table1': MODIFIED_1,
+        })
+        result = self._materialize_views(bq_client, temp_dir)
+        assert len(result.materialized_result_list) == 1
+
+
+# pylint: disable=invalid-name
+class TestEstimateMaterializeViews:
+    def test_should_submit_dry_run_queries(self, bq_client, QueryJobConfig):
+        source_view_dict, materialized_view_dict = _get_source_and_materialized_view_dict(
+            ['view1', 'view2'], ['view1', 'view2']
+        )
+        bq_client.query.return_value.total_bytes_processed = 1000
+        result = estimate_materialize_views(
+            bq_client,
+            materialized_view_dict=materialized_view_dict,
+            source_view_dict=source_view_dict,
+            project=PROJECT_1,
+            max_workers=2
+        )
+        assert QueryJobConfig.return_value.dry_run is True
+        bq_client.query.return_value.result.assert_not_called()
+        assert [r.source_view_name for r in result.result_list] == ['view1', 'view2']
+        assert [r.total_bytes_processed for r in result.result_list] == [1000, 1000]
+        assert all(r.dry_run for r in result.result_list)
+
+
+class TestFormatEstimateResult:
+    def test_should_include_total_bytes_and_cost(self):
+        tib_result = MaterializeViewResult(
+            source_dataset=SOURCE_DATASET_1,
+            source_view_name=VIEW_1,
+            destination_dataset=DESTINATION_DATASET_1,
+            destination_table_name=TABLE_1,
+            total_bytes_processed=2 ** 40,
+            total_rows=None,
+            duration=0.1,
+            cache_hit=False,
+            slot_millis=None,
+            total_bytes_billed=0,
+            dry_run=True
+        )
+        formatted = format_estimate_result(
+            MaterializeViewListResult([tib_result, tib_result]),
+            price_per_tib=5.0
+        )
+        assert f'{SOURCE_DATASET_1}.{VIEW_1}' in formatted
+        assert f'total (2 views): {2 * 2 ** 40} bytes, $10.0000' in formatted
+
+
+class TestGetEstimatedOnDemandCost:
+    def test_should_calculate_cost_per_tib(self):
+        assert get_estimated_on_demand_cost(2 ** 39, price_per_tib=5.0) == 2.5
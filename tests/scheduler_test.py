@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from bigquery_views_manager.scheduler import (
+    CircularDependencyError,
+    run_concurrently,
+    run_with_dependencies
+)
+
+
+class TestRunConcurrently:
+    def test_should_return_results_in_order_of_items(self):
+        assert run_concurrently(
+            lambda item: item * 2,
+            [1, 2, 3],
+            max_workers=2
+        ) == [2, 4, 6]
+
+    def test_should_run_sequentially_in_calling_thread_with_single_worker(self):
+        thread_names = run_concurrently(
+            lambda _: threading.current_thread().name,
+            [1, 2],
+            max_workers=1
+        )
+        assert thread_names == [threading.current_thread().name] * 2
+
+    def test_should_run_items_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        assert run_concurrently(
+            lambda item: (barrier.wait(), item)[1],
+            [1, 2],
+            max_workers=2
+        ) == [1, 2]
+
+    def test_should_not_start_further_items_after_failure(self):
+        started_items = []
+
+        def _func(item):
+            started_items.append(item)
+            if item == 1:
+                raise RuntimeError('failed')
+            return item
+
+        with pytest.raises(RuntimeError):
+            run_concurrently(_func, [1, 2, 3, 4], max_workers=1)
+        assert started_items == [1]
+
+
+class TestRunWithDependencies:
+    def test_should_run_dependencies_first(self):
+        started_keys = []
+        result = run_with_dependencies(
+            lambda key: started_keys.append(key) or key.upper(),
+            ['a', 'b', 'c'],
+            {'a': ['b'], 'b': ['c']},
+            max_workers=1
+        )
+        assert started_keys == ['c', 'b', 'a']
+        assert result == {'a': 'A', 'b': 'B', 'c': 'C'}
+
+    def test_should_start_ready_keys_concurrently_while_waiting_for_dependencies(self):
+        barrier = threading.Barrier(2, timeout=5)
+        started_keys = []
+
+        def _func(key):
+            started_keys.append(key)
+            if key in {'a', 'c'}:
+                barrier.wait()
+            return key
+
+        run_with_dependencies(
+            _func,
+            ['a', 'b', 'c'],
+            {'b': ['a']},
+            max_workers=2
+        )
+        assert started_keys.index('b') > started_keys.index('a')
+        assert set(started_keys) == {'a', 'b', 'c'}
+
+    def test_should_ignore_dependencies_not_part_of_keys(self):
+        assert run_with_dependencies(
+            lambda key: key,
+            ['a'],
+            {'a': ['other', 'a']},
+            max_workers=2
+        ) == {'a': 'a'}
+
+    def test_should_raise_error_for_circular_dependencies(self):
+        with pytest.raises(CircularDependencyError):
+            run_with_dependencies(
+                lambda key: key,
+                ['a', 'b'],
+                {'a': ['b'], 'b': ['a']},
+                max_workers=2
+            )
@@ -0,0 +1,150 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import bigquery_views_manager.template_repository as template_repository_module
+from bigquery_views_manager.template_repository import (
+    TemplateCacheEntry,
+    TemplateRepository,
+    ViewGraph
+)
+from bigquery_views_manager.view_template import ViewTemplate
+
+
+QUERY_1 = 'SELECT * FROM `{project}.{dataset}.table1`'
+QUERY_2 = 'SELECT * FROM `{project}.{dataset}.table2`\nJOIN `{project}.{dataset}.table3`'
+
+VIEW_GRAPH_1 = ViewGraph(
+    view_names=['view1'],
+    view_by_materialized_table_name={},
+    referenced_view_names_by_view_name={'view1': []},
+    dependent_view_names_by_view_name={'view1': []}
+)
+
+
+@pytest.fixture(name='from_file_mock')
+def _from_file_mock():
+    with patch.object(
+        template_repository_module.ViewTemplate, 'from_file', wraps=ViewTemplate.from_file
+    ) as mock:
+        yield mock
+
+
+@pytest.fixture(name='get_referenced_table_names_for_query_mock')
+def _get_referenced_table_names_for_query_mock():
+    with patch.object(
+        template_repository_module, 'get_referenced_table_names_for_query',
+        wraps=template_repository_module.get_referenced_table_names_for_query
+    ) as mock:
+        yield mock
+
+
+class TestTemplateRepository:
+    def test_should_read_view_template_once(self, temp_dir: Path, from_file_mock):
+        view_path = temp_dir / 'view1.sql'
+        view_path.write_text(QUERY_1)
+        repository = TemplateRepository()
+        assert repository.get_referenced_table_names(view_path) == [
+            '{project}.{dataset}.table1'
+        ]
+        assert repository.get_view_template(view_path).view_template_content == QUERY_1
+        assert repository.get_view_template(view_path).view_template_content == QUERY_1
+        assert from_file_mock.call_count == 1
+
+    def test_should_read_view_template_again_after_it_changed(self, temp_dir: Path):
+        view_path = temp_dir / 'view1.sql'
+        view_path.write_text(QUERY_1)
+        repository = TemplateRepository()
+        assert repository.get_view_template(view_path).view_template_content == QUERY_1
+        view_path.write_text(QUERY_2)
+        assert repository.get_view_template(view_path).view_template_content == QUERY_2
+
+    def test_should_use_references_of_added_entry_without_reading_template(
+            self, temp_dir: Path, from_file_mock):
+        view_path = temp_dir / 'view1.sql'
+        view_path.write_text(QUERY_2)
+        entry = TemplateRepository().get_entry(view_path)
+        from_file_mock.reset_mock()
+
+        repository = TemplateRepository()
+        repository.add_entries({str(view_path): entry})
+        assert repository.get_referenced_table_names(view_path) == [
+            '{project}.{dataset}.table2', '{project}.{dataset}.table3'
+        ]
+        from_file_mock.assert_not_called()
+
+    def test_should_ignore_added_entry_of_changed_template(self, temp_dir: Path):
+        view_path = temp_dir / 'view1.sql'
+        view_path.write_text(QUERY_1)
+        entry = TemplateRepository().get_entry(view_path)
+        view_path.write_text(QUERY_2)
+
+        repository = TemplateRepository()
+        repository.add_entries({str(view_path): entry})
+        assert repository.get_referenced_table_names(view_path) == [
+            '{project}.{dataset}.table2', '{project}.{dataset}.table3'
+        ]
+
+    def test_should_reuse_references_of_cache_entry_with_same_content_hash(
+            self, temp_dir: Path, get_referenced_table_names_for_query_mock):
+        view_path = temp_dir / 'view1.sql'
+        view_path.write_text(QUERY_1)
+        repository = TemplateRepository()
+        repository.get_referenced_table_names(view_path)
+        get_referenced_table_names_for_query_mock.reset_mock()
+        # e.g. after a checkout, only the modification time changed
+        mtime_ns = view_path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(view_path, ns=(mtime_ns, mtime_ns))
+        assert repository.get_referenced_table_names(view_path) == [
+            '{project}.{dataset}.table1'
+        ]
+        get_referenced_table_names_for_query_mock.assert_not_called()
+        assert repository.get_entry(view_path).mtime_ns == mtime_ns
+
+    def test_should_not_replace_entries_read_in_this_run_when_adding_entries(
+            self, temp_dir: Path):
+        view_path = temp_dir / 'view1.sql'
+        view_path.write_text(QUERY_1)
+        repository = TemplateRepository()
+        entry = repository.get_entry(view_path)
+        repository.add_entries({str(view_path): TemplateCacheEntry(
+            mtime_ns=entry.mtime_ns,
+            size=entry.size,
+            referenced_table_names=['other']
+        )})
+        assert repository.get_referenced_table_names(view_path) == [
+            '{project}.{dataset}.table1'
+        ]
+
+
+class TestTemplateRepositoryViewGraph:
+    def _add_view_graph(self, temp_dir: Path) -> TemplateRepository:
+        (temp_dir / 'view1.sql').write_text(QUERY_1)
+        repository = TemplateRepository()
+        repository.add_view_graph(VIEW_GRAPH_1, {
+            str(temp_dir / 'view1.sql'): TemplateRepository().get_entry(temp_dir / 'view1.sql')
+        })
+        return repository
+
+    def test_should_return_view_graph_for_same_views_and_materialized_tables(
+            self, temp_dir: Path):
+        repository = self._add_view_graph(temp_dir)
+        assert repository.get_view_graph(
+            {'view1': str(temp_dir / 'view1.sql')}, {}
+        ) == VIEW_GRAPH_1
+
+    def test_should_not_return_view_graph_for_other_materialized_tables(
+            self, temp_dir: Path):
+        repository = self._add_view_graph(temp_dir)
+        assert repository.get_view_graph(
+            {'view1': str(temp_dir / 'view1.sql')}, {'mview1': 'view1'}
+        ) is None
+
+    def test_should_not_return_view_graph_if_references_changed(self, temp_dir: Path):
+        repository = self._add_view_graph(temp_dir)
+        (temp_dir / 'view1.sql').write_text(QUERY_2)
+        assert repository.get_view_graph(
+            {'view1': str(temp_dir / 'view1.sql')}, {}
+        ) is None
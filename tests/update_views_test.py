@@ -1,14 +1,22 @@
 from collections import OrderedDict
+from pathlib import Path
 
 from unittest.mock import patch, MagicMock
 
 import pytest
 
+from google.cloud.exceptions import BadRequest
+
 import bigquery_views_manager.update_views as update_views_module
+from bigquery_views_manager.manifest import DeployManifest, ManifestEntry, get_query_hash
 from bigquery_views_manager.update_views import (
+    UpdateViewsScriptError,
+    get_batches,
     get_create_or_replace_view_query,
+    get_create_or_replace_views_script,
     update_or_create_view,
     update_or_create_views,
+    update_or_create_views_using_script,
 )
 from bigquery_views_manager.view_list import DATASET_NAME_KEY, VIEW_OR_TABLE_NAME_KEY
 
@@ -46,6 +54,12 @@ def _get_local_view_query():
         yield mock
 
 
+@pytest.fixture(name="get_diff_result", autouse=True)
+def _get_diff_result():
+    with patch.object(update_views_module, "get_diff_result") as mock:
+        yield mock
+
+
 @pytest.fixture(name="materialize_view", autouse=True)
 def _materialize_view():
     with patch.object(update_views_module, "materialize_view") as mock:
@@ -82,6 +96,127 @@ class TestUpdateOrCreateView:
         bq_client.query.return_value.result.assert_called_with()
 
 
+def _get_child_job(dataset: str, view_name: str, error_result: dict = None) -> MagicMock:
+    child_job = MagicMock(name=f'child_job_{view_name}')
+    child_job.ddl_target_table.dataset_id = dataset
+    child_job.ddl_target_table.table_id = view_name
+    child_job.error_result = error_result
+    return child_job
+
+
+class TestGetCreateOrReplaceViewsScript:
+    def test_should_put_semicolon_on_separate_line_after_each_statement(self):
+        assert get_create_or_replace_views_script(OrderedDict([
+            ((DATASET_1, 'view1'), 'SELECT 1 -- comment'),
+            ((DATASET_1, 'view2'), 'SELECT 2')
+        ])) == '\n'.join([
+            f'CREATE OR REPLACE VIEW {DATASET_1}.view1 AS SELECT 1 -- comment',
+            ';',
+            f'CREATE OR REPLACE VIEW {DATASET_1}.view2 AS SELECT 2',
+            ';',
+            ''
+        ])
+
+    def test_should_not_add_semicolon_if_query_already_ends_with_semicolon(self):
+        assert get_create_or_replace_views_script(OrderedDict([
+            ((DATASET_1, 'view1'), 'SELECT 1;\n'),
+        ])) == f'CREATE OR REPLACE VIEW {DATASET_1}.view1 AS SELECT 1;\n'
+
+
+class TestGetBatches:
+    def test_should_return_single_batch_without_batch_size(self):
+        assert get_batches(['a', 'b', 'c'], None) == [['a', 'b', 'c']]
+
+    def test_should_return_no_batches_without_items(self):
+        assert not get_batches([], None)
+        assert not get_batches([], 2)
+
+    def test_should_split_items_into_batches(self):
+        assert get_batches(['a', 'b', 'c'], 2) == [['a', 'b'], ['c']]
+
+    def test_should_split_items_by_total_item_size(self):
+        assert get_batches(
+            ['a', 'bb', 'ccc', 'dddd'], None, get_item_size=len, max_batch_item_size=4
+        ) == [['a', 'bb'], ['ccc'], ['dddd']]
+
+    def test_should_keep_item_larger_than_max_batch_item_size_on_its_own(self):
+        assert get_batches(
+            ['a', 'bbbbb', 'c'], None, get_item_size=len, max_batch_item_size=2
+        ) == [['a'], ['bbbbb'], ['c']]
+
+    def test_should_apply_batch_size_and_max_batch_item_size(self):
+        assert get_batches(
+            ['a', 'b', 'c', 'dddd'], 2, get_item_size=len, max_batch_item_size=4
+        ) == [['a', 'b'], ['c'], ['dddd']]
+
+    @pytest.mark.parametrize('batch_size', [0, -1])
+    def test_should_reject_batch_size_less_than_one(self, batch_size: int):
+        with pytest.raises(ValueError):
+            get_batches(['a'], batch_size)
+
+
+class TestUpdateOrCreateViewsUsingScript:
+    def test_should_submit_single_script_job(self, bq_client):
+        update_or_create_views_using_script(bq_client, OrderedDict([
+            ((DATASET_1, 'view1'), 'SELECT 1'),
+            ((DATASET_1, 'view2'), 'SELECT 2')
+        ]))
+        assert bq_client.query.call_count == 1
+        bq_client.query.return_value.result.assert_called_with()
+        bq_client.list_jobs.assert_not_called()
+
+    def test_should_map_failed_statement_to_view_name_using_child_jobs(self, bq_client):
+        script_job = bq_client.query.return_value
+        script_job.result.side_effect = BadRequest('invalid view2')
+        bq_client.list_jobs.return_value = [
+            _get_child_job(DATASET_1, 'view2', error_result={'reason': 'invalidQuery'}),
+            _get_child_job(DATASET_1, 'view1')
+        ]
+        with pytest.raises(UpdateViewsScriptError) as exc_info:
+            update_or_create_views_using_script(bq_client, OrderedDict([
+                ((DATASET_1, 'view1'), 'SELECT 1'),
+                ((DATASET_1, 'view2'), 'SELECT 2'),
+                ((DATASET_1, 'view3'), 'SELECT 3')
+            ]))
+        bq_client.list_jobs.assert_called_with(parent_job=script_job)
+        assert exc_info.value.updated_view_names == [f'{DATASET_1}.view1']
+        assert exc_info.value.failed_view_names == [f'{DATASET_1}.view2']
+        assert exc_info.value.not_updated_view_names == [f'{DATASET_1}.view3']
+
+    def test_should_use_statement_order_if_failed_child_job_has_no_target_table(
+            self, bq_client):
+        script_job = bq_client.query.return_value
+        script_job.result.side_effect = BadRequest('invalid view2')
+        failed_child_job = _get_child_job(DATASET_1, 'view2', error_result={'reason': 'x'})
+        failed_child_job.ddl_target_table = None
+        bq_client.list_jobs.return_value = [failed_child_job, _get_child_job(DATASET_1, 'view1')]
+        with pytest.raises(UpdateViewsScriptError) as exc_info:
+            update_or_create_views_using_script(bq_client, OrderedDict([
+                ((DATASET_1, 'view1'), 'SELECT 1'),
+                ((DATASET_1, 'view2'), 'SELECT 2'),
+                ((DATASET_1, 'view3'), 'SELECT 3')
+            ]))
+        assert exc_info.value.updated_view_names == [f'{DATASET_1}.view1']
+        assert exc_info.value.failed_view_names == [f'{DATASET_1}.view2']
+        assert exc_info.value.not_updated_view_names == [f'{DATASET_1}.view3']
+
+    def test_should_report_all_views_as_not_updated_without_failed_child_job(
+            self, bq_client):
+        script_job = bq_client.query.return_value
+        script_job.result.side_effect = BadRequest('Syntax error')
+        bq_client.list_jobs.return_value = []
+        with pytest.raises(UpdateViewsScriptError) as exc_info:
+            update_or_create_views_using_script(bq_client, OrderedDict([
+                ((DATASET_1, 'view1'), 'SELECT 1'),
+                ((DATASET_1, 'view2'), 'SELECT 2')
+            ]))
+        assert exc_info.value.updated_view_names == []
+        assert exc_info.value.failed_view_names == []
+        assert exc_info.value.not_updated_view_names == [
+            f'{DATASET_1}.view1', f'{DATASET_1}.view2'
+        ]
+
+
 class TestUpdateOrCreateViews:
     def test_should_materialize_view_if_in_materialized_view_names(
             self, bq_client, materialize_view):
@@ -106,6 +241,7 @@ class TestUpdateOrCreateViews:
                 VIEW_1, VIEW_1).get(VIEW_1).get(DATASET_NAME_KEY),
             destination_dataset=get_input_ordered_dict_view_mapping(
                 VIEW_1, M_VIEW_1).get(VIEW_1).get(DATASET_NAME_KEY),
+            max_bytes_billed=None,
         )
 
     def test_should_not_materialize_view_if_not_in_materialized_view_names(
@@ -122,3 +258,170 @@ class TestUpdateOrCreateViews:
             view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
         )
         materialize_view.assert_not_called()
+
+    def test_should_update_views_referenced_views_first_when_running_concurrently(
+            self, bq_client, temp_dir: Path, get_local_view_query):
+        (temp_dir / 'view1.sql').write_text('SELECT * FROM `{project}.{dataset}.view2`')
+        (temp_dir / 'view2.sql').write_text('SELECT 1')
+        get_local_view_query.side_effect = lambda _, view_name, **__: view_name
+        view_names_dict = get_input_ordered_dict_view_mapping('view1', 'view1')
+        view_names_dict.update(get_input_ordered_dict_view_mapping('view2', 'view2'))
+        update_or_create_views(
+            bq_client,
+            temp_dir,
+            view_names_dict=view_names_dict,
+            materialized_view_names=OrderedDict(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            max_workers=2,
+        )
+        queries = [call_args[0][0] for call_args in bq_client.query.call_args_list]
+        assert len(queries) == 2
+        assert queries[0].endswith(' AS view2')
+        assert queries[1].endswith(' AS view1')
+
+    def test_should_only_update_changed_views_and_still_materialize_unchanged_views(
+            self, bq_client, get_diff_result, materialize_view):
+        view_names_dict = get_input_ordered_dict_view_mapping(VIEW_1, VIEW_1)
+        view_names_dict.update(get_input_ordered_dict_view_mapping(OTHER_VIEW, OTHER_VIEW))
+        get_diff_result.return_value.unchanged_view_names = {f'{DATASET_1}.{VIEW_1}'}
+        update_or_create_views(
+            bq_client,
+            BASE_DIR_1,
+            view_names_dict=view_names_dict,
+            materialized_view_names=get_input_ordered_dict_view_mapping(
+                VIEW_1, M_VIEW_1),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            only_changed=True,
+        )
+        assert bq_client.query.call_count == 1
+        materialize_view.assert_called()
+
+    def test_should_skip_views_unchanged_according_to_trusted_manifest(
+            self, bq_client, get_local_view_query, get_diff_result):
+        get_local_view_query.return_value = VIEW_QUERY_1
+        manifest = DeployManifest(view_entries={VIEW_1: ManifestEntry(
+            query_hash=get_query_hash(VIEW_QUERY_1),
+            project=PROJECT_1,
+            dataset=DATASET_1,
+            table_name=VIEW_1
+        )})
+        update_or_create_views(
+            bq_client,
+            BASE_DIR_1,
+            view_names_dict=get_input_ordered_dict_view_mapping(VIEW_1, VIEW_1),
+            materialized_view_names=OrderedDict(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            manifest=manifest,
+            trust_manifest=True,
+        )
+        bq_client.query.assert_not_called()
+        get_diff_result.assert_not_called()
+
+    def test_should_record_updated_and_materialized_views_in_manifest(
+            self, bq_client, get_local_view_query):
+        get_local_view_query.return_value = VIEW_QUERY_1
+        manifest = DeployManifest()
+        update_or_create_views(
+            bq_client,
+            BASE_DIR_1,
+            view_names_dict=get_input_ordered_dict_view_mapping(VIEW_1, VIEW_1),
+            materialized_view_names=get_input_ordered_dict_view_mapping(VIEW_1, M_VIEW_1),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            manifest=manifest,
+        )
+        bq_client.query.assert_called()
+        assert manifest.view_entries == {VIEW_1: ManifestEntry(
+            query_hash=get_query_hash(VIEW_QUERY_1),
+            project=PROJECT_1,
+            dataset=DATASET_1,
+            table_name=VIEW_1
+        )}
+        assert manifest.materialized_view_entries[VIEW_1].table_name == M_VIEW_1
+
+    def test_should_update_views_of_each_level_using_script_jobs(
+            self, bq_client, temp_dir: Path, get_local_view_query, materialize_view):
+        (temp_dir / 'view1.sql').write_text('SELECT * FROM `{project}.{dataset}.view3`')
+        (temp_dir / 'view2.sql').write_text('SELECT * FROM `{project}.{dataset}.view3`')
+        (temp_dir / 'view3.sql').write_text('SELECT 1')
+        get_local_view_query.side_effect = lambda _, view_name, **__: f'SELECT "{view_name}"'
+        view_names_dict = OrderedDict()
+        for view_name in ['view1', 'view2', 'view3']:
+            view_names_dict.update(get_input_ordered_dict_view_mapping(view_name, view_name))
+        update_or_create_views(
+            bq_client,
+            temp_dir,
+            view_names_dict=view_names_dict,
+            materialized_view_names=get_input_ordered_dict_view_mapping('view1', 'mview1'),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            batch_ddl=True,
+        )
+        scripts = [call_args[0][0] for call_args in bq_client.query.call_args_list]
+        assert scripts == [
+            get_create_or_replace_views_script(OrderedDict([
+                ((DATASET_1, 'view3'), 'SELECT "view3"')
+            ])),
+            get_create_or_replace_views_script(OrderedDict([
+                ((DATASET_1, 'view1'), 'SELECT "view1"'),
+                ((DATASET_1, 'view2'), 'SELECT "view2"')
+            ]))
+        ]
+        bq_client.get_table.assert_not_called()
+        materialize_view.assert_called()
+
+    def test_should_split_level_into_batches(
+            self, bq_client, temp_dir: Path, get_local_view_query):
+        view_names_dict = OrderedDict()
+        for view_name in ['view1', 'view2', 'view3']:
+            (temp_dir / f'{view_name}.sql').write_text('SELECT 1')
+            view_names_dict.update(get_input_ordered_dict_view_mapping(view_name, view_name))
+        get_local_view_query.side_effect = lambda _, view_name, **__: f'SELECT "{view_name}"'
+        update_or_create_views(
+            bq_client,
+            temp_dir,
+            view_names_dict=view_names_dict,
+            materialized_view_names=OrderedDict(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            batch_ddl=True,
+            batch_size=2,
+        )
+        assert bq_client.query.call_count == 2
+
+    def test_should_split_large_level_into_scripts_below_max_script_bytes(
+            self, bq_client, temp_dir: Path, get_local_view_query):
+        view_names_dict = OrderedDict()
+        for view_name in ['view1', 'view2', 'view3', 'view4']:
+            (temp_dir / f'{view_name}.sql').write_text('SELECT 1')
+            view_names_dict.update(get_input_ordered_dict_view_mapping(view_name, view_name))
+        large_query = 'SELECT "' + 'x' * 400 + '"'
+        get_local_view_query.return_value = large_query
+        max_script_bytes = 1000
+        update_or_create_views(
+            bq_client,
+            temp_dir,
+            view_names_dict=view_names_dict,
+            materialized_view_names=OrderedDict(),
+            project=PROJECT_1,
+            default_dataset=DATASET_1,
+            view_to_dataset_mapping=VIEW_TO_DATASET_MAPPING,
+            batch_ddl=True,
+            max_script_bytes=max_script_bytes,
+        )
+        scripts = [call_args[0][0] for call_args in bq_client.query.call_args_list]
+        assert len(scripts) == 2
+        assert all(len(script.encode('utf-8')) <= max_script_bytes for script in scripts)
+        assert ''.join(scripts) == get_create_or_replace_views_script(OrderedDict([
+            ((DATASET_1, view_name), large_query)
+            for view_name in ['view1', 'view2', 'view3', 'view4']
+        ]))
@@ -4,12 +4,21 @@ from collections import OrderedDict
 
 from typing import List, Tuple
 
+import pytest
 import yaml
 
+from bigquery_views_manager.scheduler import CircularDependencyError
 from bigquery_views_manager.view_list import (
     get_referenced_table_names_for_query,
+    get_dependency_level_by_name_in_insert_order,
     determine_insert_order_for_view_names_and_referenced_tables,
+    determine_insert_levels_for_view_names_and_referenced_tables,
+    get_referenced_materialized_view_names_by_view_name_map,
+    get_dependent_view_names_by_view_name_map,
+    get_reachable_names,
+    resolve_view_name_selectors,
     DATASET_NAME_KEY,
+    MAX_BYTES_BILLED_KEY,
     VIEW_OR_TABLE_NAME_KEY,
     ViewCondition,
     ViewConfig,
@@ -25,6 +34,7 @@ LOGGER = logging.getLogger(__name__)
 VIEW_1 = "view1"
 VIEW_2 = "view2"
 VIEW_3 = "view3"
+M_VIEW_1 = "materialized_view1"
 M_VIEW_2 = "materialized_view2"
 TABLE_NAME = "table1"
 
@@ -143,6 +153,244 @@ class TestDetermineInsertOrderForViewNamesAndReferencedTables:
             materialized_views_ordered_dict=OrderedDict(),
         ) == result
 
+    def test_should_ignore_reference_to_own_materialized_table(self):
+        assert list(determine_insert_order_for_view_names_and_referenced_tables(
+            view_mapping=get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_1, VIEW_1), (DATASET_1, VIEW_2, VIEW_2)
+            ]),
+            referenced_table_names_by_view_name=get_referenced_table_in_template(
+                [(VIEW_1, [M_VIEW_1, VIEW_2])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            materialized_views_ordered_dict=get_input_ordered_dict_view_mapping(
+                [(DATASET_1, VIEW_1, M_VIEW_1)]),
+        ).keys()) == [VIEW_2, VIEW_1]
+
+    def test_should_report_circular_dependency(self):
+        with pytest.raises(CircularDependencyError) as exc_info:
+            determine_insert_order_for_view_names_and_referenced_tables(
+                view_mapping=get_input_ordered_dict_view_mapping([
+                    (DATASET_1, VIEW_1, VIEW_1),
+                    (DATASET_1, VIEW_2, VIEW_2),
+                    (DATASET_1, VIEW_3, VIEW_3),
+                ]),
+                referenced_table_names_by_view_name=get_referenced_table_in_template(
+                    [(VIEW_1, [VIEW_2]), (VIEW_2, [VIEW_3]), (VIEW_3, [VIEW_2])],
+                    compose_full_table_name_with_placeholder=True,
+                ),
+                materialized_views_ordered_dict=OrderedDict(),
+            )
+        assert f'{VIEW_2} -> {VIEW_3} -> {VIEW_2}' in str(exc_info.value)
+
+
+class TestGetDependencyLevelByNameInInsertOrder:
+    def test_should_keep_order_of_independent_names(self):
+        assert get_dependency_level_by_name_in_insert_order(
+            ['a', 'b', 'c'], {}
+        ) == OrderedDict([('a', 0), ('b', 0), ('c', 0)])
+
+    def test_should_put_referenced_names_first_in_order_of_references(self):
+        level_by_name = get_dependency_level_by_name_in_insert_order(
+            ['a', 'b', 'c', 'd'],
+            {'a': ['c', 'b'], 'b': ['d'], 'c': ['d']}
+        )
+        assert list(level_by_name.items()) == [
+            ('d', 0), ('c', 1), ('b', 1), ('a', 2)
+        ]
+
+    def test_should_handle_chain_of_diamonds(self):
+        # each diamond doubles the number of paths
+        name_count = 100
+        referenced_names_by_name_map = {}
+        for index in range(name_count):
+            referenced_names_by_name_map[f'left{index}'] = [f'top{index + 1}']
+            referenced_names_by_name_map[f'right{index}'] = [f'top{index + 1}']
+            referenced_names_by_name_map[f'top{index}'] = [f'left{index}', f'right{index}']
+        level_by_name = get_dependency_level_by_name_in_insert_order(
+            ['top0'], referenced_names_by_name_map
+        )
+        assert list(level_by_name.keys())[0] == f'top{name_count}'
+        assert list(level_by_name.keys())[-1] == 'top0'
+        assert level_by_name['top0'] == 2 * name_count
+
+    def test_should_handle_long_chain_without_recursion_error(self):
+        name_count = 10000
+        level_by_name = get_dependency_level_by_name_in_insert_order(
+            [f'view{index}' for index in range(name_count)],
+            {f'view{index}': [f'view{index + 1}'] for index in range(name_count - 1)}
+        )
+        assert list(level_by_name.keys())[0] == f'view{name_count - 1}'
+        assert level_by_name['view0'] == name_count - 1
+
+    def test_should_report_self_contained_cycle(self):
+        with pytest.raises(CircularDependencyError) as exc_info:
+            get_dependency_level_by_name_in_insert_order(
+                ['a', 'b'], {'a': ['b'], 'b': ['a']}
+            )
+        assert 'a -> b -> a' in str(exc_info.value)
+
+
+class TestDetermineInsertLevelsForViewNamesAndReferencedTables:
+    def test_should_put_independent_views_into_same_level(self):
+        view_mapping = get_input_ordered_dict_view_mapping([
+            (DATASET_1, VIEW_1, VIEW_1),
+            (DATASET_1, VIEW_2, VIEW_2),
+        ])
+        levels = determine_insert_levels_for_view_names_and_referenced_tables(
+            view_mapping=view_mapping,
+            referenced_table_names_by_view_name=get_referenced_table_in_template(
+                [(VIEW_1, [TABLE_NAME]), (VIEW_2, [TABLE_NAME])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            materialized_views_ordered_dict=OrderedDict(),
+        )
+        assert levels == [view_mapping]
+
+    def test_should_put_dependent_views_into_later_levels(self):
+        levels = determine_insert_levels_for_view_names_and_referenced_tables(
+            view_mapping=get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_1, VIEW_1),
+                (DATASET_1, VIEW_2, VIEW_2),
+                (DATASET_1, VIEW_3, VIEW_3),
+            ]),
+            referenced_table_names_by_view_name=get_referenced_table_in_template(
+                [(VIEW_1, [VIEW_2, VIEW_3]), (VIEW_2, [VIEW_3])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            materialized_views_ordered_dict=OrderedDict(),
+        )
+        assert [list(level.keys()) for level in levels] == [
+            [VIEW_3], [VIEW_2], [VIEW_1]
+        ]
+
+    def test_should_wait_for_view_materialized_in_referenced_table(self):
+        levels = determine_insert_levels_for_view_names_and_referenced_tables(
+            view_mapping=get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_1, VIEW_1),
+                (DATASET_1, VIEW_2, VIEW_2),
+            ]),
+            referenced_table_names_by_view_name=get_referenced_table_in_template(
+                [(VIEW_1, [M_VIEW_2])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            materialized_views_ordered_dict=get_input_ordered_dict_view_mapping(
+                [(DATASET_1, VIEW_2, M_VIEW_2)]),
+        )
+        assert [list(level.keys()) for level in levels] == [[VIEW_2], [VIEW_1]]
+
+
+class TestGetReferencedMaterializedViewNamesByViewNameMap:
+    def test_should_find_materialized_view_referenced_via_other_view(self):
+        view_mapping = get_input_ordered_dict_view_mapping([
+            (DATASET_1, VIEW_1, VIEW_1),
+            (DATASET_1, VIEW_2, VIEW_2),
+            (DATASET_1, VIEW_3, VIEW_3),
+        ])
+        assert get_referenced_materialized_view_names_by_view_name_map(
+            view_mapping,
+            get_referenced_table_in_template(
+                [(VIEW_1, [VIEW_2]), (VIEW_2, ['mview3', TABLE_NAME])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_1, 'mview1'),
+                (DATASET_1, VIEW_3, 'mview3'),
+            ])
+        ) == {VIEW_1: [VIEW_3], VIEW_3: []}
+
+    def test_should_not_depend_on_materialization_of_directly_referenced_view(self):
+        view_mapping = get_input_ordered_dict_view_mapping([
+            (DATASET_1, VIEW_1, VIEW_1),
+            (DATASET_1, VIEW_2, VIEW_2),
+        ])
+        assert get_referenced_materialized_view_names_by_view_name_map(
+            view_mapping,
+            get_referenced_table_in_template(
+                [(VIEW_1, [VIEW_2])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_1, 'mview1'),
+                (DATASET_1, VIEW_2, 'mview2'),
+            ])
+        ) == {VIEW_1: [], VIEW_2: []}
+
+
+class TestGetDependentViewNamesByViewNameMap:
+    def test_should_map_views_to_referencing_views(self):
+        view_mapping = get_input_ordered_dict_view_mapping([
+            (DATASET_1, VIEW_1, VIEW_1),
+            (DATASET_1, VIEW_2, VIEW_2),
+            (DATASET_1, VIEW_3, VIEW_3),
+        ])
+        assert get_dependent_view_names_by_view_name_map(
+            view_mapping,
+            get_referenced_table_in_template(
+                [(VIEW_2, [VIEW_1, VIEW_1, TABLE_NAME]), (VIEW_3, [M_VIEW_2, VIEW_3])],
+                compose_full_table_name_with_placeholder=True,
+            ),
+            get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_2, M_VIEW_2),
+            ])
+        ) == {VIEW_1: [VIEW_2], VIEW_2: [VIEW_3], VIEW_3: []}
+
+
+class TestGetReachableNames:
+    def test_should_return_start_names_and_transitively_reachable_names(self):
+        assert get_reachable_names(
+            [VIEW_1],
+            {VIEW_1: [VIEW_2], VIEW_2: [VIEW_3, VIEW_1], VIEW_3: []}
+        ) == [VIEW_1, VIEW_2, VIEW_3]
+
+    def test_should_return_empty_list_without_start_names(self):
+        assert not get_reachable_names([], {VIEW_1: [VIEW_2]})
+
+
+class TestResolveViewNameSelectors:
+    @pytest.fixture(name='base_dir')
+    def _base_dir(self, temp_dir: Path) -> Path:
+        (temp_dir / f'{VIEW_1}.sql').write_text('SELECT 1')
+        (temp_dir / f'{VIEW_2}.sql').write_text(f'SELECT * FROM `{{project}}.{{dataset}}.{VIEW_1}`')
+        (temp_dir / f'{VIEW_3}.sql').write_text(
+            f'SELECT * FROM `{{project}}.{{dataset}}.{M_VIEW_2}`'
+        )
+        return temp_dir
+
+    def _resolve(self, base_dir: Path, view_names_or_selectors: List[str]) -> List[str]:
+        return resolve_view_name_selectors(
+            view_names_or_selectors,
+            str(base_dir),
+            get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_1, VIEW_1),
+                (DATASET_1, VIEW_2, VIEW_2),
+                (DATASET_1, VIEW_3, VIEW_3),
+            ]),
+            get_input_ordered_dict_view_mapping([
+                (DATASET_1, VIEW_2, M_VIEW_2),
+            ])
+        )
+
+    def test_should_return_plain_view_names_unchanged(self, base_dir: Path):
+        assert self._resolve(base_dir, [VIEW_3, VIEW_1, 'other']) == [VIEW_3, VIEW_1, 'other']
+
+    def test_should_select_view_and_dependencies(self, base_dir: Path):
+        assert self._resolve(base_dir, [f'+{VIEW_2}']) == [VIEW_1, VIEW_2]
+
+    def test_should_select_view_and_dependents_via_materialized_table(self, base_dir: Path):
+        assert self._resolve(base_dir, [f'{VIEW_2}+']) == [VIEW_2, VIEW_3]
+
+    def test_should_select_dependencies_and_dependents(self, base_dir: Path):
+        assert self._resolve(base_dir, [f'+{VIEW_2}+']) == [VIEW_1, VIEW_2, VIEW_3]
+
+    def test_should_combine_selectors_and_view_names(self, base_dir: Path):
+        assert self._resolve(base_dir, [VIEW_3, f'{VIEW_1}+', 'other']) == [
+            VIEW_1, VIEW_2, VIEW_3, 'other'
+        ]
+
+    def test_should_reject_selector_for_unknown_view(self, base_dir: Path):
+        with pytest.raises(ValueError):
+            self._resolve(base_dir, ['+other'])
+
 
 class TestViewListConfig:
     def test_should_filter_view_names(self):
@@ -212,6 +460,21 @@ class TestViewListConfig:
             ('view3', {DATASET_NAME_KEY: 'dataset1', VIEW_OR_TABLE_NAME_KEY: 'mview3'})
         ])
 
+    def test_should_include_max_bytes_billed_in_materialized_view_ordered_dict(self):
+        view_list_config = ViewListConfig([
+            ViewConfig('view1', materialize=True, max_bytes_billed=1000)
+        ])
+        materialized_view_ordered_dict = (
+            view_list_config.to_materialized_view_ordered_dict('dataset1')
+        )
+        assert materialized_view_ordered_dict == OrderedDict([
+            ('view1', {
+                DATASET_NAME_KEY: 'dataset1',
+                VIEW_OR_TABLE_NAME_KEY: 'mview1',
+                MAX_BYTES_BILLED_KEY: 1000
+            })
+        ])
+
     def test_should_sort_views_without_materialized_table(self, temp_dir: Path):
         view_list_config = ViewListConfig([
             ViewConfig('view1'),
@@ -308,6 +571,25 @@ class TestLoadViewListConfig:
         assert not_matching_resolved_view1.materialize_as is None
         assert not_matching_resolved_view1.resolved_materialize_as == 'mview1'
 
+    def test_should_load_yaml_with_max_bytes_billed(self, temp_dir: Path):
+        view_list_path = temp_dir / 'views.yaml'
+        view_list_path.write_text('\n'.join([
+            '- view1:',
+            '    materialize: true',
+            '    max_bytes_billed: 1000',
+            '    conditions:',
+            '    - if:',
+            '        dataset: source_dataset1',
+            '      max_bytes_billed: 2000'
+        ]))
+        view_list = load_view_list_config(view_list_path)
+        view1 = view_list[0]
+        assert view1.max_bytes_billed == 1000
+        assert view1.resolve_conditions({'dataset': 'other'}).max_bytes_billed == 1000
+        assert view1.resolve_conditions(
+            {'dataset': 'source_dataset1'}
+        ).max_bytes_billed == 2000
+
 
 def _load_save_read_view_list_config_lines(temp_dir: Path, view_list_lines: List[str]):
     view_list_path = temp_dir / 'views.yaml'
@@ -356,3 +638,22 @@ class TestSaveViewListConfig:
             _load_yaml_lines(output_view_list_lines)
             == _load_yaml_lines(view_list_lines)
         )
+
+    def test_should_load_and_save_max_bytes_billed(self, temp_dir: Path):
+        view_list_lines = [
+            '- view1:',
+            '    materialize: true',
+            '    max_bytes_billed: 1000',
+            '    conditions:',
+            '    - if:',
+            '        dataset: source_dataset1',
+            '      max_bytes_billed: 2000'
+        ]
+        output_view_list_lines = _load_save_read_view_list_config_lines(
+            temp_dir,
+            view_list_lines
+        )
+        assert (
+            _load_yaml_lines(output_view_list_lines)
+            == _load_yaml_lines(view_list_lines)
+        )
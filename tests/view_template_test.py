@@ -1,4 +1,11 @@
-from bigquery_views_manager.view_template import ViewTemplate
+import re
+
+import pytest
+
+from bigquery_views_manager.view_template import (
+    ViewTemplate,
+    resolve_query_template_placeholders
+)
 
 TEMPLATE_1 = "SELECT * FROM `{project}.{dataset}.table1"
 
@@ -8,6 +15,34 @@ VIEW_2 = "table2"
 VIEW_TO_DATASET_MAPPING = {VIEW_1: DATASET, VIEW_2: DATASET}
 
 
+def legacy_resolve_query_template_placeholders(
+        query_template: str,
+        project: str,
+        default_dataset: str,
+        view_to_dataset_mapping: dict,
+) -> str:
+    # the previous implementation, used as a reference for the compiled template
+    dataset_placeholder = "{dataset}."
+    project_placeholder = "{project}."
+    placeholder = "".join([project_placeholder, dataset_placeholder])
+    regex_pattern = "".join(
+        [project_placeholder, dataset_placeholder, r"[\w]*"])
+    all_occurrences = re.findall(regex_pattern, query_template)
+    tables_present_in_template = [
+        x.replace(placeholder, "") for x in all_occurrences
+    ]
+
+    for table in tables_present_in_template:
+        dataset_table_placeholder_to_replace = "".join(
+            [dataset_placeholder, table])
+        new_dataset_table_name = "".join(
+            [view_to_dataset_mapping.get(table, default_dataset), ".", table])
+        query_template = (query_template.replace("{project}", project).replace(
+            dataset_table_placeholder_to_replace,
+            new_dataset_table_name).replace("{dataset}", default_dataset))
+    return query_template
+
+
 class TestViewTemplate:
     def test_should_replace_multiple_project_and_dataset_references(self):
         view_template = ViewTemplate("""
@@ -74,3 +109,46 @@ class TestViewTemplate:
         ).normalized.view_template_content == (
             "SELECT * FROM `{project}.{dataset}.table1`\n"
         )
+
+
+class TestResolveQueryTemplatePlaceholders:
+    @pytest.mark.parametrize('query_template', [
+        'SELECT 1',
+        'SELECT * FROM `{project}.{dataset}.table1`',
+        'SELECT "{project}" AS project, "{dataset}" AS dataset',
+        'SELECT * FROM `{project}.{dataset}.table1`, `{project}.{dataset}.table1`',
+        'SELECT * FROM `{project}.{dataset}.table1` JOIN `{project}.{dataset}.table2`',
+        'SELECT * FROM `{project}.{dataset}.table2` JOIN `{project}.{dataset}.table1`',
+        'SELECT * FROM `{project}.{dataset}.table1` JOIN `{project}.{dataset}.table10`',
+        'SELECT * FROM `{project}.other_dataset.table1` JOIN `{project}.{dataset}.table2`',
+        'SELECT * FROM `{dataset}.table2` JOIN `{project}.{dataset}.table2`',
+        'SELECT * FROM `{project}.{dataset}.`',
+        'SELECT * FROM `{project}:{dataset}.table2` JOIN `{project}.{dataset}.table2`',
+        'SELECT "{project}.{dataset}.table2{dataset}"',
+        'SELECT * FROM `{project}.{dataset}.table2`\nWHERE x = \'{\' AND y = "{dataset}"',
+    ])
+    def test_should_render_same_query_as_previous_implementation(self, query_template: str):
+        kwargs = {
+            'project': 'project1',
+            'default_dataset': 'default_dataset1',
+            'view_to_dataset_mapping': {'table2': 'dataset2', 'table10': 'dataset10'}
+        }
+        assert resolve_query_template_placeholders(query_template, **kwargs) == (
+            legacy_resolve_query_template_placeholders(query_template, **kwargs)
+        )
+
+    def test_should_only_apply_dataset_mapping_of_first_referenced_table(self):
+        assert resolve_query_template_placeholders(
+            'SELECT * FROM `{project}.{dataset}.table2` JOIN `{project}.{dataset}.table10`',
+            project='project1',
+            default_dataset='dataset1',
+            view_to_dataset_mapping={'table2': 'dataset2', 'table10': 'dataset10'}
+        ) == 'SELECT * FROM `project1.dataset2.table2` JOIN `project1.dataset1.table10`'
+
+    def test_should_not_replace_placeholders_without_table_reference(self):
+        assert resolve_query_template_placeholders(
+            'SELECT "{project}"',
+            project='project1',
+            default_dataset='dataset1',
+            view_to_dataset_mapping={}
+        ) == 'SELECT "{project}"'
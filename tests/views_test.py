@@ -1,6 +1,22 @@
-from bigquery_views_manager.views import get_view_template_file
+from bigquery_views_manager.views import (
+    get_bq_view_query_by_view_name_map,
+    get_view_template_file
+)
 
 
 class TestGetViewTemplateFile:
     def test_should_join_base_dir_and_view_name_with_sql_ext(self):
         assert str(get_view_template_file("views", "view1")) == "views/view1.sql"
+
+
+class TestGetBqViewQueryByViewNameMap:
+    def test_should_query_information_schema_of_dataset(self, bq_client):
+        bq_client.project = 'project1'
+        bq_client.query.return_value.result.return_value = [
+            {'table_name': 'view1', 'view_definition': 'SELECT 1'}
+        ]
+        assert get_bq_view_query_by_view_name_map(bq_client, 'dataset1') == {
+            'view1': 'SELECT 1'
+        }
+        query = bq_client.query.call_args[0][0]
+        assert '`project1.dataset1.INFORMATION_SCHEMA.VIEWS`' in query
@@ -0,0 +1,164 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import bigquery_views_manager.watch as watch_module
+from bigquery_views_manager.caching_client import CachingClient
+from bigquery_views_manager.watch import ViewsWatcher
+
+
+DATASET_1 = 'dataset1'
+
+
+@pytest.fixture(name='update_or_create_views_mock', autouse=True)
+def _update_or_create_views_mock():
+    with patch.object(watch_module, 'update_or_create_views') as mock:
+        yield mock
+
+
+def _write_text(path: Path, text: str):
+    # make sure that the modification time changes, even within the timestamp resolution
+    previous_mtime_ns = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text, encoding='utf-8')
+    mtime_ns = max(path.stat().st_mtime_ns, previous_mtime_ns + 1_000_000)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture(name='view_list_config_path')
+def _view_list_config_path(temp_dir: Path) -> Path:
+    view_list_config_path = temp_dir / 'views.yml'
+    _write_text(view_list_config_path, '\n'.join([
+        '- view1',
+        '- view2',
+        '- view3'
+    ]))
+    _write_text(temp_dir / 'view1.sql', 'SELECT 1')
+    _write_text(temp_dir / 'view2.sql', 'SELECT * FROM `{project}.{dataset}.view1`')
+    _write_text(temp_dir / 'view3.sql', 'SELECT 3')
+    return view_list_config_path
+
+
+def _get_views_watcher(bq_client: MagicMock, view_list_config_path: Path) -> ViewsWatcher:
+    bq_client.project = 'project1'
+    return ViewsWatcher(bq_client, str(view_list_config_path), dataset=DATASET_1)
+
+
+class TestViewsWatcher:
+    def test_should_not_deploy_anything_without_changes(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path,
+            update_or_create_views_mock: MagicMock):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        assert not watcher.poll_once()
+        update_or_create_views_mock.assert_not_called()
+
+    def test_should_redeploy_changed_view_and_dependents(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path,
+            update_or_create_views_mock: MagicMock):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        _write_text(view_list_config_path.parent / 'view1.sql', 'SELECT 11')
+        assert watcher.poll_once() == ['view1', 'view2']
+        views_dict = update_or_create_views_mock.call_args[0][2]
+        assert list(views_dict.keys()) == ['view1', 'view2']
+        assert not watcher.poll_once()
+
+    def test_should_only_redeploy_changed_view_without_dependents(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        _write_text(view_list_config_path.parent / 'view3.sql', 'SELECT 33')
+        assert watcher.poll_once() == ['view3']
+
+    def test_should_pick_up_new_references(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        _write_text(
+            view_list_config_path.parent / 'view3.sql',
+            'SELECT * FROM `{project}.{dataset}.view2`'
+        )
+        assert watcher.poll_once() == ['view3']
+        _write_text(view_list_config_path.parent / 'view1.sql', 'SELECT 11')
+        assert watcher.poll_once() == ['view1', 'view2', 'view3']
+
+    def test_should_redeploy_views_added_to_view_list_config(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        _write_text(view_list_config_path.parent / 'view4.sql', 'SELECT 4')
+        assert not watcher.poll_once()
+        _write_text(view_list_config_path, '\n'.join([
+            '- view1',
+            '- view2',
+            '- view3',
+            '- view4'
+        ]))
+        assert watcher.poll_once() == ['view4']
+
+    def test_should_continue_after_failed_deployment(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path,
+            update_or_create_views_mock: MagicMock):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        update_or_create_views_mock.side_effect = RuntimeError('invalid query')
+        _write_text(view_list_config_path.parent / 'view3.sql', 'SELECT invalid')
+        assert not watcher.poll_once()
+        update_or_create_views_mock.side_effect = None
+        _write_text(view_list_config_path.parent / 'view3.sql', 'SELECT 3')
+        assert watcher.poll_once() == ['view3']
+
+    def test_should_retry_failed_deployment_on_next_poll(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path,
+            update_or_create_views_mock: MagicMock):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        update_or_create_views_mock.side_effect = RuntimeError('temporary failure')
+        _write_text(view_list_config_path.parent / 'view1.sql', 'SELECT 11')
+        assert not watcher.poll_once()
+        update_or_create_views_mock.side_effect = None
+        assert watcher.poll_once() == ['view1', 'view2']
+        assert update_or_create_views_mock.call_count == 2
+        assert not watcher.poll_once()
+
+    def test_should_reload_view_list_config_again_after_it_failed_to_load(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path):
+        watcher = _get_views_watcher(bq_client, view_list_config_path)
+        with patch.object(
+                watch_module, 'load_view_list_config', side_effect=RuntimeError('invalid')):
+            _write_text(view_list_config_path.parent / 'view4.sql', 'SELECT 4')
+            _write_text(view_list_config_path, '\n'.join([
+                '- view1',
+                '- view2',
+                '- view3',
+                '- view4'
+            ]))
+            assert not watcher.poll_once()
+        assert watcher.poll_once() == ['view4']
+
+    def test_should_clear_cache_of_caching_client_before_redeploying(
+            self,
+            bq_client: MagicMock,
+            view_list_config_path: Path,
+            update_or_create_views_mock: MagicMock):
+        bq_client.project = 'project1'
+        caching_client = CachingClient(bq_client)
+        watcher = ViewsWatcher(caching_client, str(view_list_config_path), dataset=DATASET_1)
+        caching_client.get_table('dataset1.view1')
+        _write_text(view_list_config_path.parent / 'view1.sql', 'SELECT 11')
+        update_or_create_views_mock.side_effect = (
+            lambda client, *_, **__: client.get_table('dataset1.view1')
+        )
+        assert watcher.poll_once() == ['view1', 'view2']
+        assert bq_client.get_table.call_count == 2